@@ -1,19 +1,129 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import os
+import uuid
 
+from modules.analysis_session import AnalysisSession
+from modules.column_stats import KLLSketch
 from modules.data_cleaner import DataCleaner
-from modules.statistical_analyzer import StatisticalAnalyzer
-from modules.outlier_detector import OutlierDetector
-from modules.trend_analyzer import TrendAnalyzer
-from modules.visualizer import DataVisualizer
+from modules.data_ingestion import CSVIngestor, memory_footprint
+from modules.data_loader import DataLoader
+from modules.job_runner import JobRunner
+from modules.report_generator import ReportGenerator
+from modules.report_renderers import RENDERERS, available_formats, fpdf_error
 
 st.set_page_config(page_title="Data Analysis Dashboard", layout="wide")
 
+
+MEMORY_BUDGET_MB = int(os.environ.get('DASHBOARD_MEMORY_BUDGET_MB', 2048))
+ANALYSIS_WORKERS = int(os.environ.get('DASHBOARD_WORKERS', 0)) or None
+JOB_WORKERS = int(os.environ.get('DASHBOARD_JOB_WORKERS', 2))
+REPORT_FORMATS = {'PDF': 'pdf', 'HTML': 'html'}
+
+
+@st.cache_resource
+def get_data_loader():
+    return DataLoader(ingestor=CSVIngestor(memory_budget_mb=MEMORY_BUDGET_MB))
+
+
+def load_with_progress(source, name=None):
+    progress_bar = st.sidebar.progress(0.0, text="Loading data...")
+    try:
+        return loader.load(source, name=name, progress=lambda fraction: progress_bar.progress(fraction, text="Loading data..."))
+    finally:
+        progress_bar.empty()
+
+
+def get_analysis_session(df):
+    session = st.session_state.get('analysis_session')
+    if session is None:
+        session = AnalysisSession(df, n_workers=ANALYSIS_WORKERS)
+        st.session_state.analysis_session = session
+    else:
+        session.update_data(df)
+    return session
+
+
+@st.cache_resource
+def get_job_runner():
+    # One runner (and thread pool) for the whole server. Jobs are owned by the
+    # browser session that submitted them, which keeps its own slots in
+    # session_state.
+    return JobRunner(max_workers=JOB_WORKERS)
+
+
+@st.fragment(run_every=1.0)
+def job_progress(slot):
+    # Polls the job running in a slot; once it has finished the whole script
+    # reruns so its result is drawn in place.
+    job = job_runner.get(st.session_state.jobs[slot].get('job'))
+    if job is None or not job.active:
+        st.rerun()
+    st.progress(job.progress, text=job.message or f"{job.status.capitalize()}...")
+    if job.can_cancel and st.button("Cancel", key=f"cancel_{slot}", disabled=job.cancel_requested):
+        job_runner.cancel(job.id)
+
+
+def submit_job(slot, compute, params, cancellable):
+    job = job_runner.submit(slot, compute, params, cancellable=cancellable, owner=st.session_state.session_id)
+    st.session_state.jobs[slot] = {'params': params, 'job': job.id}
+
+
+def background(slot, compute, start=True, cancellable=False, **params):
+    # Runs compute(job) off the script thread. Each slot remembers its job in
+    # session_state and identical in-flight jobs of this session are shared by
+    # the runner, so reruns pick up the running job instead of starting it
+    # again. A finished job's outcome is moved into the slot and the job is
+    # released from the runner. Returns the result once done, None while
+    # running or when not started. Only ``cancellable`` jobs, which call
+    # job.update() between steps, can be cancelled once running.
+    params['dataset'] = session.fingerprint
+    entry = st.session_state.jobs.get(slot)
+    if entry is None or entry['params'] != params:
+        if not start:
+            return None
+        submit_job(slot, compute, params, cancellable)
+        entry = st.session_state.jobs[slot]
+    
+    if 'job' in entry:
+        job = job_runner.get(entry['job'])
+        if job is not None and job.active:
+            job_progress(slot)
+            return None
+        if job is None:
+            entry.update(status='failed', result=None, error="the job was discarded before it finished")
+        else:
+            entry.update(status=job.status, result=job.result, error=job.error)
+            job_runner.release(job.id)
+        del entry['job']
+    
+    if entry['status'] == 'done':
+        return entry['result']
+    if entry['status'] == 'failed':
+        st.error(f"Failed: {entry['error']}")
+    else:
+        st.warning("Cancelled.")
+    if st.button("Run again", key=f"retry_{slot}"):
+        submit_job(slot, compute, params, cancellable)
+        st.rerun()
+    return None
+
+
+loader = get_data_loader()
+job_runner = get_job_runner()
+
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = {}
+
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
 if 'df' not in st.session_state:
     st.session_state.df = None
 
+if 'upload_id' not in st.session_state:
+    st.session_state.upload_id = None
+
 st.title("Data Analysis Dashboard")
 st.write("Upload your data to analyze it")
 
@@ -22,15 +132,18 @@ uploaded_file = st.sidebar.file_uploader("Choose CSV or Excel file", type=['csv'
 
 st.sidebar.subheader("Or use sample data")
 if st.sidebar.button("Load Retail Sales Data"):
-    st.session_state.df = pd.read_csv('sample_data/retail_sales_dataset.csv')
+    st.session_state.df = load_with_progress('sample_data/retail_sales_dataset.csv')
+    st.session_state.upload_id = None
     st.sidebar.success("Retail sales data loaded!")
 
 if uploaded_file is not None:
+    # Widget interactions rerun the script with the same upload; only hash and
+    # load it again when a different file has been chosen.
+    upload_id = getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)
     try:
-        if uploaded_file.name.endswith('.csv'):
-            st.session_state.df = pd.read_csv(uploaded_file)
-        else:
-            st.session_state.df = pd.read_excel(uploaded_file)
+        if st.session_state.upload_id != upload_id or st.session_state.df is None:
+            st.session_state.df = load_with_progress(uploaded_file, name=uploaded_file.name)
+            st.session_state.upload_id = upload_id
         st.sidebar.success("Data loaded successfully!")
     except Exception as e:
         st.sidebar.error(f"Error: {e}")
@@ -38,23 +151,46 @@ if uploaded_file is not None:
 df = st.session_state.df
 
 if df is not None:
+    session = get_analysis_session(df)
+    
+    st.sidebar.subheader("Append New Rows")
+    delta_file = st.sidebar.file_uploader("Choose CSV or Excel file with new rows", type=['csv', 'xlsx', 'xls'], key='delta_file')
+    if delta_file is not None and st.sidebar.button("Append Rows"):
+        try:
+            delta = load_with_progress(delta_file, name=delta_file.name)
+            df = session.append(delta[df.columns])
+            st.session_state.df = df
+            st.sidebar.success(f"Appended {len(delta):,} rows")
+        except Exception as e:
+            st.sidebar.error(f"Error: {e}")
+    
     tab1, tab2, tab3, tab4, tab5 = st.tabs(["Overview", "Statistics", "Outliers", "Trends", "Visualizations"])
     
     with tab1:
         st.header("Dataset Overview")
         
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns(4)
         col1.metric("Rows", df.shape[0])
         col2.metric("Columns", df.shape[1])
         col3.metric("Missing Values", df.isnull().sum().sum())
+        col4.metric("Memory", f"{memory_footprint(df) / 1024**2:.2f} MB")
         
         st.subheader("Data Preview")
         st.dataframe(df.head(10))
         
+        if session.last_delta is not None:
+            st.subheader("Appended Rows")
+            delta = session.last_delta
+            st.write(f"**{len(delta):,} rows appended to {len(df) - len(delta):,} existing rows**")
+            for method, delta_mask in session.delta_outliers.items():
+                flagged = delta_mask.any(axis=1) if delta_mask.ndim == 2 else delta_mask
+                st.write(f"{method.upper()} outliers in appended rows: {int(flagged.sum()):,}")
+            st.dataframe(delta.head(100))
+        
         st.subheader("Column Information")
         col_info = pd.DataFrame({
             'Column': df.columns,
-            'Type': df.dtypes,
+            'Type': df.dtypes.astype(str),
             'Missing': df.isnull().sum(),
             'Unique': [df[col].nunique() for col in df.columns]
         })
@@ -63,82 +199,164 @@ if df is not None:
     with tab2:
         st.header("Statistical Analysis")
         
-        analyzer = StatisticalAnalyzer(df)
-        
         st.subheader("Descriptive Statistics")
-        stats = analyzer.descriptive_statistics()
+        approximate = st.checkbox(
+            "Approximate quantiles",
+            help=f"Percentiles from a KLL sketch, within about {KLLSketch(1).rank_error:.1%} of the true rank"
+        )
+        stats = session.descriptive_statistics(approximate=approximate)
         st.dataframe(stats)
         
-        if len(analyzer.numeric_columns) >= 2:
+        st.subheader("Distribution Profile")
+        st.caption("Normality tests run on a random sample of up to 5,000 values per column")
+        st.dataframe(session.distribution_profile())
+        
+        if len(session.numeric_columns) >= 2:
             st.subheader("Correlation Matrix")
-            visualizer = DataVisualizer(df)
-            fig = visualizer.plot_correlation_heatmap()
+            block = None
+            block_labels = session.heatmap_blocks()
+            if block_labels:
+                options = ["Overview"] + block_labels
+                drill_col1, drill_col2 = st.columns(2)
+                row_block = drill_col1.selectbox("Row Block", options)
+                col_block = drill_col2.selectbox("Column Block", options)
+                if row_block != "Overview" and col_block != "Overview":
+                    block = (block_labels.index(row_block), block_labels.index(col_block))
+            fig = session.correlation_heatmap(block=block)
             st.plotly_chart(fig, use_container_width=True)
     
     with tab3:
         st.header("Outlier Detection")
         
-        detector = OutlierDetector(df)
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+        numeric_cols = session.numeric_columns
         
         if numeric_cols:
-            method = st.selectbox("Method", ["IQR", "Z-Score"])
+            method = st.selectbox("Method", ["IQR", "Z-Score", "Rolling MAD", "EWMA Z-Score", "Isolation Forest"])
             selected_col = st.selectbox("Select Column", numeric_cols)
             
-            if st.button("Detect Outliers"):
-                if method == "IQR":
-                    outliers = detector.detect_iqr([selected_col])
-                    summary = detector.get_outlier_summary('iqr')
-                    info = summary['columns'][selected_col]
+            if method == "IQR":
+                approximate_iqr = st.checkbox("Approximate quartiles")
+            elif method == "Isolation Forest":
+                contamination = st.slider("Contamination", 0.01, 0.5, 0.1, 0.01)
+                # Sampling by stratum keeps small groups in the fitted sample.
+                stratify_by = st.selectbox("Stratify Sample By", [None] + session.categorical_columns)
+            elif method in ("Rolling MAD", "EWMA Z-Score"):
+                window = st.slider("Window", 5, 365, 30)
+            
+            if method == "IQR":
+                method_key, method_params = 'iqr', {'approximate': approximate_iqr}
+            elif method == "Z-Score":
+                method_key, method_params = 'zscore', {}
+            elif method in ("Rolling MAD", "EWMA Z-Score"):
+                method_key = 'rolling_mad' if method == "Rolling MAD" else 'ewma'
+                method_params = {'window': window}
+            else:
+                method_key = 'isolation_forest'
+                method_params = {'contamination': contamination, 'stratify_by': stratify_by}
+            
+            def detect_outliers(job, method_key=method_key, method_params=method_params):
+                job.update(message="Detecting outliers...")
+                outliers = session.outlier_masks(method_key, **method_params)
+                return outliers, session.outlier_summary(method_key, **method_params)
+            
+            result = background(
+                'outliers', detect_outliers, start=st.button("Detect Outliers"),
+                method=method_key, **method_params
+            )
+            
+            if result is not None:
+                outliers, summary = result
+                if method_key == 'isolation_forest':
+                    outlier_mask = outliers
+                    info = {
+                        'outlier_count': summary.get('total_outliers', 0),
+                        'outlier_percentage': summary.get('outlier_percentage', 0.0)
+                    }
                 else:
-                    outliers = detector.detect_zscore([selected_col])
-                    summary = detector.get_outlier_summary('zscore')
+                    outlier_mask = outliers[selected_col]
                     info = summary['columns'][selected_col]
                 
                 st.write(f"**Found {info['outlier_count']} outliers ({info['outlier_percentage']:.2f}%)**")
                 
-                visualizer = DataVisualizer(df)
-                fig = visualizer.plot_outliers(selected_col, outliers[selected_col])
+                fig = session.visualizer.plot_outliers(selected_col, outlier_mask)
                 st.plotly_chart(fig, use_container_width=True)
     
     with tab4:
         st.header("Trend Analysis")
         
-        trend_analyzer = TrendAnalyzer(df)
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+        numeric_cols = session.numeric_columns
         
         if numeric_cols:
-            time_col = trend_analyzer.detect_time_column()
+            time_col = session.time_column()
             if not time_col:
                 time_col = st.selectbox("Select Time Column", df.columns)
             
             selected_col = st.selectbox("Select Value Column", numeric_cols)
             
-            trend_info = trend_analyzer.identify_trend(selected_col, time_col)
+            res_col1, res_col2, res_col3 = st.columns(3)
+            resolution = res_col1.selectbox("Resolution", ["Raw", "Daily", "Weekly", "Monthly"])
+            aggregation = res_col2.selectbox("Aggregation", ["sum", "mean", "count"], disabled=resolution == "Raw")
+            group_options = [col for col in session.categorical_columns if df[col].nunique() <= 20]
+            group_by = res_col3.selectbox("Group By", [None] + group_options, disabled=resolution == "Raw")
             
-            if trend_info:
-                st.write(f"Trend Direction: {trend_info['trend_direction']}")
-                st.write(f"Total Change: {trend_info['total_change_percent']:.2f}%")
+            if resolution == "Raw":
+                trends = background(
+                    'trends', lambda job: session.trends(time_col), time_column=time_col
+                )
+                trend_info = trends.get(selected_col) if trends is not None else None
                 
-                visualizer = DataVisualizer(df)
-                fig = visualizer.plot_time_series(time_col, selected_col)
-                st.plotly_chart(fig, use_container_width=True)
+                if trend_info:
+                    st.write(f"Trend Direction: {trend_info['trend_direction']}")
+                    st.write(f"Total Change: {trend_info['total_change_percent']:.2f}%")
+                    st.write(f"Slope: {trend_info['slope']:.4g} {trend_info['slope_unit']}")
+                    
+                    fig = session.time_series_figure(selected_col, time_col)
+                    st.plotly_chart(fig, use_container_width=True)
+            else:
+                freq = resolution.lower()
+                trends = background(
+                    'resampled_trends',
+                    lambda job: session.resampled_trends(freq, aggregation, group_by, time_col),
+                    freq=freq, agg=aggregation, group_by=group_by, time_column=time_col
+                )
+                
+                if trends is not None:
+                    if group_by is None:
+                        trend_info = trends.get(selected_col)
+                        if trend_info:
+                            st.write(f"Trend Direction: {trend_info['trend_direction']}")
+                            st.write(f"Total Change: {trend_info['total_change_percent']:.2f}%")
+                            st.write(f"Slope: {trend_info['slope']:.4g} {trend_info['slope_unit']}")
+                    else:
+                        trend_table = pd.DataFrame({
+                            group: {
+                                'Trend Direction': group_trends[selected_col]['trend_direction'],
+                                'Total Change (%)': group_trends[selected_col]['total_change_percent'],
+                                f"Slope ({group_trends[selected_col]['slope_unit']})": group_trends[selected_col]['slope']
+                            }
+                            for group, group_trends in trends.items() if group_trends.get(selected_col)
+                        }).T
+                        st.dataframe(trend_table)
+                    
+                    fig = session.resampled_figure(selected_col, freq, aggregation, group_by, time_col)
+                    if fig is not None:
+                        st.plotly_chart(fig, use_container_width=True)
     
     with tab5:
         st.header("Visualizations")
         
-        visualizer = DataVisualizer(df)
+        visualizer = session.visualizer
         viz_type = st.selectbox("Chart Type", ["Distribution", "Scatter Plot", "Bar Chart"])
         
         if viz_type == "Distribution":
-            numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+            numeric_cols = session.numeric_columns
             if numeric_cols:
                 col = st.selectbox("Column", numeric_cols)
                 fig = visualizer.plot_distribution(col, plot_type='histogram')
                 st.plotly_chart(fig, use_container_width=True)
         
         elif viz_type == "Scatter Plot":
-            numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+            numeric_cols = session.numeric_columns
             if len(numeric_cols) >= 2:
                 x_col = st.selectbox("X-axis", numeric_cols)
                 y_col = st.selectbox("Y-axis", numeric_cols, index=1)
@@ -146,78 +364,45 @@ if df is not None:
                 st.plotly_chart(fig, use_container_width=True)
         
         else:  # Bar Chart
-            cat_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
+            cat_cols = session.categorical_columns
             if cat_cols:
                 col = st.selectbox("Column", cat_cols)
-                fig = visualizer.plot_categorical(col, plot_type='bar')
+                fig = visualizer.plot_categorical(col, plot_type='bar', top_n=20)
                 st.plotly_chart(fig, use_container_width=True)
 
     st.sidebar.markdown("---")
     st.sidebar.subheader("Export Report")
     
-    if 'report_pdf' not in st.session_state:
-        st.session_state.report_pdf = None
+    # Formats whose renderer cannot run here (PDF without fpdf2) are not
+    # offered; the rest of the dashboard does not depend on them.
+    formats = {label: format for label, format in REPORT_FORMATS.items() if format in available_formats()}
+    if 'pdf' not in formats.values():
+        st.sidebar.caption(fpdf_error())
+    report_format = formats[st.sidebar.radio("Format", list(formats), horizontal=True)]
     
-    if st.sidebar.button("Generate PDF Report"):
-        with st.spinner("Generating report..."):
-            analyzer = StatisticalAnalyzer(df)
-            stats_df = analyzer.descriptive_statistics()
-            correlations = analyzer.get_strong_correlations()
-            
-            outlier_detector = OutlierDetector(df)
-            numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-            outlier_detector.detect_iqr(numeric_cols)
-            outliers_summary = outlier_detector.get_outlier_summary('iqr')
-            
-            trend_results = {}
-            trend_analyzer = TrendAnalyzer(df)
-            time_col = trend_analyzer.detect_time_column()
-            if time_col:
-                for col in numeric_cols:
-                    trend = trend_analyzer.identify_trend(col, time_col)
-                    if trend:
-                        trend_results[col] = {'trend': trend}
-            
-            analysis_results = {
-                'descriptive_stats': stats_df,
-                'correlations': correlations,
-                'outliers': {'iqr': outliers_summary}, # Wrap in method key as expected by generator
-                'trends': trend_results
-            }
-            
-            from modules.report_generator import ReportGenerator
-            generator = ReportGenerator(df, analysis_results)
-            
-            timestamp = pd.Timestamp.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"analysis_report_{timestamp}.pdf"
-            
-            try:
-                generator.generate_report(filename)
-                
-                if os.path.exists(filename):
-                    with open(filename, "rb") as f:
-                        st.session_state.report_pdf = f.read()
-                    st.sidebar.success("Report generated!")
-                else:
-                    st.sidebar.error("Report file was not created.")
-                    
-            except Exception as e:
-                st.sidebar.error(f"Failed to generate report: {str(e)}")
-            
-            try:
-                if os.path.exists(filename):
-                    os.remove(filename)
-            except:
-                pass
-
-    if st.session_state.report_pdf is not None:
-        st.sidebar.download_button(
-            label="Download PDF Report",
-            data=st.session_state.report_pdf,
-            file_name="analysis_report.pdf",
-            mime="application/pdf"
+    def build_report(job, report_format=report_format):
+        job.update(0.0, "Running analyses...")
+        # The matrix is the one the Statistics tab draws; computing it first
+        # also lets the strong correlations be read from it.
+        corr_matrix = session.correlation_matrix()
+        analysis_results = session.analysis_results()
+        generator = ReportGenerator(df, analysis_results, visualizer=session.visualizer, corr_matrix=corr_matrix)
+        return generator.generate_report(format=report_format, progress=job.update).getvalue()
+    
+    with st.sidebar:
+        report = background(
+            'report', build_report, start=st.button("Generate Report"), cancellable=True,
+            format=report_format
         )
-        
+        if report is not None:
+            renderer = RENDERERS[report_format]
+            st.download_button(
+                label=f"Download {report_format.upper()} Report",
+                data=report,
+                file_name=f"analysis_report.{renderer.extension}",
+                mime=renderer.mime
+            )
+    
     st.sidebar.markdown("---")
     st.sidebar.markdown("Created by **Om Chandrakant Deo**")
 
@@ -0,0 +1 @@
+# Lets the tests import the ``modules`` package from the repository root.
@@ -0,0 +1,397 @@
+import hashlib
+import inspect
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from modules.correlation_engine import cluster_order
+from modules.duplicate_index import DuplicateIndex
+from modules.lazy_frame import is_lazy
+from modules.outlier_detector import OutlierDetector, summarize_outliers
+from modules.parallel_analyzer import ParallelColumnAnalyzer
+from modules.statistical_analyzer import StatisticalAnalyzer
+from modules.trend_analyzer import TrendAnalyzer
+from modules.visualizer import DataVisualizer
+
+
+OUTLIER_DETECTORS = {
+    'iqr': OutlierDetector.detect_iqr,
+    'zscore': OutlierDetector.detect_zscore,
+    'rolling_mad': OutlierDetector.detect_rolling,
+    'ewma': OutlierDetector.detect_rolling,
+    'isolation_forest': OutlierDetector.detect_isolation_forest,
+}
+
+
+def outlier_params(method, params):
+    # Defaults are filled in so a run memoises under one key whether or not
+    # its parameters were passed explicitly.
+    if method not in OUTLIER_DETECTORS:
+        raise ValueError(f"Unsupported outlier method '{method}', expected one of {tuple(OUTLIER_DETECTORS)}")
+    defaults = {
+        name: parameter.default
+        for name, parameter in inspect.signature(OUTLIER_DETECTORS[method]).parameters.items()
+        if parameter.default is not inspect.Parameter.empty and name not in ('method', 'order')
+    }
+    return {**defaults, **params}
+
+
+def dataset_fingerprint(df):
+    hasher = hashlib.sha256()
+    hasher.update(repr(list(zip(df.columns.astype(str), df.dtypes.astype(str)))).encode('utf-8'))
+    if is_lazy(df):
+        # Hashing the rows would read the whole dataset; its files, filter and
+        # row count identify it instead.
+        hasher.update(repr((df.file_info(), str(df.filter), len(df))).encode('utf-8'))
+    else:
+        hasher.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+
+class AnalysisSession:
+
+    def __init__(self, df, n_workers=None):
+        # Background jobs and the script thread share a session. The lock only
+        # guards the bookkeeping below and is never held while computing:
+        # cached results and components are read without it, and a result is
+        # only stored if the data has not changed (see _generation) while it
+        # was computed. append() updates the analysers in place, so it waits
+        # for running computations and new ones wait for it (see _reading).
+        self.n_workers = n_workers
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._readers = 0
+        self._appending = False
+        self._local = threading.local()
+        self._generation = 0
+        self._set_data(df)
+
+    def _set_data(self, df, fingerprint=None):
+        self.df = df
+        self.fingerprint = fingerprint or dataset_fingerprint(df)
+        self.numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
+        self.categorical_columns = df.select_dtypes(include=['object', 'category']).columns.tolist()
+        self._generation += 1
+        self._results = {}
+        self._pending = {}
+        self._components = {}
+        self.appended = False
+        self.last_delta = None
+        self.delta_outliers = {}
+
+    def update_data(self, df):
+        if df is self.df:
+            return False
+        fingerprint = dataset_fingerprint(df)
+        with self._lock:
+            if fingerprint == self.fingerprint:
+                self.df = df
+                return False
+            self._set_data(df, fingerprint)
+        return True
+
+    @contextmanager
+    def _reading(self):
+        # Held by a computation for its whole run; nested memoised calls on
+        # the same thread are already covered by the outermost one.
+        depth = getattr(self._local, 'depth', 0)
+        if not depth:
+            with self._idle:
+                while self._appending:
+                    self._idle.wait()
+                self._readers += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if not depth:
+                with self._idle:
+                    self._readers -= 1
+                    self._idle.notify_all()
+
+    @contextmanager
+    def _exclusive(self):
+        # Waits until no computation is running; those that start meanwhile
+        # go first, so one waiting on another's result cannot deadlock here.
+        with self._idle:
+            while self._appending or self._readers:
+                self._idle.wait()
+            self._appending = True
+        try:
+            yield
+        finally:
+            with self._idle:
+                self._appending = False
+                self._idle.notify_all()
+
+    def append(self, delta):
+        # Analysers fold the delta into their running accumulators; results
+        # are then re-read from them rather than recomputed over all rows.
+        self.time_column()
+        with self._exclusive():
+            delta = delta.reset_index(drop=True)
+            combined = pd.concat([self.df, delta], ignore_index=True)
+
+            self.statistical_analyzer.append(delta, combined)
+            self.delta_outliers = self.outlier_detector.append(delta, combined)
+            self.trend_analyzer.append(delta, combined)
+            self._components.pop('visualizer', None)
+
+            fingerprint = hashlib.sha256(
+                (self.fingerprint + dataset_fingerprint(delta)).encode('utf-8')
+            ).hexdigest()
+            outliers = self.outlier_detector.outliers
+            with self._lock:
+                self.df = combined
+                self.fingerprint = fingerprint
+                self.appended = True
+                self.last_delta = delta
+                self._generation += 1
+                self._pending = {}
+
+                for name in list(self._results):
+                    if name == 'duplicate_index':
+                        self._results[name][1].update(delta)
+                    elif name.startswith('outliers_') and name[len('outliers_'):] in outliers:
+                        key, _ = self._results[name]
+                        self._results[name] = (key, outliers[name[len('outliers_'):]])
+                    elif name != 'time_column':
+                        del self._results[name]
+            return combined
+
+    def invalidate(self, *names):
+        with self._lock:
+            if not names:
+                self._results.clear()
+                return
+            for name in names:
+                self._results.pop(name, None)
+
+    def _memo(self, name, params, compute):
+        # One entry per result name: asking again with the same parameters is
+        # free, different parameters recompute and replace only that entry.
+        # A computation already running for the same key is waited on rather
+        # than started twice.
+        key = repr(sorted(params.items()))
+        cached = self._results.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with self._lock:
+            cached = self._results.get(name)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            generation = self._generation
+            future = self._pending.get((name, key))
+            owner = future is None
+            if owner:
+                future = self._pending[(name, key)] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            with self._reading():
+                value = compute()
+        except BaseException as e:
+            with self._lock:
+                if self._pending.get((name, key)) is future:
+                    del self._pending[(name, key)]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            if self._pending.get((name, key)) is future:
+                del self._pending[(name, key)]
+            # Data replaced meanwhile: the value goes to this caller only.
+            if self._generation == generation:
+                self._results[name] = (key, value)
+        future.set_result(value)
+        return value
+
+    def _component(self, name, factory):
+        components = self._components
+        component = components.get(name)
+        if component is None:
+            with self._lock:
+                component = components.get(name)
+                if component is None:
+                    component = components[name] = factory(self.df)
+        return component
+
+    @property
+    def statistical_analyzer(self):
+        return self._component('statistical_analyzer', StatisticalAnalyzer)
+
+    @property
+    def outlier_detector(self):
+        return self._component('outlier_detector', OutlierDetector)
+
+    @property
+    def trend_analyzer(self):
+        return self._component('trend_analyzer', TrendAnalyzer)
+
+    @property
+    def visualizer(self):
+        return self._component('visualizer', DataVisualizer)
+
+    def descriptive_statistics(self, approximate=False):
+        return self._memo(
+            'descriptive_statistics', {'approximate': approximate},
+            lambda: self.statistical_analyzer.descriptive_statistics(approximate=approximate)
+        )
+
+    def correlation_matrix(self, method='pearson'):
+        return self._memo(
+            'correlation_matrix', {'method': method},
+            lambda: self.statistical_analyzer.correlation_analysis(method=method)
+        )
+
+    def distribution_profile(self):
+        return self._memo('distribution_profile', {}, self.statistical_analyzer.distribution_profile)
+
+    def _cached(self, name, params):
+        cached = self._results.get(name)
+        if cached is not None and cached[0] == repr(sorted(params.items())):
+            return cached[1]
+        return None
+
+    def strong_correlations(self, threshold=0.7, method='pearson'):
+        # A matrix already built for the heatmap is reused; otherwise pairs
+        # are pulled block by block without materialising the full matrix.
+        return self._memo(
+            'strong_correlations', {'threshold': threshold, 'method': method},
+            lambda: self.statistical_analyzer.get_strong_correlations(
+                threshold=threshold, method=method,
+                corr_matrix=self._cached('correlation_matrix', {'method': method})
+            )
+        )
+
+    def outlier_masks(self, method='iqr', **params):
+        params = outlier_params(method, params)
+
+        def compute():
+            detector = self.outlier_detector
+            if method == 'iqr':
+                return detector.detect_iqr(**params)
+            if method == 'zscore':
+                return detector.detect_zscore(**params)
+            if method in ('rolling_mad', 'ewma'):
+                time_column = self.time_column()
+                order = self.trend_analyzer.get_time_order(time_column) if time_column else None
+                return detector.detect_rolling(method=method, order=order, **params)
+            return detector.detect_isolation_forest(**params)
+
+        # The detector keeps the masks of the last run per method, which is
+        # the run memoised here, so summaries can be read straight from it.
+        return self._memo(f'outliers_{method}', params, compute)
+
+    def outlier_summary(self, method='iqr', **params):
+        # Summarised from the masks of this exact run rather than from the
+        # detector's last run, which a run with other parameters may replace.
+        return summarize_outliers(method, self.outlier_masks(method, **params), len(self.df))
+
+    def duplicate_index(self, columns=None):
+        return self._memo(
+            'duplicate_index', {'columns': columns},
+            lambda: DuplicateIndex.from_frame(self.df, columns)
+        )
+
+    def duplicate_rows(self):
+        return self.duplicate_index().duplicate_count()
+
+    def time_column(self):
+        return self._memo('time_column', {}, self.trend_analyzer.detect_time_column)
+
+    def time_values(self, time_column=None):
+        time_column = time_column or self.time_column()
+        if time_column is None:
+            return None
+        return self.trend_analyzer.get_time_values(time_column)
+
+    def time_series_figure(self, value_column, time_column=None, moving_average=None):
+        time_column = time_column or self.time_column()
+        return self.visualizer.plot_time_series(
+            time_column, value_column, moving_average=moving_average,
+            time_values=self.time_values(time_column)
+        )
+
+    def resampled(self, freq='daily', agg='sum', group_by=None, time_column=None):
+        time_column = time_column or self.time_column()
+        params = {'freq': freq, 'agg': agg, 'group_by': group_by, 'time_column': time_column}
+        return self._memo(
+            'resampled', params,
+            lambda: self.trend_analyzer.resample(freq, agg, group_by=group_by, time_column=time_column)
+        )
+
+    def resampled_trends(self, freq='daily', agg='sum', group_by=None, time_column=None):
+        time_column = time_column or self.time_column()
+        params = {'freq': freq, 'agg': agg, 'group_by': group_by, 'time_column': time_column}
+        return self._memo(
+            'resampled_trends', params,
+            lambda: self.trend_analyzer.identify_resampled_trends(
+                freq, agg, group_by=group_by, time_column=time_column
+            )
+        )
+
+    def resampled_figure(self, value_column, freq='daily', agg='sum', group_by=None, time_column=None,
+                         moving_average=None):
+        time_column = time_column or self.time_column()
+        resampled = self.resampled(freq, agg, group_by, time_column)
+        if resampled.empty:
+            return None
+        return DataVisualizer(resampled).plot_time_series(
+            time_column, value_column, moving_average=moving_average, group_column=group_by
+        )
+
+    def trend(self, column, time_column=None):
+        return self.trends(time_column).get(column)
+
+    def trends(self, time_column=None):
+        time_column = time_column or self.time_column()
+
+        def compute():
+            if time_column is None:
+                return {}
+            if self.appended:
+                return self.trend_analyzer.identify_trends(time_column=time_column)
+            column_analyzer = ParallelColumnAnalyzer(self.df, n_workers=self.n_workers)
+            results = column_analyzer.analyze_all_columns(
+                ['trend'], time_column=time_column, time_values=self.time_values(time_column)
+            )
+            return results['trend']
+
+        return self._memo('trends', {'time_column': time_column}, compute)
+
+    def correlation_heatmap(self, method='pearson', block=None):
+        return self._memo(
+            'correlation_heatmap', {'method': method, 'block': block},
+            lambda: self.visualizer.plot_correlation_heatmap(
+                method=method, corr_matrix=self.correlation_matrix(method=method), block=block
+            )
+        )
+
+    def heatmap_blocks(self, method='pearson'):
+        # Block labels of the clustered overview, for choosing a drill-down.
+        corr_matrix = self.correlation_matrix(method=method)
+        if len(corr_matrix.columns) <= self.visualizer.heatmap_max_cells:
+            return []
+        ordered = corr_matrix.columns[cluster_order(corr_matrix)].tolist()
+        return [self.visualizer.block_label(block) for block in self.visualizer.heatmap_blocks(ordered)]
+
+    def analysis_results(self):
+        # Parts are computed one by one without holding the lock; if the data
+        # changed in between they are gathered again so all describe one dataset.
+        while True:
+            generation = self._generation
+            trend_results = {col: {'trend': trend} for col, trend in self.trends().items() if trend}
+            results = {
+                'descriptive_stats': self.descriptive_statistics(),
+                'correlations': self.strong_correlations(),
+                'outliers': {'iqr': self.outlier_summary('iqr')},
+                'trends': trend_results,
+                'duplicates': {'duplicate_rows': self.duplicate_rows()}
+            }
+            if self._generation == generation:
+                return results
@@ -0,0 +1,379 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+def _as_matrix(data):
+    if isinstance(data, pd.DataFrame):
+        return data.to_numpy(dtype=np.float64, na_value=np.nan)
+    values = np.asarray(data, dtype=np.float64)
+    return values.reshape(-1, 1) if values.ndim == 1 else values
+
+
+class MomentAccumulator:
+
+    def __init__(self, n_columns):
+        self.count = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.m3 = np.zeros(n_columns)
+        self.m4 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.nan)
+        self.max = np.full(n_columns, np.nan)
+
+    @classmethod
+    def from_values(cls, data):
+        values = _as_matrix(data)
+        acc = cls(values.shape[1])
+        valid = ~np.isnan(values)
+
+        acc.count = valid.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            acc.mean = np.where(acc.count > 0, np.nansum(values, axis=0) / acc.count, 0.0)
+        delta = np.where(valid, values - acc.mean, 0.0)
+        delta2 = delta * delta
+        acc.m2 = delta2.sum(axis=0)
+        acc.m3 = (delta2 * delta).sum(axis=0)
+        acc.m4 = (delta2 * delta2).sum(axis=0)
+
+        has_values = acc.count > 0
+        if has_values.any():
+            acc.min[has_values] = np.nanmin(values[:, has_values], axis=0)
+            acc.max[has_values] = np.nanmax(values[:, has_values], axis=0)
+        return acc
+
+    def update(self, data):
+        self.merge(MomentAccumulator.from_values(data))
+        return self
+
+    def subset(self, positions):
+        acc = MomentAccumulator(len(positions))
+        for name in ('count', 'mean', 'm2', 'm3', 'm4', 'min', 'max'):
+            setattr(acc, name, getattr(self, name)[positions])
+        return acc
+
+    def merge(self, other):
+        # Pairwise combination of central moments (Chan et al. / Pebay 2008).
+        na, nb = self.count, other.count
+        n = na + nb
+        delta = other.mean - self.mean
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = np.where(n > 0, nb / n, 0.0)
+            nanb_n = np.where(n > 0, na * nb / n, 0.0)
+            mean = self.mean + delta * ratio
+            m2 = self.m2 + other.m2 + delta ** 2 * nanb_n
+            m3 = (self.m3 + other.m3
+                  + delta ** 3 * nanb_n * np.where(n > 0, (na - nb) / n, 0.0)
+                  + 3 * delta * np.where(n > 0, (na * other.m2 - nb * self.m2) / n, 0.0))
+            m4 = (self.m4 + other.m4
+                  + delta ** 4 * nanb_n * np.where(n > 0, (na * na - na * nb + nb * nb) / n ** 2, 0.0)
+                  + 6 * delta ** 2 * np.where(n > 0, (na * na * other.m2 + nb * nb * self.m2) / n ** 2, 0.0)
+                  + 4 * delta * np.where(n > 0, (na * other.m3 - nb * self.m3) / n, 0.0))
+
+        self.count, self.mean, self.m2, self.m3, self.m4 = n, mean, m2, m3, m4
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        return self
+
+    def variance(self, ddof=1):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > ddof, self.m2 / (self.count - ddof), np.nan)
+
+    def std(self, ddof=1):
+        return np.sqrt(self.variance(ddof))
+
+    def skewness(self, bias=False):
+        # Adjusted Fisher-Pearson coefficient, as returned by pandas' skew();
+        # bias=True gives the plain g1 of scipy.stats.skew.
+        n = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            g1 = np.sqrt(n) * self.m3 / self.m2 ** 1.5
+            if bias:
+                return np.where((n > 0) & (self.m2 > 0), g1, np.nan)
+            g1 = np.where(self.m2 > 0, g1, 0.0)
+            return np.where(n > 2, g1 * np.sqrt(n * (n - 1)) / (n - 2), np.nan)
+
+    def kurtosis(self, bias=False):
+        # Unbiased excess kurtosis, as returned by pandas' kurtosis();
+        # bias=True gives the plain g2 of scipy.stats.kurtosis.
+        n = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            g2 = n * self.m4 / self.m2 ** 2 - 3
+            if bias:
+                return np.where((n > 0) & (self.m2 > 0), g2, np.nan)
+            kurt = np.where(self.m2 > 0, ((n + 1) * g2 + 6) * (n - 1) / ((n - 2) * (n - 3)), 0.0)
+            return np.where(n > 3, kurt, np.nan)
+
+
+def exact_quantiles(df, columns, probabilities):
+    # Read from the frame on demand, one column at a time, so exact
+    # statistics retain no values and the transient copy is a single column.
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    result = np.full((len(probabilities), len(columns)), np.nan)
+    for j, col in enumerate(columns):
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if len(values):
+            result[:, j] = np.quantile(values, probabilities)
+    return result
+
+
+class KLLSketch:
+
+    # KLL (Karnin, Lang & Liberty 2016): each column keeps a stack of sorted
+    # compactors whose items weigh 2**level. A full compactor sorts itself and
+    # promotes every other item, chosen from a random offset, to the next level,
+    # so memory stays O(k log(n / k)) per column whatever the stream length.
+    CAPACITY_DECAY = 2 / 3
+
+    def __init__(self, n_columns, k=200, seed=None):
+        self.n_columns = n_columns
+        self.k = k
+        self.count = np.zeros(n_columns, dtype=np.int64)
+        self._levels = [[np.empty(0)] for _ in range(n_columns)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def rank_error(self):
+        # Normalised rank error of a single quantile at 99% confidence, from
+        # the empirical fit published with the Apache DataSketches KLL sketch.
+        return 2.446 / self.k ** 0.9433
+
+    def _capacity(self, height, level):
+        return max(int(np.ceil(self.k * self.CAPACITY_DECAY ** (height - level - 1))), 2)
+
+    def _compress(self, levels):
+        level = 0
+        while level < len(levels):
+            items = levels[level]
+            if len(items) > self._capacity(len(levels), level):
+                items = np.sort(items)
+                # An odd item out stays behind so the promoted half is exact.
+                kept, items = items[len(items) - len(items) % 2:], items[:len(items) - len(items) % 2]
+                promoted = items[self._rng.integers(2)::2]
+                if level + 1 == len(levels):
+                    levels.append(np.empty(0))
+                levels[level] = kept
+                levels[level + 1] = np.concatenate([levels[level + 1], promoted])
+            level += 1
+
+    def update(self, data):
+        values = _as_matrix(data)
+        for j in range(self.n_columns):
+            column = values[:, j]
+            column = column[~np.isnan(column)]
+            if len(column):
+                self.count[j] += len(column)
+                levels = self._levels[j]
+                levels[0] = np.concatenate([levels[0], column])
+                self._compress(levels)
+        return self
+
+    def merge(self, other):
+        for j in range(self.n_columns):
+            levels = self._levels[j]
+            for level, items in enumerate(other._levels[j]):
+                if level == len(levels):
+                    levels.append(np.empty(0))
+                levels[level] = np.concatenate([levels[level], items])
+            self._compress(levels)
+        self.count += other.count
+        return self
+
+    def quantiles(self, probabilities):
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        result = np.full((len(probabilities), self.n_columns), np.nan)
+        for j, levels in enumerate(self._levels):
+            if not self.count[j]:
+                continue
+            items = np.concatenate(levels)
+            weights = np.concatenate([np.full(len(level_items), 2.0 ** level)
+                                      for level, level_items in enumerate(levels)])
+            order = np.argsort(items, kind='stable')
+            items, cumulative = items[order], np.cumsum(weights[order])
+            positions = np.searchsorted(cumulative, probabilities * cumulative[-1], side='left')
+            result[:, j] = items[np.minimum(positions, len(items) - 1)]
+        return result
+
+
+class ColumnStatistics:
+
+    QUANTILES = (0.25, 0.5, 0.75)
+
+    def __init__(self, columns, approximate=False, k=200):
+        self.columns = list(columns)
+        self.approximate = approximate
+        self.moments = MomentAccumulator(len(self.columns))
+        # Exact statistics keep only the moments; their quantiles are read
+        # from the data when asked for (see quantiles()).
+        self.sketch = KLLSketch(len(self.columns), k=k) if approximate else None
+
+    @classmethod
+    def from_frame(cls, df, approximate=False):
+        col_stats = cls(df.columns, approximate=approximate)
+        col_stats.update(df)
+        return col_stats
+
+    def quantiles(self, probabilities, df=None):
+        if self.sketch is not None:
+            return self.sketch.quantiles(probabilities)
+        if df is None:
+            raise ValueError("Exact quantiles are computed from the data; pass df or use approximate=True")
+        return exact_quantiles(df, self.columns, probabilities)
+
+    def update(self, chunk):
+        values = _as_matrix(chunk[self.columns] if isinstance(chunk, pd.DataFrame) else chunk)
+        self.moments.merge(MomentAccumulator.from_values(values))
+        if self.sketch is not None:
+            self.sketch.update(values)
+        return self
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        if self.sketch is not None:
+            self.sketch.merge(other.sketch)
+        return self
+
+    def to_frame(self, df=None):
+        q1, median, q3 = self.quantiles(self.QUANTILES, df)
+        moments = self.moments
+        rows = {
+            'count': moments.count,
+            'mean': np.where(moments.count > 0, moments.mean, np.nan),
+            'std': moments.std(),
+            'min': moments.min,
+            '25%': q1,
+            '50%': median,
+            '75%': q3,
+            'max': moments.max,
+            'variance': moments.variance(),
+            'skewness': moments.skewness(),
+            'kurtosis': moments.kurtosis(),
+            'range': moments.max - moments.min,
+            'iqr': q3 - q1,
+        }
+        return pd.DataFrame(rows, index=self.columns).T
+
+
+class CoMomentAccumulator:
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.shift = None
+        self.count = np.zeros((k, k))
+        self.sum_x = np.zeros((k, k))
+        self.sum_xx = np.zeros((k, k))
+        self.sum_xy = np.zeros((k, k))
+
+    def update(self, chunk):
+        values = _as_matrix(chunk[self.columns] if isinstance(chunk, pd.DataFrame) else chunk)
+        if self.shift is None:
+            # Sums are kept about a fixed per-column shift (the first chunk's
+            # means) to avoid cancellation when means are large.
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                self.shift = np.nan_to_num(np.nanmean(values, axis=0))
+
+        valid = ~np.isnan(values)
+        present = valid.astype(np.float64)
+        centered = np.where(valid, values - self.shift, 0.0)
+
+        # Entry [i, j] only counts rows where both column i and column j are
+        # present, matching the pairwise-complete behaviour of DataFrame.corr.
+        self.count += present.T @ present
+        self.sum_x += centered.T @ present
+        self.sum_xx += (centered * centered).T @ present
+        self.sum_xy += centered.T @ centered
+        return self
+
+    def _reshifted(self, shift):
+        delta = self.shift - shift
+        sum_x = self.sum_x + delta[:, None] * self.count
+        sum_xx = self.sum_xx + 2 * delta[:, None] * self.sum_x + delta[:, None] ** 2 * self.count
+        sum_xy = (self.sum_xy + delta[None, :] * self.sum_x + delta[:, None] * self.sum_x.T
+                  + np.outer(delta, delta) * self.count)
+        return sum_x, sum_xx, sum_xy
+
+    def merge(self, other):
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.shift = other.shift.copy()
+        sum_x, sum_xx, sum_xy = other._reshifted(self.shift)
+        self.count += other.count
+        self.sum_x += sum_x
+        self.sum_xx += sum_xx
+        self.sum_xy += sum_xy
+        return self
+
+    def correlation(self):
+        n = self.count
+        sum_y = self.sum_x.T
+        sum_yy = self.sum_xx.T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = n * self.sum_xy - self.sum_x * sum_y
+            var_x = n * self.sum_xx - self.sum_x ** 2
+            var_y = n * sum_yy - sum_y ** 2
+            corr = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+        corr[(n < 2) | (var_x <= 0) | (var_y <= 0)] = np.nan
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+class RegressionAccumulator:
+
+    def __init__(self, n_columns):
+        self.shift = None
+        self.count = np.zeros(n_columns)
+        self.sum_x = np.zeros(n_columns)
+        self.sum_y = np.zeros(n_columns)
+        self.sum_xx = np.zeros(n_columns)
+        self.sum_xy = np.zeros(n_columns)
+        self.sum_yy = np.zeros(n_columns)
+
+    def update(self, x, y):
+        y = _as_matrix(y)
+        x = np.asarray(x, dtype=np.float64)
+        valid = ~np.isnan(y) & ~np.isnan(x)[:, None]
+        if self.shift is None:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                self.shift = np.nan_to_num(np.nanmean(np.where(valid, y, np.nan), axis=0))
+        xs = np.where(valid, x[:, None], 0.0)
+        ys = np.where(valid, y - self.shift, 0.0)
+
+        self.count += valid.sum(axis=0)
+        self.sum_x += xs.sum(axis=0)
+        self.sum_y += ys.sum(axis=0)
+        self.sum_xx += (xs * xs).sum(axis=0)
+        self.sum_xy += (xs * ys).sum(axis=0)
+        self.sum_yy += (ys * ys).sum(axis=0)
+        return self
+
+    def merge(self, other):
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.shift = other.shift.copy()
+        delta = other.shift - self.shift
+        self.count = self.count + other.count
+        self.sum_x = self.sum_x + other.sum_x
+        self.sum_xx = self.sum_xx + other.sum_xx
+        self.sum_xy = self.sum_xy + other.sum_xy + delta * other.sum_x
+        self.sum_yy = self.sum_yy + other.sum_yy + 2 * delta * other.sum_y + delta ** 2 * other.count
+        self.sum_y = self.sum_y + other.sum_y + delta * other.count
+        return self
+
+    def fit(self):
+        n = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sxx = self.sum_xx - self.sum_x ** 2 / n
+            syy = self.sum_yy - self.sum_y ** 2 / n
+            sxy = self.sum_xy - self.sum_x * self.sum_y / n
+            slope = sxy / sxx
+            intercept = (self.sum_y - slope * self.sum_x) / n + self.shift
+            r = np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0)
+            r = np.where(syy > 0, r, 0.0)
+        return n, slope, intercept, r
@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.spatial.distance import squareform
+from scipy.stats import rankdata
+
+
+def _pearson_columns(x, values):
+    # Correlation of the complete vector ``x`` with each complete column.
+    if len(x) < 2:
+        return np.full(values.shape[1], np.nan)
+    x = x - x.mean()
+    values = values - values.mean(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = (x @ values) / np.sqrt((x @ x) * (values * values).sum(axis=0))
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _spearman_against(values, column):
+    # Spearman correlation of ``column`` (no missing values) with each column
+    # of ``values``, ranking both over the rows where both are present.
+    result = np.full(values.shape[1], np.nan)
+    missing = np.isnan(values)
+    complete = ~missing.any(axis=0)
+    if complete.any():
+        result[complete] = _pearson_columns(rankdata(column), rankdata(values[:, complete], axis=0))
+    for j in np.flatnonzero(~complete):
+        rows = ~missing[:, j]
+        result[j] = _pearson_columns(rankdata(column[rows]), rankdata(values[rows, j])[:, None])[0]
+    return result
+
+
+class CorrelationEngine:
+
+    # Correlations are produced block by block with matrix products. Each
+    # block of columns is prepared from the frame when it is needed (ranked
+    # for Spearman, centred and, without missing values, scaled to unit norm)
+    # and dropped afterwards, so the engine keeps no copy of the data between
+    # calls. Spearman pairs involving a column with missing values are ranked
+    # again over their shared rows, so results match DataFrame.corr exactly.
+    # Strong pairs are read out of each block as it is computed, so the full
+    # k x k matrix is only built when it is actually asked for.
+
+    METHODS = ('pearson', 'spearman')
+
+    def __init__(self, df, columns=None, method='pearson', block_size=512):
+        if method not in self.METHODS:
+            raise ValueError(f"Unsupported method '{method}', expected one of {self.METHODS}")
+        self.df = df
+        self.columns = list(columns) if columns is not None else df.columns.tolist()
+        self.method = method
+        self.block_size = block_size
+        self._matrix = None
+
+    def _blocks(self):
+        k = len(self.columns)
+        return [(start, min(start + self.block_size, k)) for start in range(0, k, self.block_size)]
+
+    def _prepare(self, bounds):
+        data = self.df[self.columns[bounds[0]:bounds[1]]]
+        raw = None
+        if self.method == 'spearman':
+            raw = data.to_numpy(dtype=np.float64, na_value=np.nan)
+            data = data.rank(method='average')
+        values = data.to_numpy(dtype=np.float64, na_value=np.nan)
+
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, np.where(valid, values, 0.0).sum(axis=0) / np.maximum(count, 1), 0.0)
+        centered = np.where(valid, values - mean, 0.0)
+        if not valid.all():
+            return {'present': valid.astype(np.float64), 'centered': centered, 'raw': raw}
+
+        norm = np.sqrt((centered * centered).sum(axis=0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            standardized = centered / norm
+        return {'present': None, 'centered': centered, 'standardized': standardized,
+                'constant': (norm == 0) | (count < 2), 'raw': raw}
+
+    def _block(self, x, y):
+        if x['present'] is None and y['present'] is None:
+            corr = x['standardized'].T @ y['standardized']
+            corr[x['constant'], :] = np.nan
+            corr[:, y['constant']] = np.nan
+            return np.clip(corr, -1.0, 1.0)
+
+        # Pairwise-complete sums over the rows where both columns are present,
+        # as DataFrame.corr does.
+        x_values, y_values = x['centered'], y['centered']
+        present_x = x['present'] if x['present'] is not None else np.ones_like(x_values)
+        present_y = y['present'] if y['present'] is not None else np.ones_like(y_values)
+        n = present_x.T @ present_y
+        sum_x = x_values.T @ present_y
+        sum_y = present_x.T @ y_values
+        sum_xx = (x_values * x_values).T @ present_y
+        sum_yy = present_x.T @ (y_values * y_values)
+        sum_xy = x_values.T @ y_values
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var_x = n * sum_xx - sum_x ** 2
+            var_y = n * sum_yy - sum_y ** 2
+            corr = np.clip((n * sum_xy - sum_x * sum_y) / np.sqrt(var_x * var_y), -1.0, 1.0)
+        corr[(n < 2) | (var_x <= 0) | (var_y <= 0)] = np.nan
+        if self.method == 'spearman':
+            self._rerank_missing(corr, x, y)
+        return corr
+
+    def _rerank_missing(self, corr, x, y):
+        # Ranks taken over each whole column are only right for pairs of
+        # complete columns; pairs involving a column with missing values are
+        # ranked again over the rows both have, as DataFrame.corr does.
+        x_missing = np.zeros(corr.shape[0], dtype=bool)
+        if x['present'] is not None:
+            x_missing = (x['present'] == 0).any(axis=0)
+            for i in np.flatnonzero(x_missing):
+                rows = x['present'][:, i] == 1
+                corr[i, :] = _spearman_against(y['raw'][rows], x['raw'][rows, i])
+        if y is x:
+            # Diagonal block: the columns were filled in as rows above.
+            corr[:, x_missing] = corr[x_missing, :].T
+        elif y['present'] is not None:
+            # Rows already re-ranked above are skipped.
+            for j in np.flatnonzero((y['present'] == 0).any(axis=0)):
+                rows = y['present'][:, j] == 1
+                corr[~x_missing, j] = _spearman_against(x['raw'][rows][:, ~x_missing], y['raw'][rows, j])
+
+    def block(self, rows, cols):
+        x = self._prepare(rows)
+        return self._block(x, x if cols == rows else self._prepare(cols))
+
+    def _upper_blocks(self):
+        # Yields (rows, cols, values) for the blocks on and above the
+        # diagonal; each row block is prepared once for its whole row.
+        blocks = self._blocks()
+        for index, rows in enumerate(blocks):
+            x = self._prepare(rows)
+            for cols in blocks[index:]:
+                yield rows, cols, self._block(x, x if cols == rows else self._prepare(cols))
+
+    def matrix(self):
+        if self._matrix is None:
+            k = len(self.columns)
+            corr = np.empty((k, k))
+            for rows, cols, values in self._upper_blocks():
+                corr[rows[0]:rows[1], cols[0]:cols[1]] = values
+                corr[cols[0]:cols[1], rows[0]:rows[1]] = values.T
+            self._matrix = pd.DataFrame(corr, index=self.columns, columns=self.columns)
+        return self._matrix
+
+    def strong_pairs(self, threshold=0.7):
+        if self._matrix is not None:
+            return strong_pairs(self._matrix, threshold)
+
+        found_i, found_j, found_values = [], [], []
+        for rows, cols, values in self._upper_blocks():
+            hits = np.abs(values) >= threshold
+            if rows == cols:
+                hits &= np.triu(np.ones(hits.shape, dtype=bool), k=1)
+            i, j = np.nonzero(hits)
+            found_i.append(i + rows[0])
+            found_j.append(j + cols[0])
+            found_values.append(values[i, j])
+        return _sorted_pairs(self.columns, found_i, found_j, found_values)
+
+
+def _sorted_pairs(columns, found_i, found_j, found_values):
+    if not found_values:
+        return []
+    i, j, values = np.concatenate(found_i), np.concatenate(found_j), np.concatenate(found_values)
+    order = np.argsort(-np.abs(values), kind='stable')
+    return [(columns[i[n]], columns[j[n]], values[n]) for n in order]
+
+
+def strong_pairs(corr_matrix, threshold=0.7):
+    # Upper-triangle pairs of an existing matrix at or above |threshold|,
+    # strongest first.
+    values = corr_matrix.to_numpy()
+    i, j = np.triu_indices(len(values), k=1)
+    pair_values = values[i, j]
+    hits = np.abs(pair_values) >= threshold
+    return _sorted_pairs(corr_matrix.columns, [i[hits]], [j[hits]], [pair_values[hits]])
+
+
+def cluster_order(corr_matrix):
+    # Average-linkage clustering on 1 - |r| so strongly related columns
+    # (either sign) end up next to each other.
+    values = corr_matrix.to_numpy(dtype=np.float64)
+    if len(values) < 3:
+        return np.arange(len(values))
+    distance = 1.0 - np.abs(np.nan_to_num(values, nan=0.0))
+    distance = np.clip((distance + distance.T) / 2, 0.0, None)
+    np.fill_diagonal(distance, 0.0)
+    return leaves_list(linkage(squareform(distance, checks=False), method='average'))
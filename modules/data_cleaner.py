@@ -1,107 +1,275 @@
 import pandas as pd
 import numpy as np
+from joblib import Parallel, delayed
+
+from modules.data_ingestion import infer_kind
+from modules.duplicate_index import DuplicateIndex
+from modules.imputation import Imputer
+from modules.trend_analyzer import TrendAnalyzer
 
 
 class DataCleaner:
-    
-    def __init__(self, df):
-        self.df = df.copy()
-        self.original_df = df.copy()
+
+    OPERATIONS = ('handle_missing_values', 'remove_duplicates', 'convert_data_types')
+
+    def __init__(self, df, duplicate_index=None):
+        # The original is only referenced. Cleaning state is a mask of kept
+        # rows plus copies of just the columns a step has modified; the cleaned
+        # frame is assembled from both once, when it is asked for.
+        self.original_df = df
+        self.steps = []
+        self._pending = []
+        self._keep = np.ones(len(df), dtype=bool)
+        self._columns = {}
+        self._df = None
+        self.lineage = {}
+        self._duplicate_indexes = {}
+        self.imputers = {}
+        if duplicate_index is not None and not duplicate_index.near:
+            self._duplicate_indexes[self._duplicate_key(duplicate_index.columns)] = duplicate_index
         self.cleaning_report = {
             'original_shape': df.shape,
             'operations': [],
             'final_shape': None
         }
-    
-    def handle_missing_values(self, strategy='mean', columns=None):
+
+    def add_step(self, operation, **params):
+        if operation not in self.OPERATIONS:
+            raise ValueError(f"Unknown cleaning operation '{operation}'")
+        self._pending.append((operation, params))
+        return self
+
+    def run(self, steps=None):
+        for operation, params in steps or []:
+            self.add_step(operation, **params)
+        return self.df
+
+    @property
+    def df(self):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            for operation, params in pending:
+                self.steps.append((operation, params))
+                getattr(self, f'_{operation}')(**params)
+            self._df = None
+        if self._df is None:
+            self._df = self._materialize()
+        return self._df
+
+    def _materialize(self):
+        if not self._columns and self._keep.all():
+            return self.original_df
+        frame = self.original_df.copy(deep=False)
+        for col, values in self._columns.items():
+            frame[col] = values
+        if not self._keep.all():
+            frame = frame[self._keep]
+        return frame
+
+    def _column(self, col):
+        if col in self._columns:
+            return self._columns[col]
+        return self.original_df[col]
+
+    def _set_column(self, col, values):
+        # Lineage maps each modified column to the indices of the steps that
+        # changed it.
+        self._columns[col] = values
+        for key in [key for key in self._duplicate_indexes if key is None or col in key]:
+            del self._duplicate_indexes[key]
+        steps = self.lineage.setdefault(col, [])
+        if not steps or steps[-1] != len(self.steps) - 1:
+            steps.append(len(self.steps) - 1)
+
+    def _write_filled(self, col, filled):
+        # Filled values cover the kept rows only and are written back into a
+        # private copy of the column, so the original is never touched.
+        values = self._column(col)
+        missing = values[self._keep].isna().to_numpy()
+        filled = np.asarray(filled)
+        filled_missing = missing & ~pd.isna(filled)
+        if not filled_missing.any():
+            return 0
+        # A column already copied by an earlier step is updated in place.
+        updated = values if col in self._columns else values.copy()
+        positions = np.flatnonzero(self._keep)[filled_missing]
+        updated.iloc[positions] = filled[filled_missing]
+        self._set_column(col, updated)
+        return int(filled_missing.sum())
+
+    def _kept_frame(self, columns):
+        return pd.DataFrame({col: self._column(col)[self._keep] for col in columns})
+
+    def _time_values(self, time_column):
+        analyzer = TrendAnalyzer(self.original_df)
+        time_column = time_column or analyzer.detect_time_column()
+        if time_column is None:
+            return None, None
+        return time_column, np.asarray(analyzer.get_time_values(time_column))[self._keep]
+
+    def _handle_missing_values(self, strategy='mean', columns=None, group_by=None, time_column=None,
+                               n_neighbors=5):
         if columns is None:
-            columns = self.df.columns.tolist()
-        
-        initial_nulls = self.df.isnull().sum().sum()
-        
+            columns = self.original_df.columns.tolist()
+
+        nulls_removed = 0
         if strategy == 'drop':
-            self.df = self.df.dropna(subset=columns)
-        elif strategy == 'mean':
-            for col in columns:
-                if self.df[col].dtype in ['int64', 'float64']:
-                    self.df[col].fillna(self.df[col].mean(), inplace=True)
-        elif strategy == 'median':
+            missing = np.zeros(len(self._keep), dtype=bool)
             for col in columns:
-                if self.df[col].dtype in ['int64', 'float64']:
-                    self.df[col].fillna(self.df[col].median(), inplace=True)
-        elif strategy == 'mode':
+                missing |= self._column(col).isna().to_numpy()
+            dropped = self._keep & missing
+            nulls_removed = sum(int(self._column(col)[dropped].isna().sum()) for col in self.original_df.columns)
+            self._keep &= ~missing
+        elif strategy in ('forward_fill', 'backward_fill'):
+            kept = self._kept_frame(columns)
+            filled = kept.ffill() if strategy == 'forward_fill' else kept.bfill()
             for col in columns:
-                if not self.df[col].mode().empty:
-                    self.df[col].fillna(self.df[col].mode()[0], inplace=True)
-        elif strategy == 'forward_fill':
-            self.df[columns] = self.df[columns].fillna(method='ffill')
-        elif strategy == 'backward_fill':
-            self.df[columns] = self.df[columns].fillna(method='bfill')
-        
-        final_nulls = self.df.isnull().sum().sum()
-        
+                nulls_removed += self._write_filled(col, filled[col])
+        elif strategy in Imputer.STRATEGIES:
+            # Fill values for all columns come from one fitted Imputer, kept in
+            # self.imputers so they can be applied to later chunks or appends.
+            time_values = None
+            if strategy == 'interpolate':
+                time_column, time_values = self._time_values(time_column)
+            frame_columns = list(dict.fromkeys(columns + [c for c in (group_by,) if c is not None]))
+            kept = self._kept_frame(frame_columns)
+            imputer = Imputer(strategy, group_by=group_by, time_column=time_column, n_neighbors=n_neighbors)
+            filled = imputer.fit_transform(kept, columns, time_values=time_values)
+            self.imputers[(strategy, group_by)] = imputer
+            for col in filled.columns:
+                nulls_removed += self._write_filled(col, filled[col].to_numpy())
+
         self.cleaning_report['operations'].append({
             'operation': 'handle_missing_values',
             'strategy': strategy,
             'columns': columns,
-            'nulls_removed': initial_nulls - final_nulls
+            'nulls_removed': nulls_removed
         })
-        
-        return self.df
-    
-    def remove_duplicates(self, subset=None, keep='first'):
-        initial_rows = len(self.df)
-        self.df = self.df.drop_duplicates(subset=subset, keep=keep)
-        final_rows = len(self.df)
-        
+
+    def _duplicate_key(self, columns):
+        if columns is None or list(columns) == self.original_df.columns.tolist():
+            return None
+        return tuple([columns] if isinstance(columns, str) else columns)
+
+    def _key_frame(self, key):
+        columns = self.original_df.columns.tolist() if key is None else list(key)
+        return pd.DataFrame({col: self._column(col) for col in columns}, copy=False)
+
+    def duplicate_index(self, subset=None):
+        # Row hashes over all original rows, built once per key and reused
+        # until a step modifies one of its columns; queries pass the kept rows.
+        key = self._duplicate_key(subset)
+        if key not in self._duplicate_indexes:
+            self._duplicate_indexes[key] = DuplicateIndex.from_frame(self._key_frame(key))
+        return self._duplicate_indexes[key]
+
+    def _remove_duplicates(self, subset=None, keep='first'):
+        # Hash matches are confirmed on the values before any row is dropped.
+        positions = np.flatnonzero(self._keep)
+        frame = self._key_frame(self._duplicate_key(subset))
+        duplicated = self.duplicate_index(subset).duplicated(keep=keep, positions=positions, frame=frame)
+        self._keep[positions[duplicated]] = False
+
         self.cleaning_report['operations'].append({
             'operation': 'remove_duplicates',
-            'duplicates_removed': initial_rows - final_rows
+            'duplicates_removed': int(duplicated.sum())
         })
-        
-        return self.df
-    
-    def convert_data_types(self, type_map=None):
+
+    def _infer_column(self, col, sample_size, category_ratio):
+        values = self._column(col)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return None, None
+        sample = values.dropna()
+        if len(sample) > sample_size:
+            sample = sample.sample(n=sample_size, random_state=0)
+        return infer_kind(sample, category_ratio)
+
+    def _convert_column(self, values, kind, date_format, downcast_floats):
+        # The kind comes from a sample, so a conversion that turns values the
+        # sample did not see into NaN/NaT is rejected and the column kept as is.
+        if kind in ('integer', 'float'):
+            converted = values if pd.api.types.is_numeric_dtype(values) else pd.to_numeric(values, errors='coerce')
+            if pd.api.types.is_integer_dtype(converted) or (kind == 'integer' and converted.notna().all()):
+                converted = pd.to_numeric(converted, downcast='integer')
+            elif downcast_floats:
+                converted = pd.to_numeric(converted, downcast='float')
+        elif kind == 'datetime':
+            if pd.api.types.is_datetime64_any_dtype(values):
+                return None
+            converted = pd.to_datetime(values, format=date_format, errors='coerce')
+        elif kind == 'category':
+            converted = values.astype('category')
+        else:
+            return None
+
+        if converted.dtype == values.dtype or converted.isna().sum() > values.isna().sum():
+            return None
+        return converted
+
+    def _convert_data_types(self, type_map=None, sample_size=1000, category_ratio=0.05, downcast_floats=False,
+                            n_jobs=1):
         if type_map is None:
+            # Every column is classified from a sample first, then all columns
+            # are converted in one pass (in threads when n_jobs != 1).
+            columns = self.original_df.columns.tolist()
+            kinds = [self._infer_column(col, sample_size, category_ratio) for col in columns]
+            converted = Parallel(n_jobs=n_jobs, prefer='threads')(
+                delayed(self._convert_column)(self._column(col), kind, date_format, downcast_floats)
+                for col, (kind, date_format) in zip(columns, kinds)
+            )
             type_map = {}
-            for col in self.df.columns:
-                if self.df[col].dtype == 'object':
-                    try:
-                        self.df[col] = pd.to_numeric(self.df[col])
-                        type_map[col] = 'numeric'
-                    except:
-                        try:
-                            self.df[col] = pd.to_datetime(self.df[col])
-                            type_map[col] = 'datetime'
-                        except:
-                            type_map[col] = 'string'
+            for col, (kind, _), values in zip(columns, kinds, converted):
+                if values is not None:
+                    self._set_column(col, values)
+                    type_map[col] = kind
         else:
             for col, dtype in type_map.items():
-                if col in self.df.columns:
+                if col in self.original_df.columns:
+                    values = self._column(col)
                     try:
                         if dtype in ['int', 'int64']:
-                            self.df[col] = self.df[col].astype('int64')
+                            self._set_column(col, values.astype('int64'))
                         elif dtype in ['float', 'float64']:
-                            self.df[col] = self.df[col].astype('float64')
+                            self._set_column(col, values.astype('float64'))
                         elif dtype == 'datetime':
-                            self.df[col] = pd.to_datetime(self.df[col])
+                            self._set_column(col, pd.to_datetime(values))
                         elif dtype == 'category':
-                            self.df[col] = self.df[col].astype('category')
+                            self._set_column(col, values.astype('category'))
                     except:
                         pass
-        
+
         self.cleaning_report['operations'].append({
             'operation': 'convert_data_types',
             'conversions': type_map
         })
-        
-        return self.df
-    
+
+    # The methods below only record their step and return the cleaner, so
+    # calls chain (cleaner.remove_duplicates().convert_data_types().df) and
+    # the frame is assembled once for all of them.
+
+    def handle_missing_values(self, strategy='mean', columns=None, group_by=None, time_column=None,
+                              n_neighbors=5):
+        return self.add_step(
+            'handle_missing_values', strategy=strategy, columns=columns, group_by=group_by,
+            time_column=time_column, n_neighbors=n_neighbors
+        )
+
+    def remove_duplicates(self, subset=None, keep='first'):
+        return self.add_step('remove_duplicates', subset=subset, keep=keep)
+
+    def convert_data_types(self, type_map=None, sample_size=1000, category_ratio=0.05, downcast_floats=False,
+                           n_jobs=1):
+        return self.add_step(
+            'convert_data_types', type_map=type_map, sample_size=sample_size, category_ratio=category_ratio,
+            downcast_floats=downcast_floats, n_jobs=n_jobs
+        )
+
     def get_cleaning_report(self):
-        self.cleaning_report['final_shape'] = self.df.shape
-        self.cleaning_report['rows_removed'] = self.original_df.shape[0] - self.df.shape[0]
-        self.cleaning_report['columns_removed'] = self.original_df.shape[1] - self.df.shape[1]
+        df = self.df
+        self.cleaning_report['final_shape'] = df.shape
+        self.cleaning_report['rows_removed'] = int((~self._keep).sum())
+        self.cleaning_report['columns_removed'] = self.original_df.shape[1] - df.shape[1]
         return self.cleaning_report
-    
+
     def get_cleaned_data(self):
         return self.df
@@ -0,0 +1,257 @@
+import os
+import warnings
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.api.types import union_categoricals
+
+
+def memory_footprint(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def infer_kind(series, category_ratio=0.05):
+    # Classifies a column from a (sample) series as integer, float, bool,
+    # datetime (with its format), category or string.
+    if pd.api.types.is_bool_dtype(series):
+        return 'bool', None
+    if pd.api.types.is_integer_dtype(series):
+        return 'integer', None
+    if pd.api.types.is_float_dtype(series):
+        return 'float', None
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'datetime', None
+
+    values = series.dropna().astype(str)
+    if values.empty:
+        return 'string', None
+
+    numbers = pd.to_numeric(values, errors='coerce')
+    if numbers.notna().all():
+        integral = (numbers == numbers.round()).all() and not values.str.contains(r'[.eE]', regex=True).any()
+        return ('integer' if integral else 'float'), None
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        date_format = pd.tseries.api.guess_datetime_format(values.iloc[0])
+    if date_format is not None:
+        parsed = pd.to_datetime(values, format=date_format, errors='coerce')
+        if parsed.notna().all():
+            return 'datetime', date_format
+
+    if values.nunique() <= max(1, int(len(values) * category_ratio)):
+        return 'category', None
+    return 'string', None
+
+
+class DateFormatMismatch(ValueError):
+
+    def __init__(self, column, date_format, failed):
+        super().__init__(f"{failed:,} values in column '{column}' do not match the date format {date_format!r}")
+        self.column = column
+
+
+class CSVIngestor:
+
+    ARROW_TYPES = {
+        'integer': pa.int64(),
+        'float': pa.float64(),
+        'bool': pa.bool_(),
+        'datetime': pa.timestamp('ns'),
+        'category': pa.string(),
+        'string': pa.string(),
+    }
+
+    def __init__(self, sample_rows=10000, memory_budget_mb=2048, category_ratio=0.05,
+                 downcast_floats=True, chunk_budget_fraction=0.1):
+        self.sample_rows = sample_rows
+        self.memory_budget = int(memory_budget_mb * 1024 ** 2)
+        self.category_ratio = category_ratio
+        self.downcast_floats = downcast_floats
+        self.chunk_budget_fraction = chunk_budget_fraction
+        self.column_kinds = {}
+        self.date_formats = {}
+        self.memory_usage = 0
+
+    @property
+    def settings(self):
+        # Everything that can change what read() returns; callers caching
+        # parsed files key on it.
+        return {
+            'sample_rows': self.sample_rows,
+            'memory_budget': self.memory_budget,
+            'category_ratio': self.category_ratio,
+            'downcast_floats': self.downcast_floats,
+            'chunk_budget_fraction': self.chunk_budget_fraction,
+        }
+
+    def _open(self, source):
+        if isinstance(source, (str, os.PathLike)):
+            return open(source, 'rb'), True
+        source.seek(0)
+        return source, False
+
+    def _source_size(self, handle):
+        position = handle.tell()
+        handle.seek(0, os.SEEK_END)
+        size = handle.tell()
+        handle.seek(position)
+        return size
+
+    def _infer_kind(self, series):
+        kind, date_format = infer_kind(series, self.category_ratio)
+        if date_format is not None:
+            self.date_formats[series.name] = date_format
+        return kind
+
+    def infer_dtypes(self, source, **options):
+        handle, owned = self._open(source)
+        try:
+            sample = pd.read_csv(handle, nrows=self.sample_rows, **options)
+        finally:
+            if owned:
+                handle.close()
+            else:
+                handle.seek(0)
+
+        self.date_formats = {}
+        self.column_kinds = {col: self._infer_kind(sample[col]) for col in sample.columns}
+        return self.column_kinds, sample
+
+    def _read_dtypes(self):
+        # Strings are read as categories chunk by chunk and unioned at the end;
+        # dates are read as strings and parsed with the format found in the sample.
+        dtypes = {}
+        for col, kind in self.column_kinds.items():
+            if kind == 'category':
+                dtypes[col] = 'category'
+            elif kind in ('datetime', 'string'):
+                dtypes[col] = 'object'
+        return dtypes
+
+    def _compact_chunk(self, chunk):
+        for col, kind in self.column_kinds.items():
+            if col not in chunk.columns:
+                continue
+            if kind == 'integer' and pd.api.types.is_integer_dtype(chunk[col]):
+                chunk[col] = pd.to_numeric(chunk[col], downcast='integer')
+            elif kind == 'float' or (kind == 'integer' and pd.api.types.is_float_dtype(chunk[col])):
+                if self.downcast_floats:
+                    chunk[col] = pd.to_numeric(chunk[col], downcast='float')
+            elif kind == 'datetime':
+                # The format comes from the sample; values it cannot parse must
+                # not silently become NaT.
+                parsed = pd.to_datetime(chunk[col], format=self.date_formats[col], errors='coerce')
+                failed = int(parsed.isna().sum() - chunk[col].isna().sum())
+                if failed:
+                    raise DateFormatMismatch(col, self.date_formats[col], failed)
+                chunk[col] = parsed
+        return chunk
+
+    def _with_date_fallback(self, attempt):
+        # A date column whose later rows break the sampled format is read
+        # again as strings, keeping every value, and the read starts over.
+        while True:
+            try:
+                return attempt()
+            except DateFormatMismatch as e:
+                warnings.warn(f"{e}; reading it as text instead")
+                self.column_kinds[e.column] = 'string'
+                self.date_formats.pop(e.column, None)
+
+    def _chunk_rows(self, sample):
+        if sample.empty:
+            return self.sample_rows
+        bytes_per_row = memory_footprint(self._compact_chunk(sample.copy())) / len(sample)
+        chunk_bytes = self.memory_budget * self.chunk_budget_fraction
+        return max(1000, int(chunk_bytes / max(bytes_per_row, 1)))
+
+    def _combine(self, chunks):
+        if len(chunks) == 1:
+            return chunks[0]
+
+        categorical = [col for col, kind in self.column_kinds.items() if kind == 'category']
+        unioned = {
+            col: union_categoricals([chunk[col] for chunk in chunks], ignore_order=True)
+            for col in categorical
+        }
+        df = pd.concat([chunk.drop(columns=categorical) for chunk in chunks], ignore_index=True)
+        for col in categorical:
+            df[col] = pd.Categorical(unioned[col])
+        return df[chunks[0].columns]
+
+    def read(self, source, progress=None, **options):
+        _, sample = self.infer_dtypes(source, **options)
+        chunk_rows = self._chunk_rows(sample)
+        del sample
+
+        return self._with_date_fallback(lambda: self._read_chunks(source, chunk_rows, progress, options))
+
+    def _read_chunks(self, source, chunk_rows, progress, options):
+        handle, owned = self._open(source)
+        try:
+            total_bytes = self._source_size(handle)
+            chunks = []
+            self.memory_usage = 0
+
+            reader = pd.read_csv(handle, dtype=self._read_dtypes(), chunksize=chunk_rows, **options)
+            for chunk in reader:
+                chunk = self._compact_chunk(chunk)
+                self.memory_usage += memory_footprint(chunk)
+                if self.memory_usage > self.memory_budget:
+                    raise MemoryError(
+                        f"Dataset exceeds the memory budget of {self.memory_budget / 1024 ** 2:.0f} MB "
+                        f"after {sum(len(c) for c in chunks) + len(chunk):,} rows"
+                    )
+                chunks.append(chunk)
+
+                if progress is not None and total_bytes:
+                    progress(min(handle.tell() / total_bytes, 1.0))
+        finally:
+            if owned:
+                handle.close()
+            else:
+                handle.seek(0)
+
+        if not chunks:
+            return pd.DataFrame(columns=list(self.column_kinds))
+
+        df = self._combine(chunks)
+        self.memory_usage = memory_footprint(df)
+        if progress is not None:
+            progress(1.0)
+        return df
+
+    def write_parquet(self, source, path, progress=None, **options):
+        # Chunks are written straight to disk against one schema fixed from the
+        # sample, so the file never has to fit in memory (or the budget).
+        _, sample = self.infer_dtypes(source, **options)
+        chunk_rows = self._chunk_rows(sample)
+        del sample
+        self._with_date_fallback(lambda: self._write_chunks(source, path, chunk_rows, progress, options))
+
+        if progress is not None:
+            progress(1.0)
+        return path
+
+    def _write_chunks(self, source, path, chunk_rows, progress, options):
+        schema = pa.schema([(col, self.ARROW_TYPES[kind]) for col, kind in self.column_kinds.items()])
+
+        handle, owned = self._open(source)
+        try:
+            total_bytes = self._source_size(handle)
+            with pq.ParquetWriter(path, schema) as writer:
+                reader = pd.read_csv(handle, dtype=self._read_dtypes(), chunksize=chunk_rows, **options)
+                for chunk in reader:
+                    chunk = self._compact_chunk(chunk)
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+                    if progress is not None and total_bytes:
+                        progress(min(handle.tell() / total_bytes, 1.0))
+        finally:
+            if owned:
+                handle.close()
+            else:
+                handle.seek(0)
+
@@ -0,0 +1,186 @@
+import contextlib
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from modules.data_ingestion import CSVIngestor, memory_footprint
+from modules.lazy_frame import DATASET_FORMATS, LazyFrame
+
+
+class DataLoader:
+
+    # Parsed frames are kept in an LRU bounded by their in-memory size (by
+    # default the ingestor's memory budget, so the cache never holds more than
+    # one budget's worth) and spilled to Parquet files that are evicted by age
+    # and then, least recently used first, by total size.
+
+    def __init__(self, cache_dir='.cache/uploads', memory_budget_mb=None, spill_budget_mb=20480,
+                 spill_max_age_days=7, block_size=8 * 1024 * 1024, ingestor=None):
+        self.cache_dir = cache_dir
+        self.ingestor = ingestor or CSVIngestor()
+        self.memory_usage = 0
+        self.memory_budget = (self.ingestor.memory_budget if memory_budget_mb is None
+                              else int(memory_budget_mb * 1024 ** 2))
+        self.spill_budget = int(spill_budget_mb * 1024 ** 2)
+        self.spill_max_age = spill_max_age_days * 24 * 3600
+        self.block_size = block_size
+        self._memory = OrderedDict()
+        self._cached_bytes = 0
+
+    def _open(self, source):
+        if isinstance(source, (str, os.PathLike)):
+            return open(source, 'rb'), True
+        source.seek(0)
+        return source, False
+
+    def content_key(self, source, **options):
+        hasher = hashlib.sha256()
+        handle, owned = self._open(source)
+        try:
+            for block in iter(lambda: handle.read(self.block_size), b''):
+                hasher.update(block)
+        finally:
+            if owned:
+                handle.close()
+            else:
+                handle.seek(0)
+
+        hasher.update(repr(sorted(options.items())).encode('utf-8'))
+        return hasher.hexdigest()
+
+    def _spill_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def _remember(self, key, df):
+        size = memory_footprint(df)
+        if size > self.memory_budget:
+            # Larger than the whole budget: served from the spill file next time.
+            return
+        self._memory[key] = (df, size)
+        self._cached_bytes += size
+        while self._cached_bytes > self.memory_budget:
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._cached_bytes -= evicted
+
+    def _read_spill(self, key):
+        path = self._spill_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            df = pd.read_parquet(path)
+        except Exception:
+            return None
+        # Marks the file as recently used for _evict_spill.
+        os.utime(path)
+        return df
+
+    def _evict_spill(self, keep):
+        # Other processes may share the directory, so files can vanish while
+        # it is scanned.
+        now = time.time()
+        files = []
+        with contextlib.suppress(FileNotFoundError):
+            for entry in os.scandir(self.cache_dir):
+                if not entry.name.endswith('.parquet') or entry.path == keep:
+                    continue
+                with contextlib.suppress(FileNotFoundError):
+                    stat = entry.stat()
+                    if now - stat.st_mtime > self.spill_max_age:
+                        os.remove(entry.path)
+                    else:
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files) + (os.path.getsize(keep) if os.path.exists(keep) else 0)
+        for _, size, path in sorted(files):
+            if total <= self.spill_budget:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+
+    def _write_spill(self, key, df):
+        path = self._spill_path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            df.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+            self._evict_spill(keep=path)
+        except Exception:
+            # Parquet needs pyarrow and can reject mixed-type object columns;
+            # the in-memory entry still serves this process.
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _parse(self, source, file_type, options, progress):
+        if file_type == 'csv':
+            return self.ingestor.read(source, progress=progress, **options)
+
+        handle, owned = self._open(source)
+        try:
+            return pd.read_excel(handle, **options)
+        finally:
+            if owned:
+                handle.close()
+
+    def _key(self, source, file_type, options):
+        # CSVs are parsed by the ingestor, whose settings shape the result.
+        if file_type == 'csv':
+            options = {**options, 'ingestor': repr(sorted(self.ingestor.settings.items()))}
+        return self.content_key(source, file_type=file_type, **options)
+
+    def load(self, source, name=None, progress=None, **options):
+        if name is None:
+            name = os.fspath(source)
+        file_type = 'csv' if name.lower().endswith('.csv') else 'excel'
+
+        key = self._key(source, file_type, options)
+
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            df = self._memory[key][0]
+        else:
+            df = self._read_spill(key)
+            if df is None:
+                df = self._parse(source, file_type, options, progress)
+                self._write_spill(key, df)
+            self._remember(key, df)
+
+        self.memory_usage = memory_footprint(df)
+        return df
+
+    def load_lazy(self, source, name=None, progress=None, **options):
+        # Arrow/Parquet files are opened in place; CSVs are streamed once into
+        # a Parquet spill file keyed on their content and opened from there.
+        if name is None:
+            name = os.fspath(source)
+        if os.path.splitext(name)[1].lower() in DATASET_FORMATS and isinstance(source, (str, os.PathLike)):
+            return LazyFrame(source)
+
+        key = self._key(source, 'csv', options)
+        path = self._spill_path(key)
+        if not os.path.exists(path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            try:
+                self.ingestor.write_parquet(source, tmp_path, progress=progress, **options)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self._evict_spill(keep=path)
+        else:
+            os.utime(path)
+        self.memory_usage = 0
+        return LazyFrame(path)
+
+    def clear(self, disk=False):
+        self._memory.clear()
+        self._cached_bytes = 0
+        if disk and os.path.isdir(self.cache_dir):
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith('.parquet'):
+                    os.remove(os.path.join(self.cache_dir, filename))
@@ -0,0 +1,119 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from modules.column_stats import _as_matrix
+
+
+class DistributionProfiler:
+
+    # One pass over the data feeds, per column, a hashed value count for the
+    # mode and a bottom-k reservoir (the sample_size values with the smallest
+    # random keys, which is a uniform sample and can be merged). The normality
+    # tests then run on the reservoir only, whatever the column length.
+    # Moments and the median are not kept here: profile() takes them from the
+    # caller's ColumnStatistics so the data is not summarised twice.
+
+    def __init__(self, columns, sample_size=5000, max_distinct=100000, random_state=42):
+        self.columns = list(columns)
+        self.sample_size = sample_size
+        self.max_distinct = max_distinct
+        self.value_counts = [pd.Series(dtype=np.float64) for _ in self.columns]
+        self.exact_counts = np.ones(len(self.columns), dtype=bool)
+        self._samples = [np.empty(0) for _ in self.columns]
+        self._keys = [np.empty(0) for _ in self.columns]
+        self._rng = np.random.default_rng(random_state)
+
+    def _merge_counts(self, j, counts):
+        merged = self.value_counts[j].add(counts, fill_value=0)
+        if len(merged) > self.max_distinct:
+            # Only the most frequent values are kept from here on, so the mode
+            # is no longer guaranteed exact for this column.
+            merged = merged.nlargest(self.max_distinct)
+            self.exact_counts[j] = False
+        self.value_counts[j] = merged
+
+    def _merge_sample(self, j, values, keys):
+        values = np.concatenate([self._samples[j], values])
+        keys = np.concatenate([self._keys[j], keys])
+        if len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size - 1)[:self.sample_size]
+            values, keys = values[keep], keys[keep]
+        self._samples[j], self._keys[j] = values, keys
+
+    def update(self, chunk):
+        values = _as_matrix(chunk[self.columns] if isinstance(chunk, pd.DataFrame) else chunk)
+
+        for j in range(len(self.columns)):
+            column = values[:, j]
+            column = column[~np.isnan(column)]
+            if not len(column):
+                continue
+            self._merge_counts(j, pd.Series(column).value_counts(sort=False))
+
+            keys = self._rng.random(len(column))
+            if len(self._keys[j]) >= self.sample_size:
+                # Only values that beat the current largest key can enter.
+                candidates = keys < self._keys[j].max()
+                column, keys = column[candidates], keys[candidates]
+            self._merge_sample(j, column, keys)
+        return self
+
+    def merge(self, other):
+        for j in range(len(self.columns)):
+            self._merge_counts(j, other.value_counts[j])
+            self._merge_sample(j, other._samples[j], other._keys[j])
+        self.exact_counts &= other.exact_counts
+        return self
+
+    def sample(self, column):
+        return self._samples[self.columns.index(column)]
+
+    def _mode(self, j):
+        counts = self.value_counts[j]
+        if counts.empty:
+            return None
+        # Ties resolve to the smallest value, as Series.mode()[0] does.
+        return counts.index[counts.to_numpy() == counts.max()].min()
+
+    def _normality(self, sample):
+        result = {'shapiro_stat': None, 'shapiro_p': None, 'ks_stat': None, 'ks_p': None}
+        if len(sample) < 3 or np.ptp(sample) == 0:
+            return result
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            result['shapiro_stat'], result['shapiro_p'] = stats.shapiro(sample)
+        result['ks_stat'], result['ks_p'] = stats.kstest(sample, 'norm', args=(sample.mean(), sample.std(ddof=1)))
+        return result
+
+    def profile(self, moments, median):
+        # ``moments`` (a MomentAccumulator) and ``median`` cover self.columns,
+        # in order, over the same rows the profiler has seen.
+        mean = np.where(moments.count > 0, moments.mean, np.nan)
+        std, variance = moments.std(), moments.variance()
+        skewness, kurtosis = moments.skewness(bias=True), moments.kurtosis(bias=True)
+
+        rows = {}
+        for j, col in enumerate(self.columns):
+            sample = self._samples[j]
+            tests = self._normality(sample)
+            rows[col] = {
+                'count': moments.count[j],
+                'mean': mean[j],
+                'median': median[j],
+                'mode': self._mode(j),
+                'mode_exact': bool(self.exact_counts[j]),
+                'std': std[j],
+                'variance': variance[j],
+                'skewness': skewness[j],
+                'kurtosis': kurtosis[j],
+                'min': moments.min[j],
+                'max': moments.max[j],
+                'sample_size': len(sample),
+                **tests,
+                'is_normal_shapiro': tests['shapiro_p'] is not None and tests['shapiro_p'] > 0.05,
+                'is_normal_ks': tests['ks_p'] is not None and tests['ks_p'] > 0.05,
+            }
+        return pd.DataFrame.from_dict(rows, orient='index')
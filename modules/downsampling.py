@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    if np.issubdtype(values.dtype, np.timedelta64):
+        return values.astype('timedelta64[ns]').astype(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    # Largest-Triangle-Three-Buckets (Steinarsson 2013): keeps the first and
+    # last points and, per bucket, the point forming the largest triangle with
+    # the previously kept point and the mean of the next bucket.
+    x = _as_float(x)
+    y = _as_float(y)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    bounds = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = bounds[i], bounds[i + 1]
+        next_stop = bounds[i + 2] if i + 2 < len(bounds) else n
+        next_start = stop if i + 2 < len(bounds) else n - 1
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+
+    return selected
+
+
+def minmax_indices(y, n_bins):
+    # Keeps the minimum and maximum of each equal-width bin of positions,
+    # which preserves the visual envelope (spikes included) of a line.
+    y = _as_float(y)
+    n = len(y)
+    if 2 * n_bins >= n or n_bins < 1:
+        return np.arange(n)
+
+    bin_size = int(np.ceil(n / n_bins))
+    padded = np.full(bin_size * n_bins, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(n_bins, bin_size)
+
+    filled = ~np.isnan(blocks).all(axis=1)
+    offsets = np.arange(n_bins)[filled] * bin_size
+    argmin = np.nanargmin(blocks[filled], axis=1) + offsets
+    argmax = np.nanargmax(blocks[filled], axis=1) + offsets
+    return np.unique(np.concatenate([[0, n - 1], argmin, argmax]))
+
+
+def downsample_indices(x, y, n_out, method='lttb'):
+    valid = ~pd.isna(np.asarray(y))
+    positions = np.flatnonzero(valid)
+    if len(positions) <= n_out:
+        return positions
+
+    if method == 'minmax':
+        kept = minmax_indices(np.asarray(y)[positions], max((n_out - 2) // 2, 1))
+    else:
+        kept = lttb_indices(np.asarray(x)[positions], np.asarray(y)[positions], n_out)
+    return positions[kept]
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+
+_NAN_HASH = pd.util.hash_array(np.array([np.nan]))[0]
+
+
+def _hash_numbers(values):
+    # Integers and integral floats hash as int64, other floats as float64,
+    # so a value hashes the same whatever dtype a chunk gave its column
+    # (int, NaN-forced float, nullable Int) while int64 keys above 2**53 stay
+    # distinct instead of collapsing in a float64 cast.
+    missing = values.isna().to_numpy()
+    if pd.api.types.is_integer_dtype(values):
+        dtype = np.uint64 if pd.api.types.is_unsigned_integer_dtype(values) else np.int64
+        hashes = pd.util.hash_array(values.to_numpy(dtype=dtype, na_value=0))
+    else:
+        floats = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        hashes = pd.util.hash_array(floats)
+        with np.errstate(invalid='ignore'):
+            integral = np.isfinite(floats) & (floats == np.trunc(floats)) & (np.abs(floats) < 2.0 ** 63)
+        hashes[integral] = pd.util.hash_array(floats[integral].astype(np.int64))
+    hashes[missing] = _NAN_HASH
+    return hashes
+
+
+def _hash_frame(chunk):
+    # One hash per column, each in the column's own kind, then one hash over
+    # those per row.
+    column_hashes = {}
+    for i, col in enumerate(chunk.columns):
+        values = chunk.iloc[:, i]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            column_hashes[i] = _hash_numbers(values)
+        else:
+            column_hashes[i] = pd.util.hash_pandas_object(values, index=False).to_numpy()
+    if len(column_hashes) == 1:
+        return column_hashes[0]
+    return pd.util.hash_pandas_object(pd.DataFrame(column_hashes, copy=False), index=False).to_numpy()
+
+
+def _normalize_chunk(chunk, decimals):
+    normalized = {}
+    for col in chunk.columns:
+        values = chunk[col]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            normalized[col] = values.astype('float64').round(decimals)
+        elif pd.api.types.is_datetime64_any_dtype(values):
+            normalized[col] = values
+        else:
+            text = values.astype(str).str.lower().str.replace(r'[^\w\s]', '', regex=True)
+            normalized[col] = text.str.replace(r'\s+', ' ', regex=True).str.strip().where(values.notna())
+    return pd.DataFrame(normalized, index=chunk.index)
+
+
+class DuplicateIndex:
+
+    # One 64-bit hash per row (over the key columns), built once, possibly
+    # from a stream of chunks, and queried for any keep policy or row subset.
+    # Rows with equal hashes are treated as equal; at 64 bits a collision is
+    # not expected below billions of distinct rows.
+
+    def __init__(self, columns=None, near=False, decimals=2):
+        self.columns = list(columns) if columns is not None else None
+        self.near = near
+        self.decimals = decimals
+        self._chunks = []
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._counts = {}
+
+    @classmethod
+    def from_frame(cls, df, columns=None, chunk_size=None, near=False, decimals=2):
+        index = cls(columns, near=near, decimals=decimals)
+        if chunk_size is None:
+            return index.update(df)
+        for start in range(0, len(df), chunk_size):
+            index.update(df.iloc[start:start + chunk_size])
+        return index
+
+    @classmethod
+    def from_chunks(cls, chunks, columns=None, near=False, decimals=2):
+        index = cls(columns, near=near, decimals=decimals)
+        for chunk in chunks:
+            index.update(chunk)
+        return index
+
+    def update(self, chunk):
+        if self.columns is not None:
+            chunk = chunk[self.columns]
+        if self.near:
+            chunk = _normalize_chunk(chunk, self.decimals)
+        self._chunks.append(_hash_frame(chunk))
+        self._counts = {}
+        return self
+
+    @property
+    def hashes(self):
+        if self._chunks:
+            self._hashes = np.concatenate([self._hashes] + self._chunks)
+            self._chunks = []
+        return self._hashes
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def duplicated(self, keep='first', positions=None, frame=None):
+        # With ``frame`` (the indexed rows, in index order) rows sharing a
+        # hash are compared on their actual values, so a hash collision can
+        # never mark a distinct row as a duplicate. Rows with a unique hash
+        # are unique by value and are not looked at.
+        hashes = self.hashes if positions is None else self.hashes[positions]
+        duplicated = pd.Series(hashes, copy=False).duplicated(keep=keep).to_numpy().copy()
+        if frame is None:
+            return duplicated
+        candidates = np.flatnonzero(pd.Series(hashes, copy=False).duplicated(keep=False).to_numpy())
+        if len(candidates):
+            rows = candidates if positions is None else np.asarray(positions)[candidates]
+            duplicated[candidates] = frame.iloc[rows].duplicated(keep=keep).to_numpy()
+        return duplicated
+
+    def duplicate_count(self, keep='first'):
+        if keep not in self._counts:
+            self._counts[keep] = int(self.duplicated(keep=keep).sum())
+        return self._counts[keep]
+
+    def groups(self, min_size=2):
+        # Row positions of each set of (near-)duplicate rows, largest first.
+        codes, _ = pd.factorize(self.hashes)
+        sizes = np.bincount(codes)
+        repeated = np.flatnonzero(sizes >= min_size)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(sizes)])
+        groups = [order[bounds[code]:bounds[code + 1]] for code in repeated]
+        return sorted(groups, key=len, reverse=True)
+
+
+def near_duplicate_index(df, columns, decimals=2, chunk_size=None):
+    # Near duplicates: text compared case-, punctuation- and whitespace-
+    # insensitively and numbers rounded to ``decimals`` before hashing.
+    return DuplicateIndex.from_frame(df, columns, chunk_size=chunk_size, near=True, decimals=decimals)
@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+
+def _is_numeric(values):
+    return pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+
+
+def _fillna(values, fill):
+    # A nullable integer column cannot hold a fractional mean or median, so
+    # it is widened to Float64 rather than having the fill value rounded.
+    # Whole fill values keep the integer dtype.
+    if pd.api.types.is_integer_dtype(values.dtype) and values.isna().any():
+        if isinstance(fill, pd.Series):
+            fill = fill.where(values.isna())
+        needed = pd.Series(fill).dropna().to_numpy(dtype=np.float64)
+        if (needed != np.round(needed)).any():
+            values = values.astype('Float64')
+        elif isinstance(fill, pd.Series):
+            fill = fill.astype(values.dtype)
+    return values.fillna(fill)
+
+
+class Imputer:
+
+    STRATEGIES = ('mean', 'median', 'mode', 'interpolate', 'knn')
+
+    def __init__(self, strategy='mean', group_by=None, time_column=None, n_neighbors=5,
+                 max_reference=20000, block_size=1024, random_state=42):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown imputation strategy '{strategy}', expected one of {self.STRATEGIES}")
+        self.strategy = strategy
+        self.group_by = group_by
+        self.time_column = time_column
+        self.n_neighbors = n_neighbors
+        self.max_reference = max_reference
+        self.block_size = block_size
+        self.random_state = random_state
+        self.columns = []
+        self.fill_values = pd.Series(dtype=object)
+        self.group_fill_values = None
+        self.last_values = None
+        self._last_time = None
+        self._reference = None
+        self._center = None
+        self._scale = None
+
+    def fit(self, df, columns=None):
+        # Fill values are computed once here and kept, so transform() can be
+        # applied to any later chunk or appended rows without refitting.
+        columns = df.columns.tolist() if columns is None else list(columns)
+        columns = [col for col in columns if col != self.group_by and col != self.time_column]
+        if self.strategy != 'mode':
+            columns = [col for col in columns if _is_numeric(df[col])]
+        self.columns = columns
+        if not columns:
+            return self
+
+        if self.strategy in ('mean', 'median'):
+            self.fill_values = df[columns].agg(self.strategy)
+            if self.group_by is not None:
+                self.group_fill_values = df.groupby(self.group_by, observed=True)[columns].agg(self.strategy)
+        elif self.strategy == 'mode':
+            self.fill_values = df[columns].mode().iloc[0] if len(df) else pd.Series(np.nan, index=columns)
+            if self.group_by is not None:
+                self.group_fill_values = pd.DataFrame({col: self._group_modes(df, col) for col in columns})
+        elif self.strategy == 'knn':
+            self._fit_reference(df[columns])
+        return self
+
+    def _group_modes(self, df, col):
+        counts = df.groupby([self.group_by, col], observed=True, sort=True).size()
+        if counts.empty:
+            return pd.Series(dtype=object)
+        # Among equally frequent values the smallest wins, as with mode()[0].
+        top = counts.groupby(level=0, observed=True).idxmax()
+        return pd.Series([key[1] for key in top], index=top.index)
+
+    def _fit_reference(self, data):
+        values = data.to_numpy(dtype=np.float64, na_value=np.nan)
+        self.fill_values = pd.Series(np.nanmean(values, axis=0) if len(values) else np.nan, index=self.columns)
+        scale = np.nanstd(values, axis=0) if len(values) else np.ones(len(self.columns))
+        self._center = self.fill_values.to_numpy()
+        self._scale = np.where(np.isfinite(scale) & (scale > 0), scale, 1.0)
+
+        # Neighbours are searched among complete rows only, capped at
+        # max_reference rows so memory stays bounded on large tables.
+        complete = values[~np.isnan(values).any(axis=1)]
+        if len(complete) > self.max_reference:
+            rng = np.random.default_rng(self.random_state)
+            complete = complete[rng.choice(len(complete), self.max_reference, replace=False)]
+        self._reference = complete
+
+    def _knn_fill(self, data):
+        values = data.to_numpy(dtype=np.float64, na_value=np.nan)
+        missing = np.isnan(values)
+        rows = np.flatnonzero(missing.any(axis=1))
+        if not len(rows) or self._reference is None or not len(self._reference):
+            return pd.DataFrame(values, index=data.index, columns=self.columns).fillna(self.fill_values)
+
+        reference = (self._reference - self._center) / self._scale
+        reference_sq = reference * reference
+        k = min(self.n_neighbors, len(reference))
+        n_features = values.shape[1]
+
+        for start in range(0, len(rows), self.block_size):
+            block = rows[start:start + self.block_size]
+            observed = ~missing[block]
+            query = np.where(observed, (values[block] - self._center) / self._scale, 0.0)
+            # NaN-Euclidean distance over the coordinates each query row has,
+            # rescaled to all features, computed as three matrix products.
+            distances = ((query * query).sum(axis=1)[:, None] - 2 * query @ reference.T
+                         + observed.astype(np.float64) @ reference_sq.T)
+            distances *= n_features / np.maximum(observed.sum(axis=1), 1)[:, None]
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            neighbour_means = self._reference[nearest].mean(axis=1)
+            values[block] = np.where(missing[block], neighbour_means, values[block])
+
+        return pd.DataFrame(values, index=data.index, columns=self.columns)
+
+    def _interpolate(self, data, time_values):
+        values = data.to_numpy(dtype=np.float64, na_value=np.nan)
+        times = None if time_values is None else np.asarray(time_values)
+        by_time = times is not None and np.issubdtype(times.dtype, np.datetime64) and not np.isnat(times).any()
+        order = np.argsort(times, kind='stable') if times is not None else np.arange(len(values))
+        index = pd.DatetimeIndex(times[order]) if by_time else pd.RangeIndex(len(values))
+
+        # The last row of the previous chunk anchors gaps at the start of this one.
+        ordered = values[order]
+        anchored = self.last_values is not None
+        if anchored:
+            ordered = np.vstack([self.last_values, ordered])
+            index = index.insert(0, self._last_time) if by_time else pd.RangeIndex(len(ordered))
+
+        filled = pd.DataFrame(ordered, index=index).interpolate(method='time' if by_time else 'linear')
+        filled = filled.ffill().bfill().to_numpy()[1 if anchored else 0:]
+        if len(filled):
+            self.last_values = filled[-1]
+            self._last_time = index[-1] if by_time else None
+
+        result = np.empty_like(values)
+        result[order] = filled
+        return pd.DataFrame(result, index=data.index, columns=data.columns)
+
+    def transform(self, df, time_values=None):
+        # Returns the imputed columns only; the caller decides where to write them.
+        if not self.columns:
+            return pd.DataFrame(index=df.index)
+        data = df[self.columns]
+
+        if self.strategy == 'knn':
+            return self._knn_fill(data)
+        if self.strategy == 'interpolate':
+            if time_values is None and self.time_column is not None and self.time_column in df.columns:
+                time_values = df[self.time_column]
+            return self._interpolate(data, time_values)
+
+        filled = {}
+        for col in self.columns:
+            values = data[col]
+            if not values.isna().any():
+                filled[col] = values
+                continue
+            if self.group_fill_values is not None and col in self.group_fill_values.columns:
+                group_fills = self.group_fill_values[col].reindex(df[self.group_by].to_numpy())
+                values = _fillna(values, pd.Series(group_fills.to_numpy(), index=values.index))
+            if col in self.fill_values.index and pd.notna(self.fill_values[col]):
+                values = _fillna(values, self.fill_values[col])
+            filled[col] = values
+        return pd.DataFrame(filled, index=df.index, copy=False)
+
+    def fit_transform(self, df, columns=None, time_values=None):
+        return self.fit(df, columns).transform(df, time_values=time_values)
@@ -0,0 +1,155 @@
+import hashlib
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+
+    # Shared between the worker running it and the script polling it; the
+    # worker writes status/progress, the script only reads them or cancels.
+
+    ACTIVE = ('queued', 'running')
+
+    def __init__(self, job_id, name, key, params, cancellable=True, owner=None):
+        self.id = job_id
+        self.name = name
+        self.key = key
+        self.params = params
+        self.owner = owner
+        self.cancellable = cancellable
+        self.status = 'queued'
+        self.progress = 0.0
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in self.ACTIVE
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    @property
+    def can_cancel(self):
+        # Work that never calls update() can only be cancelled before it starts.
+        return self.status == 'queued' or (self.status == 'running' and self.cancellable)
+
+    def update(self, fraction=None, message=None):
+        # Called by the job itself between steps; it is also the point where
+        # a cancellation request takes effect.
+        if self._cancel.is_set():
+            raise JobCancelled()
+        if fraction is not None:
+            self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+
+class JobRunner:
+
+    # A thread pool fed from its in-process queue. Identical jobs (same owner,
+    # name and parameters) that are still queued or running are submitted once
+    # and shared, so a rerun of the script does not start the work again;
+    # jobs of different owners are never shared, so one cannot cancel another's.
+    # Finished jobs hold their result until release()d; at most
+    # ``keep_finished`` of them are kept for owners that never come back.
+
+    def __init__(self, max_workers=2, keep_finished=16):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.keep_finished = keep_finished
+        self.jobs = {}
+        self._in_flight = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def job_key(name, params, owner=None):
+        return hashlib.sha256(repr((owner, name, sorted(params.items()))).encode('utf-8')).hexdigest()
+
+    def submit(self, name, fn, params=None, cancellable=True, owner=None):
+        # ``fn`` is called as fn(job) and may report progress with
+        # job.update(); its return value becomes job.result. ``params`` only
+        # identify the job: they form its dedupe key and are kept on it.
+        # ``cancellable`` says whether fn calls update() often enough for a
+        # running job to be stopped. ``owner`` (a session id) scopes sharing.
+        params = params or {}
+        key = self.job_key(name, params, owner)
+        with self._lock:
+            job = self._in_flight.get(key)
+            if job is not None and job.active:
+                return job
+            job = Job(next(self._ids), name, key, params, cancellable, owner)
+            self.jobs[job.id] = job
+            self._in_flight[key] = job
+            job.future = self.executor.submit(self._run, job, fn)
+            self._prune()
+        return job
+
+    def _run(self, job, fn):
+        status = 'done'
+        try:
+            if job.cancel_requested:
+                raise JobCancelled()
+            job.status = 'running'
+            result = fn(job)
+            # A cancel that arrived after the last update() still wins.
+            if job.cancel_requested:
+                raise JobCancelled()
+            job.result = result
+            job.progress = 1.0
+        except JobCancelled:
+            status = 'cancelled'
+        except Exception as e:
+            job.error = e
+            status = 'failed'
+        self._finish(job, status)
+
+    def _finish(self, job, status):
+        # The job leaves the in-flight table before its final status is
+        # published, so a resubmission seen as finished always starts anew.
+        job.finished_at = time.time()
+        with self._lock:
+            if self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+        job.status = status
+
+    def _prune(self):
+        finished = sorted((job for job in self.jobs.values() if not job.active), key=lambda job: job.finished_at)
+        for job in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self.jobs[job.id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def release(self, job_id):
+        # Forgets a finished job once its owner has taken the result.
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is not None and not job.active:
+                del self.jobs[job_id]
+                job.result = None
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or not job.can_cancel:
+            return False
+        job._cancel.set()
+        # A job still in the queue never starts; a running one stops at its
+        # next update().
+        if job.future.cancel():
+            self._finish(job, 'cancelled')
+        return True
+
+    def active_jobs(self):
+        return [job for job in self.jobs.values() if job.active]
@@ -0,0 +1,145 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+DATASET_FORMATS = {'.parquet': 'parquet', '.pq': 'parquet', '.arrow': 'ipc', '.feather': 'ipc', '.ipc': 'ipc'}
+
+
+def _dataset_format(source):
+    if os.path.isdir(source):
+        return 'parquet'
+    return DATASET_FORMATS.get(os.path.splitext(os.fspath(source))[1].lower(), 'parquet')
+
+
+class LazyFrame:
+
+    # Stands in for a DataFrame over an Arrow dataset on disk. Only the schema
+    # is held in memory; indexing projects the requested columns (and applies
+    # the row filter) before anything is materialised as pandas.
+
+    def __init__(self, source, filter=None, batch_size=65536):
+        if isinstance(source, ds.Dataset):
+            self.dataset = source
+        else:
+            self.dataset = ds.dataset(os.fspath(source), format=_dataset_format(source))
+        self.filter = filter
+        self.batch_size = batch_size
+        self._empty = self._to_pandas(self.dataset.schema.empty_table())
+        self._length = None
+
+    def _to_pandas(self, table):
+        return table.to_pandas(strings_to_categorical=True, self_destruct=True)
+
+    @property
+    def columns(self):
+        return self._empty.columns
+
+    @property
+    def dtypes(self):
+        return self._empty.dtypes
+
+    @property
+    def index(self):
+        return pd.RangeIndex(len(self))
+
+    @property
+    def shape(self):
+        return len(self), len(self.columns)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def __len__(self):
+        if self._length is None:
+            self._length = self.dataset.count_rows(filter=self.filter)
+        return self._length
+
+    def file_info(self):
+        # (path, size, mtime) of each file behind the dataset; empty for a
+        # dataset held in memory.
+        files = getattr(self.dataset, 'files', None)
+        if not files:
+            return []
+        return [(info.path, info.size, info.mtime_ns) for info in self.dataset.filesystem.get_file_info(files)]
+
+    def select_dtypes(self, include=None, exclude=None):
+        return self._empty.select_dtypes(include=include, exclude=exclude)
+
+    def where(self, expression):
+        if self.filter is not None:
+            expression = self.filter & expression
+        return LazyFrame(self.dataset, filter=expression, batch_size=self.batch_size)
+
+    def to_pandas(self, columns=None):
+        return self._to_pandas(self.dataset.to_table(columns=columns, filter=self.filter))
+
+    def head(self, n=5, columns=None):
+        return self._to_pandas(self.dataset.head(n, columns=columns, filter=self.filter))
+
+    def take(self, positions, columns=None):
+        positions = np.asarray(positions, dtype=np.int64)
+        table = self.dataset.take(pa.array(positions), columns=columns, filter=self.filter)
+        df = self._to_pandas(table)
+        df.index = positions
+        return df
+
+    def sample(self, n, random_state=None, columns=None):
+        positions = np.random.default_rng(random_state).choice(len(self), min(n, len(self)), replace=False)
+        return self.take(np.sort(positions), columns=columns)
+
+    def iter_batches(self, columns=None, batch_size=None):
+        batches = self.dataset.to_batches(
+            columns=columns, filter=self.filter, batch_size=batch_size or self.batch_size
+        )
+        start = 0
+        for batch in batches:
+            if batch.num_rows:
+                df = self._to_pandas(pa.Table.from_batches([batch]))
+                df.index = pd.RangeIndex(start, start + batch.num_rows)
+                start += batch.num_rows
+                yield df
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.to_pandas([key])[key]
+        if isinstance(key, (list, tuple, pd.Index)):
+            return self.to_pandas(list(key))
+        return self.take(np.flatnonzero(np.asarray(key, dtype=bool)))
+
+
+def is_lazy(df):
+    return isinstance(df, LazyFrame)
+
+
+def iter_chunks(df, columns, chunk_size=None):
+    if is_lazy(df):
+        yield from df.iter_batches(columns=columns, batch_size=chunk_size)
+        return
+
+    data = df[columns]
+    if chunk_size is None:
+        yield data
+        return
+    for start in range(0, len(data), chunk_size):
+        yield data.iloc[start:start + chunk_size]
+
+
+def column_sample(df, column, n):
+    if not is_lazy(df):
+        return df[column].dropna().head(n)
+
+    # Scans batches of the one column only until enough non-null values are seen.
+    parts, seen = [], 0
+    for chunk in df.iter_batches(columns=[column]):
+        values = chunk[column].dropna()
+        parts.append(values)
+        seen += len(values)
+        if seen >= n:
+            break
+    if not parts:
+        return pd.Series(dtype=df.dtypes[column])
+    return pd.concat(parts).head(n)
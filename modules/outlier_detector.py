@@ -1,7 +1,52 @@
+import hashlib
+import threading
+import warnings
+from collections import OrderedDict
+
 import pandas as pd
 import numpy as np
+from joblib import Parallel, delayed
 from sklearn.ensemble import IsolationForest
-from scipy import stats
+
+from modules.column_stats import KLLSketch, MomentAccumulator
+from modules.lazy_frame import is_lazy, iter_chunks
+from modules.streaming_detector import StreamingAnomalyDetector
+
+FOREST_CACHE_SIZE = 8
+
+# Half-width, as a fraction of the spread (IQR or std), of the band kept
+# around each outlier bound so appends can re-mask only the rows near it.
+BOUND_BAND = 0.25
+
+# Fitted forests and their masks, keyed on the data hash and fit parameters,
+# so reruns that only change what is displayed do not refit. Shared by every
+# session's worker threads: entries are only touched under the lock and
+# callers get their own copy of the mask.
+_forest_cache = OrderedDict()
+_forest_cache_lock = threading.Lock()
+
+
+def summarize_outliers(method, outliers, n_rows):
+    # ``outliers`` is what a detect_* call returned: a mask per column, or
+    # one row mask for the isolation forest.
+    if isinstance(outliers, pd.Series):
+        total = int(outliers.sum())
+        return {
+            'method': method,
+            'total_outliers': total,
+            'outlier_percentage': (total / n_rows) * 100 if n_rows else 0.0
+        }
+    counts = {col: int(mask.sum()) for col, mask in outliers.items()}
+    return {
+        'method': method,
+        'columns': {
+            col: {
+                'outlier_count': count,
+                'outlier_percentage': (count / n_rows) * 100 if n_rows else 0.0
+            }
+            for col, count in counts.items()
+        }
+    }
 
 
 class OutlierDetector:
@@ -10,39 +55,198 @@ class OutlierDetector:
         self.df = df
         self.numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
         self.outliers = {}
+        self.masks = {}
+        self.params = {}
+        self.forest = None
+        self._sketch = None
+        self._moments = None
+        self._bands = {}
+        self._streams = {}
     
-    def detect_iqr(self, columns=None, multiplier=1.5):
+    def _resolve_columns(self, columns):
         if columns is None:
             columns = self.numeric_columns
+        return [col for col in columns if col in self.numeric_columns]
+    
+    def _store_matrix(self, method, columns, mask):
+        self.masks[method] = (columns, mask)
+        self.outliers[method] = {
+            col: pd.Series(mask[:, i], index=self.df.index, copy=False)
+            for i, col in enumerate(columns)
+        }
+        return self.outliers[method]
+    
+    def _numeric_matrix(self, columns):
+        return self.df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    
+    def set_column_masks(self, method, masks):
+        columns = list(masks.keys())
+        mask = np.zeros((len(self.df), len(columns)), dtype=bool)
+        for i, col in enumerate(columns):
+            mask[:, i] = np.asarray(masks[col], dtype=bool)
+        return self._store_matrix(method, columns, mask)
+    
+    def _iqr_mask(self, values, Q1, Q3, multiplier):
+        # All-NaN columns give NaN bounds, and comparisons against NaN are False.
+        with np.errstate(invalid='ignore'):
+            IQR = Q3 - Q1
+            return (values < Q1 - multiplier * IQR) | (values > Q3 + multiplier * IQR)
+    
+    def _zscore_mask(self, values, mean, std, threshold):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.abs(values - mean) / std > threshold
+    
+    def _bounds_mask(self, values, lower, upper):
+        # Both masks above are "outside [lower, upper]" once their bounds
+        # are worked out; NaN bounds flag nothing.
+        with np.errstate(invalid='ignore'):
+            return (values < lower) | (values > upper)
+    
+    def _band(self, positions, values, lower, upper, width):
+        # The rows within ``width`` of either bound of one column.
+        with np.errstate(invalid='ignore'):
+            near = (np.abs(values - lower) <= width) | (np.abs(values - upper) <= width)
+        return positions[near], values[near]
+    
+    def _remask(self, method, combined, delta_values, lower, upper, width):
+        # A row's flag can only change if its value lies between a bound's
+        # old and new position. While both bounds of a column stay within
+        # the band kept around them at its last full scan, only the band rows
+        # and the delta are compared again; otherwise the column is rescanned
+        # and the band rebuilt around the new bounds.
+        columns, old_mask = self.masks[method]
+        n_old = len(old_mask)
+        mask = np.empty((len(combined), len(columns)), dtype=bool)
+        mask[:n_old] = old_mask
+        mask[n_old:] = self._bounds_mask(delta_values, lower, upper)
         
-        outliers = {}
-        for col in columns:
-            if col in self.numeric_columns:
-                Q1 = self.df[col].quantile(0.25)
-                Q3 = self.df[col].quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - multiplier * IQR
-                upper_bound = Q3 + multiplier * IQR
-                outliers[col] = (self.df[col] < lower_bound) | (self.df[col] > upper_bound)
-        
-        self.outliers['iqr'] = outliers
-        return outliers
+        bands = self._bands.setdefault(method, [None] * len(columns))
+        delta_positions = np.arange(n_old, len(combined))
+        for j, col in enumerate(columns):
+            band = bands[j]
+            if (band is not None and abs(lower[j] - band['lower']) <= band['width']
+                    and abs(upper[j] - band['upper']) <= band['width']):
+                mask[band['positions'], j] = self._bounds_mask(band['values'], lower[j], upper[j])
+                positions, values = self._band(delta_positions, delta_values[:, j],
+                                               band['lower'], band['upper'], band['width'])
+                band['positions'] = np.concatenate([band['positions'], positions])
+                band['values'] = np.concatenate([band['values'], values])
+            else:
+                values = combined[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                mask[:, j] = self._bounds_mask(values, lower[j], upper[j])
+                positions, values = self._band(np.arange(len(values)), values, lower[j], upper[j], width[j])
+                bands[j] = {'lower': lower[j], 'upper': upper[j], 'width': width[j],
+                            'positions': positions, 'values': values}
+        return mask
+    
+    def _chunked_mask(self, columns, mask_fn, chunk_size):
+        mask = np.zeros((len(self.df), len(columns)), dtype=bool)
+        start = 0
+        for chunk in iter_chunks(self.df, columns, chunk_size):
+            mask[start:start + len(chunk)] = mask_fn(chunk.to_numpy(dtype=np.float64, na_value=np.nan))
+            start += len(chunk)
+        return mask
+    
+    def iqr_matrix(self, columns=None, multiplier=1.5, approximate=False, chunk_size=1000000):
+        columns = self._resolve_columns(columns)
+        
+        if approximate or is_lazy(self.df):
+            # Quartiles come from a KLL sketch fed in chunks instead of a full
+            # partition of every column; see KLLSketch.rank_error for the bound.
+            self._sketch = KLLSketch(len(columns))
+            for chunk in iter_chunks(self.df, columns, chunk_size):
+                self._sketch.update(chunk)
+            Q1, Q3 = self._sketch.quantiles([0.25, 0.75])
+            mask = self._chunked_mask(columns, lambda values: self._iqr_mask(values, Q1, Q3, multiplier),
+                                      chunk_size)
+        else:
+            self._sketch = None
+            values = self._numeric_matrix(columns)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                Q1, Q3 = np.nanquantile(values, [0.25, 0.75], axis=0)
+            mask = self._iqr_mask(values, Q1, Q3, multiplier)
+        
+        self.params['iqr'] = {'columns': columns, 'multiplier': multiplier, 'approximate': approximate}
+        self._bands.pop('iqr', None)
+        self._store_matrix('iqr', columns, mask)
+        return mask, pd.Series(mask.sum(axis=0), index=columns)
+    
+    def zscore_matrix(self, columns=None, threshold=3, chunk_size=1000000):
+        columns = self._resolve_columns(columns)
+        
+        if is_lazy(self.df):
+            self._moments = MomentAccumulator(len(columns))
+            for chunk in iter_chunks(self.df, columns, chunk_size):
+                self._moments.update(chunk)
+            mean, std = self._moments.mean, self._moments.std(ddof=0)
+            mask = self._chunked_mask(columns, lambda values: self._zscore_mask(values, mean, std, threshold),
+                                      chunk_size)
+        else:
+            self._moments = None
+            values = self._numeric_matrix(columns)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                mean = np.nanmean(values, axis=0)
+                std = np.nanstd(values, axis=0)
+            mask = self._zscore_mask(values, mean, std, threshold)
+        
+        self.params['zscore'] = {'columns': columns, 'threshold': threshold}
+        self._bands.pop('zscore', None)
+        self._store_matrix('zscore', columns, mask)
+        return mask, pd.Series(mask.sum(axis=0), index=columns)
+    
+    def detect_iqr(self, columns=None, multiplier=1.5, approximate=False):
+        self.iqr_matrix(columns, multiplier, approximate=approximate)
+        return self.outliers['iqr']
     
     def detect_zscore(self, columns=None, threshold=3):
-        if columns is None:
-            columns = self.numeric_columns
+        self.zscore_matrix(columns, threshold)
+        return self.outliers['zscore']
+    
+    def detect_rolling(self, columns=None, method='rolling_mad', window=30, threshold=None, order=None,
+                       chunk_size=100000):
+        # Rows are streamed in time order (``order`` is an argsort of the time
+        # column) through a detector that only keeps a fixed window of state.
+        columns = self._resolve_columns(columns)
+        stream = StreamingAnomalyDetector(columns, method=method, window=window, threshold=threshold)
+        if order is None:
+            chunks = iter_chunks(self.df, columns, chunk_size)
+        else:
+            values = self._numeric_matrix(columns)[order]
+            chunks = (values[start:start + chunk_size] for start in range(0, len(values), chunk_size))
+        ordered_mask = stream.run(chunks)
         
-        outliers = {}
-        for col in columns:
-            if col in self.numeric_columns:
-                z_scores = np.abs(stats.zscore(self.df[col].dropna()))
-                outliers[col] = pd.Series(False, index=self.df.index)
-                outliers[col][self.df[col].notna()] = z_scores > threshold
+        if order is None:
+            mask = ordered_mask
+        else:
+            mask = np.empty_like(ordered_mask)
+            mask[order] = ordered_mask
         
-        self.outliers['zscore'] = outliers
-        return outliers
+        self.params[method] = {'columns': columns, 'window': window, 'threshold': stream.threshold}
+        self._streams[method] = stream
+        self._store_matrix(method, columns, mask)
+        return self.outliers[method]
+    
+    def _fit_sample(self, data, max_samples, stratify_by, random_state):
+        if len(data) <= max_samples:
+            return data
+        
+        frac = max_samples / len(data)
+        if stratify_by is not None and stratify_by in self.df.columns:
+            strata = self.df[stratify_by].loc[data.index]
+            return data.groupby(strata, observed=True, dropna=False, group_keys=False).sample(
+                frac=frac, random_state=random_state
+            )
+        return data.sample(n=max_samples, random_state=random_state)
+    
+    def _data_key(self, data):
+        hasher = hashlib.sha256(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+        hasher.update(repr(data.columns.tolist()).encode('utf-8'))
+        return hasher.hexdigest()
     
-    def detect_isolation_forest(self, contamination=0.1):
+    def detect_isolation_forest(self, contamination=0.1, max_samples=50000, stratify_by=None,
+                                n_jobs=-1, batch_size=100000, random_state=42):
         if not self.numeric_columns:
             return pd.Series(False, index=self.df.index)
         
@@ -51,51 +255,136 @@ class OutlierDetector:
         if len(data) < 2:
             return pd.Series(False, index=self.df.index)
         
-        iso_forest = IsolationForest(contamination=contamination, random_state=42)
-        predictions = iso_forest.fit_predict(data)
+        cache_key = (self._data_key(data), contamination, max_samples, stratify_by, random_state)
+        with _forest_cache_lock:
+            cached = _forest_cache.get(cache_key)
+            if cached is not None:
+                _forest_cache.move_to_end(cache_key)
+        if cached is not None:
+            self.forest, outliers = cached
+            self.outliers['isolation_forest'] = outliers.copy()
+            return self.outliers['isolation_forest']
+        
+        sample = self._fit_sample(data, max_samples, stratify_by, random_state)
+        iso_forest = IsolationForest(contamination=contamination, random_state=random_state, n_jobs=n_jobs)
+        iso_forest.fit(sample.to_numpy(dtype=np.float64))
+        
+        values = data.to_numpy(dtype=np.float64)
+        batches = [values[start:start + batch_size] for start in range(0, len(values), batch_size)]
+        predictions = Parallel(n_jobs=n_jobs, prefer='threads')(
+            delayed(iso_forest.predict)(batch) for batch in batches
+        )
         
         outliers = pd.Series(False, index=self.df.index)
-        outliers[data.index] = predictions == -1
+        outliers[data.index] = np.concatenate(predictions) == -1
+        
+        self.forest = iso_forest
+        with _forest_cache_lock:
+            _forest_cache[cache_key] = (iso_forest, outliers.copy())
+            while len(_forest_cache) > FOREST_CACHE_SIZE:
+                _forest_cache.popitem(last=False)
         
         self.outliers['isolation_forest'] = outliers
         return outliers
     
+    def append(self, delta, df=None):
+        # Bounds come from running accumulators that only see the delta, and
+        # the masks are updated through _remask(): besides the delta, only
+        # rows near a bound are compared again. The first append after a
+        # detection scans the existing rows once to seed the accumulators.
+        delta = delta.reset_index(drop=True)
+        combined = df if df is not None else pd.concat([self.df, delta], ignore_index=True)
+        n_old = len(self.df)
+        delta_masks = {}
+        
+        if 'iqr' in self.params:
+            columns, multiplier = self.params['iqr']['columns'], self.params['iqr']['multiplier']
+            if self._sketch is None:
+                # Exact quartiles would need every value again; from here on
+                # they come from a KLL sketch (see KLLSketch.rank_error).
+                self._sketch = KLLSketch(len(columns))
+                for chunk in iter_chunks(self.df, columns):
+                    self._sketch.update(chunk)
+            delta_values = delta[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            Q1, Q3 = self._sketch.update(delta_values).quantiles([0.25, 0.75])
+            IQR = Q3 - Q1
+            mask = self._remask('iqr', combined, delta_values, Q1 - multiplier * IQR, Q3 + multiplier * IQR,
+                                BOUND_BAND * IQR)
+            delta_masks['iqr'] = mask[n_old:]
+        
+        if 'zscore' in self.params:
+            columns, threshold = self.params['zscore']['columns'], self.params['zscore']['threshold']
+            if self._moments is None:
+                self._moments = MomentAccumulator(len(columns))
+                for chunk in iter_chunks(self.df, columns):
+                    self._moments.update(chunk)
+            delta_values = delta[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            mean, std = self._moments.update(delta_values).mean, self._moments.std(ddof=0)
+            zscore_mask = self._remask('zscore', combined, delta_values, mean - threshold * std,
+                                       mean + threshold * std, BOUND_BAND * std)
+            delta_masks['zscore'] = zscore_mask[n_old:]
+        
+        rolling_masks = {}
+        for method, stream in self._streams.items():
+            # Appended rows continue the stream from the retained window state.
+            columns = self.params[method]['columns']
+            delta_masks[method] = stream.update(delta[columns])
+            rolling_masks[method] = np.vstack([self.masks[method][1], delta_masks[method]])
+        
+        forest_mask = None
+        if self.forest is not None and 'isolation_forest' in self.outliers:
+            data = delta[self.numeric_columns].dropna()
+            forest_mask = pd.Series(False, index=range(n_old, len(combined)))
+            if len(data):
+                forest_mask[data.index + n_old] = self.forest.predict(data.to_numpy(dtype=np.float64)) == -1
+            delta_masks['isolation_forest'] = forest_mask.to_numpy()
+        
+        old_forest = self.outliers.get('isolation_forest')
+        self.df = combined
+        if 'iqr' in delta_masks:
+            self._store_matrix('iqr', self.params['iqr']['columns'], mask)
+        if 'zscore' in delta_masks:
+            self._store_matrix('zscore', self.params['zscore']['columns'], zscore_mask)
+        for method, rolling_mask in rolling_masks.items():
+            self._store_matrix(method, self.params[method]['columns'], rolling_mask)
+        if forest_mask is not None:
+            self.outliers['isolation_forest'] = pd.Series(
+                np.concatenate([old_forest.to_numpy(), forest_mask.to_numpy()]), index=combined.index
+            )
+        
+        return delta_masks
+    
     def get_outlier_summary(self, method):
         if method not in self.outliers:
             return {}
         
-        outliers = self.outliers[method]
-        
-        if isinstance(outliers, dict):
-            summary = {
-                'method': method,
-                'columns': {}
-            }
-            
-            for col, mask in outliers.items():
-                summary['columns'][col] = {
-                    'outlier_count': mask.sum(),
-                    'outlier_percentage': (mask.sum() / len(self.df)) * 100
-                }
-            
-            return summary
-        else:
+        if method in self.masks:
+            columns, mask = self.masks[method]
+            counts = mask.sum(axis=0)
             return {
                 'method': method,
-                'total_outliers': outliers.sum(),
-                'outlier_percentage': (outliers.sum() / len(self.df)) * 100
+                'columns': {
+                    col: {
+                        'outlier_count': counts[i],
+                        'outlier_percentage': (counts[i] / len(self.df)) * 100
+                    }
+                    for i, col in enumerate(columns)
+                }
             }
+        
+        outliers = self.outliers[method]
+        return {
+            'method': method,
+            'total_outliers': outliers.sum(),
+            'outlier_percentage': (outliers.sum() / len(self.df)) * 100
+        }
     
     def get_outlier_dataframe(self, method):
         if method not in self.outliers:
             return pd.DataFrame()
         
-        outliers = self.outliers[method]
+        if method in self.masks:
+            _, mask = self.masks[method]
+            return self.df[mask.any(axis=1)]
         
-        if isinstance(outliers, dict):
-            combined_mask = pd.Series(False, index=self.df.index)
-            for mask in outliers.values():
-                combined_mask = combined_mask | mask
-            return self.df[combined_mask]
-        else:
-            return self.df[outliers]
+        return self.df[self.outliers[method]]
@@ -0,0 +1,180 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from modules.outlier_detector import OutlierDetector
+from modules.statistical_analyzer import StatisticalAnalyzer
+from modules.trend_analyzer import TrendAnalyzer
+
+TIME_COLUMN = '__time__'
+ANALYSES = ('iqr', 'zscore', 'trend', 'distribution')
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(n_workers):
+    # Workers are spawned, not forked: the dashboard process runs threads
+    # (Streamlit's, the job runner's) whose locks a fork could copy while held.
+    with _executors_lock:
+        if n_workers not in _executors:
+            _executors[n_workers] = ProcessPoolExecutor(
+                max_workers=n_workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executors[n_workers]
+
+
+def _drop_executor(executor):
+    with _executors_lock:
+        for n_workers, cached in list(_executors.items()):
+            if cached is executor:
+                del _executors[n_workers]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _pack(mask):
+    return np.packbits(mask.to_numpy(dtype=bool))
+
+
+def _analyze_block(values, columns, batch, has_time, analyses, options):
+    start, stop = batch
+    names = columns[start:stop]
+    block = pd.DataFrame(values[:, start:stop], columns=names, copy=False)
+    if has_time:
+        block[TIME_COLUMN] = values[:, -1] if options['numeric_time'] else pd.to_datetime(values[:, -1], unit='ns')
+
+    results = {analysis: {} for analysis in analyses}
+
+    if 'iqr' in analyses:
+        masks = OutlierDetector(block).detect_iqr(names, multiplier=options['iqr_multiplier'])
+        results['iqr'] = {col: _pack(mask) for col, mask in masks.items()}
+
+    if 'zscore' in analyses:
+        masks = OutlierDetector(block).detect_zscore(names, threshold=options['zscore_threshold'])
+        results['zscore'] = {col: _pack(mask) for col, mask in masks.items()}
+
+    if 'distribution' in analyses:
+        profile = StatisticalAnalyzer(block).distribution_profile(names)
+        results['distribution'] = profile.to_dict(orient='index')
+
+    if 'trend' in analyses and has_time:
+        trend_analyzer = TrendAnalyzer(block)
+        results['trend'] = trend_analyzer.identify_trends(names, TIME_COLUMN, x_axis=options['x_axis'])
+
+    return results
+
+
+def _analyze_shared(shm_name, shape, columns, batch, has_time, analyses, options):
+    # Pool workers share the parent's resource tracker, so attaching here
+    # does not take ownership; the parent unlinks the block when done.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf, order='F')
+        results = _analyze_block(values, columns, batch, has_time, analyses, options)
+        del values
+        return results
+    finally:
+        shm.close()
+
+
+class ParallelColumnAnalyzer:
+
+    def __init__(self, df, n_workers=None, min_parallel_columns=8):
+        self.df = df
+        self.numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.min_parallel_columns = min_parallel_columns
+
+    def _time_values(self, time_column, times=None):
+        if times is None:
+            times = self.df[time_column]
+        if not pd.api.types.is_numeric_dtype(times):
+            times = pd.to_datetime(times, errors='coerce')
+            return times.to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(np.float64)
+        return times.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def _column_batches(self, n_columns):
+        n_batches = min(n_columns, self.n_workers * 4)
+        bounds = np.linspace(0, n_columns, n_batches + 1).astype(int)
+        return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    def _run_pool(self, shm_name, shape, columns, batches, has_time, analyses, options):
+        executor = _get_executor(self.n_workers)
+        try:
+            futures = [
+                executor.submit(_analyze_shared, shm_name, shape, columns, batch, has_time, analyses, options)
+                for batch in batches
+            ]
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            _drop_executor(executor)
+            raise
+
+    def analyze_all_columns(self, analyses=ANALYSES, columns=None, time_column=None,
+                            iqr_multiplier=1.5, zscore_threshold=3, time_values=None, x_axis='elapsed'):
+        if columns is None:
+            columns = self.numeric_columns
+        columns = [col for col in columns if col in self.numeric_columns]
+        analyses = [analysis for analysis in analyses if analysis in ANALYSES]
+        has_time = time_column is not None
+        options = {
+            'iqr_multiplier': iqr_multiplier,
+            'zscore_threshold': zscore_threshold,
+            'x_axis': x_axis,
+            'numeric_time': has_time and pd.api.types.is_numeric_dtype(
+                self.df[time_column] if time_values is None else time_values
+            )
+        }
+
+        results = {analysis: {} for analysis in analyses}
+        if not columns:
+            return results
+
+        n_rows = len(self.df)
+        shape = (n_rows, len(columns) + int(has_time))
+        if n_rows == 0:
+            return results
+
+        # Columns are laid out contiguously (Fortran order) so each worker
+        # reads its slice of the block without touching the others.
+        shm = shared_memory.SharedMemory(create=True, size=shape[0] * shape[1] * 8)
+        try:
+            values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf, order='F')
+            values[:, :len(columns)] = self.df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            if has_time:
+                values[:, -1] = self._time_values(time_column, time_values)
+
+            batches = self._column_batches(len(columns))
+            if self.n_workers <= 1 or len(columns) < self.min_parallel_columns:
+                partials = [_analyze_block(values, columns, batch, has_time, analyses, options)
+                            for batch in batches]
+            else:
+                try:
+                    partials = self._run_pool(shm.name, shape, columns, batches, has_time, analyses, options)
+                except BrokenProcessPool:
+                    # A worker died (killed for memory, say) and the pool is
+                    # unusable from then on; retry once on a fresh one.
+                    partials = self._run_pool(shm.name, shape, columns, batches, has_time, analyses, options)
+            del values
+        finally:
+            shm.close()
+            shm.unlink()
+
+        for partial in partials:
+            for analysis, column_results in partial.items():
+                results[analysis].update(column_results)
+
+        for analysis in ('iqr', 'zscore'):
+            if analysis in results:
+                results[analysis] = {
+                    col: pd.Series(np.unpackbits(packed, count=n_rows).astype(bool), index=self.df.index)
+                    for col, packed in results[analysis].items()
+                }
+
+        return results
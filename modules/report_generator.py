@@ -1,123 +1,135 @@
-import pandas as pd
-from fpdf import FPDF
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+
+from modules.duplicate_index import DuplicateIndex
+from modules.report_renderers import RENDERERS
+from modules.visualizer import DataVisualizer
 
 
 class ReportGenerator:
-    
-    def __init__(self, df, analysis_results):
+
+    # Sections and charts are built as format-independent blocks in a thread
+    # pool; a renderer then writes them, in order, into one in-memory stream.
+
+    SECTIONS = ('dataset_overview', 'statistical_summary', 'outlier_summary', 'trend_summary', 'recommendations')
+
+    def __init__(self, df, analysis_results, visualizer=None, charts=True, max_distribution_charts=4,
+                 max_workers=4, corr_matrix=None):
         self.df = df
         self.analysis_results = analysis_results
-        self.pdf = FPDF()
-        self.pdf.set_auto_page_break(auto=True, margin=15)
-    
-    def _add_title_page(self):
-        self.pdf.add_page()
-        self.pdf.set_font('Arial', 'B', 24)
-        self.pdf.cell(0, 60, '', 0, 1)
-        self.pdf.cell(0, 10, "Data Analysis Report", 0, 1, 'C')
-        
-        self.pdf.set_font('Arial', '', 12)
-        self.pdf.cell(0, 10, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 0, 1, 'C')
-        self.pdf.cell(0, 10, "Author: Automated Dashboard", 0, 1, 'C')
-    
-    def _add_section_header(self, title):
-        self.pdf.set_font('Arial', 'B', 16)
-        self.pdf.cell(0, 10, title, 0, 1, 'L')
-        self.pdf.ln(5)
-    
-    def _add_subsection_header(self, title):
-        self.pdf.set_font('Arial', 'B', 12)
-        self.pdf.cell(0, 8, title, 0, 1, 'L')
-        self.pdf.ln(2)
-    
-    def _add_text(self, text):
-        self.pdf.set_font('Arial', '', 10)
-        sanitized_text = text.encode('latin-1', 'replace').decode('latin-1')
-        self.pdf.multi_cell(0, 6, sanitized_text)
-        self.pdf.ln(3)
-    
-    def _add_dataset_overview(self):
-        self.pdf.add_page()
-        self._add_section_header('1. Dataset Overview')
-        
+        # A matrix the caller already holds (e.g. the session's) is drawn as
+        # is; otherwise the heatmap computes its own.
+        self.corr_matrix = corr_matrix
+        self.visualizer = visualizer if visualizer is not None else DataVisualizer(df)
+        self.charts = charts
+        self.max_distribution_charts = max_distribution_charts
+        self.max_workers = max_workers
+        self._duplicate_rows = None
+        self._missing_cells = None
+
+    def _count_duplicate_rows(self):
+        # Taken from the analysis results when the session already indexed
+        # the rows; otherwise hashed once here and shared by both sections.
+        if self._duplicate_rows is None:
+            duplicates = self.analysis_results.get('duplicates')
+            if duplicates is not None:
+                self._duplicate_rows = duplicates['duplicate_rows']
+            else:
+                self._duplicate_rows = DuplicateIndex.from_frame(self.df).duplicate_count()
+        return self._duplicate_rows
+
+    def _count_missing_cells(self):
+        if self._missing_cells is None:
+            self._missing_cells = int(self.df.isnull().to_numpy().sum())
+        return self._missing_cells
+
+    def _missing_percentage(self):
+        total_cells = self.df.shape[0] * self.df.shape[1]
+        return self._count_missing_cells() / total_cells * 100 if total_cells else 0.0
+
+    def _chart(self, fig, caption):
+        # Static images need plotly's kaleido exporter; a chart that cannot be
+        # exported is reported in a note rather than failing the whole report.
+        try:
+            return ('image', fig.to_image(format='png', width=900, height=500), caption)
+        except Exception as e:
+            return ('error', ' '.join(str(e).split()))
+
+    def _dataset_overview(self):
+        blocks = [('section', '1. Dataset Overview')]
+
         overview_text = f"""
 Dataset Shape: {self.df.shape[0]} rows × {self.df.shape[1]} columns
 Total Cells: {self.df.shape[0] * self.df.shape[1]:,}
 Memory Usage: {self.df.memory_usage(deep=True).sum() / 1024**2:.2f} MB
-Missing Values: {self.df.isnull().sum().sum():,} ({(self.df.isnull().sum().sum() / (self.df.shape[0] * self.df.shape[1]) * 100):.2f}%)
-Duplicate Rows: {self.df.duplicated().sum():,}
+Missing Values: {self._count_missing_cells():,} ({self._missing_percentage():.2f}%)
+Duplicate Rows: {self._count_duplicate_rows():,}
         """
-        self._add_text(overview_text.strip())
-        
-        self._add_subsection_header('Column Information')
+        blocks.append(('text', overview_text.strip()))
+
+        blocks.append(('subsection', 'Column Information'))
         numeric_cols = self.df.select_dtypes(include=['number']).columns.tolist()
         categorical_cols = self.df.select_dtypes(include=['object', 'category']).columns.tolist()
-        
+
         col_info = f"""
 Numeric Columns ({len(numeric_cols)}): {', '.join(numeric_cols[:10])}{'...' if len(numeric_cols) > 10 else ''}
 Categorical Columns ({len(categorical_cols)}): {', '.join(categorical_cols[:10])}{'...' if len(categorical_cols) > 10 else ''}
         """
-        self._add_text(col_info.strip())
-    
-    def _add_statistical_summary(self):
-        self.pdf.add_page()
-        self._add_section_header('2. Statistical Analysis')
-        
+        blocks.append(('text', col_info.strip()))
+        return blocks
+
+    def _statistical_summary(self):
+        blocks = [('section', '2. Statistical Analysis')]
+
         if 'descriptive_stats' in self.analysis_results:
-            self._add_subsection_header('Descriptive Statistics')
             stats_df = self.analysis_results['descriptive_stats']
-            
-            for col in stats_df.columns[:5]:
-                stats_text = f"""
-Column: {col}
-  Mean: {stats_df.loc['mean', col]:.2f}
-  Median: {stats_df.loc['50%', col]:.2f}
-  Std Dev: {stats_df.loc['std', col]:.2f}
-  Min: {stats_df.loc['min', col]:.2f}
-  Max: {stats_df.loc['max', col]:.2f}
-                """
-                self._add_text(stats_text.strip())
-        
+            if not stats_df.empty:
+                blocks.append(('subsection', 'Descriptive Statistics'))
+                table = stats_df.loc[['mean', '50%', 'std', 'min', 'max']].T
+                table.columns = ['Mean', 'Median', 'Std Dev', 'Min', 'Max']
+                table.index.name = 'Column'
+                blocks.append(('table', table))
+
         if 'correlations' in self.analysis_results:
-            self._add_subsection_header('Strong Correlations')
+            blocks.append(('subsection', 'Strong Correlations'))
             corr_list = self.analysis_results['correlations']
             if corr_list:
                 for var1, var2, corr in corr_list[:5]:
-                    self._add_text(f"  • {var1} ↔ {var2}: {corr:.3f}")
+                    blocks.append(('text', f"  • {var1} ↔ {var2}: {corr:.3f}"))
             else:
-                self._add_text("  No strong correlations found")
-    
-    def _add_outlier_summary(self):
+                blocks.append(('text', "  No strong correlations found"))
+        return blocks
+
+    def _outlier_summary(self):
         if 'outliers' not in self.analysis_results:
-            return
-        
-        self.pdf.add_page()
-        self._add_section_header('3. Outlier Detection')
-        
+            return []
+
+        blocks = [('section', '3. Outlier Detection')]
+
         outlier_data = self.analysis_results['outliers']
-        
+
         for method, data in outlier_data.items():
-            self._add_subsection_header(f'{method.upper()} Method')
-            
+            blocks.append(('subsection', f'{method.upper()} Method'))
+
             if isinstance(data, dict) and 'columns' in data:
-                for col, info in data['columns'].items():
-                    outlier_text = f"""
-Column: {col}
-  Outliers Found: {info['outlier_count']} ({info['outlier_percentage']:.2f}%)
-                    """
-                    self._add_text(outlier_text.strip())
-    
-    def _add_trend_summary(self):
+                table = pd.DataFrame({
+                    'Outliers Found': [info['outlier_count'] for info in data['columns'].values()],
+                    'Percentage': [info['outlier_percentage'] for info in data['columns'].values()],
+                }, index=pd.Index(list(data['columns']), name='Column'))
+                blocks.append(('table', table))
+        return blocks
+
+    def _trend_summary(self):
         if 'trends' not in self.analysis_results:
-            return
-        
-        self.pdf.add_page()
-        self._add_section_header('4. Trend Analysis')
-        
+            return []
+
+        blocks = [('section', '4. Trend Analysis')]
+
         trend_data = self.analysis_results['trends']
-        
+
         for col, info in trend_data.items():
             if 'trend' in info and info['trend']:
                 trend_info = info['trend']
@@ -125,45 +137,97 @@ Column: {col}
 Column: {col}
   Direction: {trend_info.get('trend_direction', 'N/A').upper()}
   Total Change: {trend_info.get('total_change_percent', 0):.2f}%
+  Slope: {trend_info.get('slope', 0):.4g} {trend_info.get('slope_unit', '')}
   R-squared: {trend_info.get('r_squared', 0):.3f}
                 """
-                self._add_text(trend_text.strip())
-    
-    def _add_recommendations(self):
-        self.pdf.add_page()
-        self._add_section_header('5. Recommendations')
-        
+                blocks.append(('text', trend_text.strip()))
+        return blocks
+
+    def _recommendations(self):
+        blocks = [('section', '5. Recommendations')]
+
         recommendations = []
-        
-        missing_pct = (self.df.isnull().sum().sum() / (self.df.shape[0] * self.df.shape[1]) * 100)
+
+        missing_pct = self._missing_percentage()
         if missing_pct > 5:
             recommendations.append(f"• High percentage of missing values ({missing_pct:.2f}%). Consider imputation strategies.")
-        
-        dup_count = self.df.duplicated().sum()
+
+        dup_count = self._count_duplicate_rows()
         if dup_count > 0:
             recommendations.append(f"• Found {dup_count} duplicate rows. Review and remove if necessary.")
-        
+
         if 'outliers' in self.analysis_results:
             recommendations.append("• Outliers detected. Review for data quality issues.")
-        
+
         if 'correlations' in self.analysis_results and self.analysis_results['correlations']:
             recommendations.append("• Strong correlations found between variables.")
-        
+
         if not recommendations:
             recommendations.append("• Dataset appears clean and well-structured.")
-        
-        for rec in recommendations:
-            self._add_text(rec)
-    
-    def generate_report(self, output_path):
-        self._add_title_page()
-        self._add_dataset_overview()
-        self._add_statistical_summary()
-        self._add_outlier_summary()
-        self._add_trend_summary()
-        self._add_recommendations()
-        
-        self.pdf.output(output_path)
-        return output_path
-    
 
+        blocks.extend(('text', rec) for rec in recommendations)
+        return blocks
+
+    def _chart_tasks(self):
+        # Each task builds one figure and exports it; they run alongside the
+        # text sections and are placed in their own section at the end.
+        tasks = []
+        if len(self.visualizer.numeric_columns) >= 2:
+            tasks.append(lambda: self._chart(
+                self.visualizer.plot_correlation_heatmap(corr_matrix=self.corr_matrix), 'Correlation heatmap'
+            ))
+        for col in self.visualizer.numeric_columns[:self.max_distribution_charts]:
+            tasks.append(lambda col=col: self._chart(self.visualizer.plot_distribution(col), f'Distribution of {col}'))
+        return tasks
+
+    def build_blocks(self, progress=None):
+        # Shared counts are computed up front so worker threads only read them.
+        self._count_missing_cells()
+        self._count_duplicate_rows()
+
+        tasks = [getattr(self, f'_{section}') for section in self.SECTIONS]
+        chart_tasks = self._chart_tasks() if self.charts else []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(task) for task in tasks + chart_tasks]
+            try:
+                for done, _ in enumerate(as_completed(futures), 1):
+                    if progress is not None:
+                        progress(0.9 * done / len(futures), f"Built {done} of {len(futures)} report parts")
+            except BaseException:
+                # Stop queued parts from starting when the caller gives up.
+                for future in futures:
+                    future.cancel()
+                raise
+            results = [future.result() for future in futures]
+
+        blocks = [block for section in results[:len(tasks)] for block in section]
+        if chart_tasks:
+            charts = results[len(tasks):]
+            errors = [chart[1] for chart in charts if chart[0] == 'error']
+            blocks.append(('section', '6. Charts'))
+            blocks.extend(chart for chart in charts if chart[0] == 'image')
+            if errors:
+                blocks.append(('text', f"{len(errors)} chart(s) could not be exported: {errors[0]}"))
+        return blocks
+
+    def generate_report(self, output=None, format='pdf', progress=None):
+        # Writes to ``output`` (a path or binary stream) and returns it; with
+        # no output the report is returned in a new BytesIO. ``progress`` is
+        # called as progress(fraction, message) while the report is built.
+        if format not in RENDERERS:
+            raise ValueError(f"Unsupported report format '{format}', expected one of {tuple(RENDERERS)}")
+        blocks = self.build_blocks(progress)
+        if progress is not None:
+            progress(0.9, f"Rendering {format.upper()}")
+        generated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        renderer = RENDERERS[format]()
+        if isinstance(output, str):
+            with open(output, 'wb') as f:
+                renderer.render("Data Analysis Report", generated, blocks, f)
+            return output
+        stream = output if output is not None else BytesIO()
+        renderer.render("Data Analysis Report", generated, blocks, stream)
+        if output is None:
+            stream.seek(0)
+        return stream
@@ -0,0 +1,164 @@
+import base64
+import html
+from io import BytesIO
+
+try:
+    import fpdf
+except ImportError:
+    fpdf = None
+
+
+def fpdf_error():
+    # The old fpdf 1.x package and fpdf2 install the same ``fpdf`` module, so
+    # an old install imports fine and only fails halfway through a PDF. Only
+    # PDF rendering depends on it; returns why it cannot run, or None.
+    if fpdf is None:
+        return "PDF reports need fpdf2. Run 'pip install fpdf2'."
+    if int(fpdf.FPDF_VERSION.split('.')[0]) < 2:
+        return (f"PDF reports need fpdf2, but fpdf {fpdf.FPDF_VERSION} is installed. "
+                "Run 'pip uninstall fpdf' and then 'pip install fpdf2'.")
+    return None
+
+
+# A report is a list of blocks built independently of any output format:
+#   ('section', title), ('subsection', title), ('text', text),
+#   ('table', DataFrame), ('image', png_bytes, caption)
+# Each renderer turns the blocks into one document written to a stream.
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f"{value:,.3f}"
+    return str(value)
+
+
+class PDFReportRenderer:
+
+    mime = 'application/pdf'
+    extension = 'pdf'
+
+    def __init__(self, max_table_rows=30):
+        error = fpdf_error()
+        if error is not None:
+            raise ImportError(error)
+        self.max_table_rows = max_table_rows
+        self.pdf = fpdf.FPDF()
+        self.pdf.set_auto_page_break(auto=True, margin=15)
+
+    def _latin1(self, text):
+        return str(text).encode('latin-1', 'replace').decode('latin-1')
+
+    def _title_page(self, title, generated):
+        self.pdf.add_page()
+        self.pdf.set_font('Arial', 'B', 24)
+        self.pdf.cell(0, 60, '', 0, 1)
+        self.pdf.cell(0, 10, self._latin1(title), 0, 1, 'C')
+
+        self.pdf.set_font('Arial', '', 12)
+        self.pdf.cell(0, 10, f"Generated: {generated}", 0, 1, 'C')
+        self.pdf.cell(0, 10, "Author: Automated Dashboard", 0, 1, 'C')
+
+    def _section(self, title):
+        self.pdf.add_page()
+        self.pdf.set_font('Arial', 'B', 16)
+        self.pdf.cell(0, 10, self._latin1(title), 0, 1, 'L')
+        self.pdf.ln(5)
+
+    def _subsection(self, title):
+        self.pdf.set_font('Arial', 'B', 12)
+        self.pdf.cell(0, 8, self._latin1(title), 0, 1, 'L')
+        self.pdf.ln(2)
+
+    def _text(self, text):
+        self.pdf.set_font('Arial', '', 10)
+        self.pdf.multi_cell(0, 6, self._latin1(text))
+        self.pdf.ln(3)
+
+    def _table(self, table):
+        table = table.head(self.max_table_rows)
+        headers = [table.index.name or ''] + [str(col) for col in table.columns]
+        width = self.pdf.epw / len(headers)
+
+        self.pdf.set_font('Arial', 'B', 8)
+        for header in headers:
+            self.pdf.cell(width, 6, self._latin1(header)[:24], 1, 0, 'C')
+        self.pdf.ln()
+        self.pdf.set_font('Arial', '', 8)
+        for label, row in table.iterrows():
+            self.pdf.cell(width, 6, self._latin1(label)[:24], 1, 0, 'L')
+            for value in row:
+                self.pdf.cell(width, 6, self._latin1(_format_value(value))[:24], 1, 0, 'R')
+            self.pdf.ln()
+        self.pdf.ln(3)
+
+    def _image(self, png, caption):
+        self.pdf.image(BytesIO(png), w=self.pdf.epw)
+        self._text(caption)
+
+    def render(self, title, generated, blocks, stream):
+        self._title_page(title, generated)
+        for kind, *content in blocks:
+            getattr(self, f'_{kind}')(*content)
+        stream.write(bytes(self.pdf.output()))
+        return stream
+
+
+class HTMLReportRenderer:
+
+    mime = 'text/html'
+    extension = 'html'
+
+    STYLE = """
+body { font-family: Helvetica, Arial, sans-serif; max-width: 960px; margin: 2em auto; color: #222; }
+h1 { text-align: center; } .generated { text-align: center; color: #666; }
+h2 { border-bottom: 1px solid #ccc; padding-bottom: 4px; margin-top: 2em; }
+table { border-collapse: collapse; margin: 1em 0; font-size: 0.9em; }
+th, td { border: 1px solid #ccc; padding: 4px 8px; text-align: right; }
+th { background: #f3f3f3; }
+pre { font-family: inherit; white-space: pre-wrap; }
+figure { margin: 1em 0; } img { max-width: 100%; } figcaption { color: #666; font-size: 0.9em; }
+"""
+
+    def __init__(self, max_table_rows=200):
+        self.max_table_rows = max_table_rows
+        self.parts = []
+
+    def _section(self, title):
+        self.parts.append(f"<h2>{html.escape(title)}</h2>")
+
+    def _subsection(self, title):
+        self.parts.append(f"<h3>{html.escape(title)}</h3>")
+
+    def _text(self, text):
+        self.parts.append(f"<pre>{html.escape(text)}</pre>")
+
+    def _table(self, table):
+        self.parts.append(table.head(self.max_table_rows).to_html(float_format=_format_value, border=0))
+
+    def _image(self, png, caption):
+        # Images are inlined as data URIs so the file stands on its own.
+        data = base64.b64encode(png).decode('ascii')
+        self.parts.append(
+            f'<figure><img src="data:image/png;base64,{data}" alt="{html.escape(caption)}">'
+            f'<figcaption>{html.escape(caption)}</figcaption></figure>'
+        )
+
+    def render(self, title, generated, blocks, stream):
+        for kind, *content in blocks:
+            getattr(self, f'_{kind}')(*content)
+        document = (
+            f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f'<style>{self.STYLE}</style></head><body>'
+            f'<h1>{html.escape(title)}</h1><p class="generated">Generated: {generated}</p>'
+            + '\n'.join(self.parts)
+            + '</body></html>'
+        )
+        stream.write(document.encode('utf-8'))
+        return stream
+
+
+RENDERERS = {'pdf': PDFReportRenderer, 'html': HTMLReportRenderer}
+
+
+def available_formats():
+    return [format for format in RENDERERS if format != 'pdf' or fpdf_error() is None]
@@ -1,6 +1,9 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
+from modules.column_stats import ColumnStatistics, CoMomentAccumulator
+from modules.correlation_engine import CorrelationEngine, strong_pairs
+from modules.distribution_profiler import DistributionProfiler
+from modules.lazy_frame import is_lazy, iter_chunks
 
 
 class StatisticalAnalyzer:
@@ -9,71 +12,119 @@ class StatisticalAnalyzer:
         self.df = df
         self.numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
         self.categorical_columns = df.select_dtypes(include=['object', 'category']).columns.tolist()
+        self._column_stats = None
+        self._descriptive = None
+        self._comoments = None
+        self._engines = {}
+        self._profilers = []
+        self._distributions = {}
     
-    def descriptive_statistics(self):
+    def descriptive_statistics(self, approximate=False, chunk_size=None):
         if not self.numeric_columns:
             return pd.DataFrame()
-            
-        desc_stats = self.df[self.numeric_columns].describe()
         
-        additional_stats = pd.DataFrame({
-            'variance': self.df[self.numeric_columns].var(),
-            'skewness': self.df[self.numeric_columns].skew(),
-            'kurtosis': self.df[self.numeric_columns].kurtosis(),
-            'range': self.df[self.numeric_columns].max() - self.df[self.numeric_columns].min(),
-            'iqr': self.df[self.numeric_columns].quantile(0.75) - self.df[self.numeric_columns].quantile(0.25)
-        }).T
-        
-        desc_stats = pd.concat([desc_stats, additional_stats])
-        return desc_stats
+        # Exact quantiles are read from the frame itself, which a lazy
+        # dataset does not hold in memory.
+        approximate = approximate or is_lazy(self.df)
+        if self._column_stats is None or self._column_stats.approximate != approximate:
+            self._column_stats = self.column_statistics(chunk_size=chunk_size, approximate=approximate)
+            self._descriptive = None
+        if self._descriptive is None:
+            self._descriptive = self._column_stats.to_frame(self.df)
+        return self._descriptive
+    
+    def column_statistics(self, chunk_size=None, approximate=False):
+        col_stats = ColumnStatistics(self.numeric_columns, approximate=approximate)
+        for chunk in iter_chunks(self.df, self.numeric_columns, chunk_size):
+            col_stats.update(chunk)
+        return col_stats
+    
+    def correlation_engine(self, method='pearson'):
+        if method not in self._engines:
+            self._engines[method] = CorrelationEngine(self.df, self.numeric_columns, method=method)
+        return self._engines[method]
+    
+    def _uses_engine(self, method):
+        # Lazy frames and appended data keep Pearson in running co-moments.
+        if method not in CorrelationEngine.METHODS or is_lazy(self.df):
+            return False
+        return method != 'pearson' or self._comoments is None
     
     def correlation_analysis(self, method='pearson'):
         if len(self.numeric_columns) < 2:
             return pd.DataFrame()
         
+        if method == 'pearson' and self._comoments is None and is_lazy(self.df):
+            self._comoments = CoMomentAccumulator(self.numeric_columns)
+            for chunk in iter_chunks(self.df, self.numeric_columns):
+                self._comoments.update(chunk)
+        
+        if method == 'pearson' and self._comoments is not None:
+            return self._comoments.correlation()
+        
+        if self._uses_engine(method):
+            return self.correlation_engine(method).matrix()
+        
         corr_matrix = self.df[self.numeric_columns].corr(method=method)
         return corr_matrix
     
-    def get_strong_correlations(self, threshold=0.7, method='pearson'):
-        corr_matrix = self.correlation_analysis(method=method)
-        strong_corr = []
+    def append(self, delta, df=None):
+        # Accumulators are built over the current rows once, then only the
+        # delta is folded in; later appends never rescan the existing rows.
+        if self._column_stats is None:
+            self._column_stats = self.column_statistics()
+        if self._comoments is None:
+            self._comoments = CoMomentAccumulator(self.numeric_columns).update(self.df[self.numeric_columns])
         
-        for i in range(len(corr_matrix.columns)):
-            for j in range(i+1, len(corr_matrix.columns)):
-                corr_val = corr_matrix.iloc[i, j]
-                if abs(corr_val) >= threshold:
-                    strong_corr.append((
-                        corr_matrix.columns[i],
-                        corr_matrix.columns[j],
-                        corr_val
-                    ))
+        self._column_stats.update(delta[self.numeric_columns])
+        self._comoments.update(delta[self.numeric_columns])
+        self._descriptive = None
+        self._engines = {}
+        for profiler in self._profilers:
+            profiler.update(delta[profiler.columns])
+            for col in profiler.columns:
+                self._distributions.pop(col, None)
         
-        return sorted(strong_corr, key=lambda x: abs(x[2]), reverse=True)
+        self.df = df if df is not None else pd.concat([self.df, delta], ignore_index=True)
+        return self.df
+    
+    def get_strong_correlations(self, threshold=0.7, method='pearson', corr_matrix=None):
+        if corr_matrix is not None:
+            return strong_pairs(corr_matrix, threshold)
+        if len(self.numeric_columns) < 2:
+            return []
+        if self._uses_engine(method):
+            return self.correlation_engine(method).strong_pairs(threshold)
+        return strong_pairs(self.correlation_analysis(method=method), threshold)
+    
+    def _profile(self, profiler, chunk_size=None):
+        # Moments and medians come from the descriptive statistics, computed
+        # once for all numeric columns and kept up to date by append().
+        approximate = self._column_stats is not None and self._column_stats.approximate
+        median = self.descriptive_statistics(approximate=approximate, chunk_size=chunk_size).loc['50%']
+        positions = [self.numeric_columns.index(col) for col in profiler.columns]
+        moments = self._column_stats.moments.subset(positions)
+        return profiler.profile(moments, median[profiler.columns].to_numpy()).to_dict(orient='index')
+    
+    def distribution_profile(self, columns=None, chunk_size=None):
+        # Profiles are cached per column. Columns not seen yet are profiled
+        # together in one pass; columns whose profiler took appended rows are
+        # re-read from that profiler without touching the data again.
+        columns = self.numeric_columns if columns is None else [c for c in columns if c in self.numeric_columns]
+        for profiler in self._profilers:
+            if any(col not in self._distributions for col in profiler.columns):
+                self._distributions.update(self._profile(profiler))
+        
+        missing = [col for col in columns if col not in self._distributions]
+        if missing:
+            profiler = DistributionProfiler(missing)
+            for chunk in iter_chunks(self.df, missing, chunk_size):
+                profiler.update(chunk)
+            self._profilers.append(profiler)
+            self._distributions.update(self._profile(profiler, chunk_size))
+        return pd.DataFrame.from_dict({col: self._distributions[col] for col in columns}, orient='index')
     
     def distribution_analysis(self, column):
         if column not in self.numeric_columns:
             return {}
-        
-        data = self.df[column].dropna()
-        
-        if len(data) >= 3 and len(data) <= 5000:
-            shapiro_stat, shapiro_p = stats.shapiro(data)
-        else:
-            shapiro_stat, shapiro_p = None, None
-        
-        ks_stat, ks_p = stats.kstest(data, 'norm', args=(data.mean(), data.std()))
-        
-        analysis = {
-            'mean': data.mean(),
-            'median': data.median(),
-            'mode': data.mode().values[0] if not data.mode().empty else None,
-            'std': data.std(),
-            'variance': data.var(),
-            'skewness': stats.skew(data),
-            'kurtosis': stats.kurtosis(data),
-            'is_normal_ks': ks_p > 0.05,
-            'min': data.min(),
-            'max': data.max()
-        }
-        
-        return analysis
+        return self.distribution_profile([column]).loc[column].to_dict()
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+
+class StreamingAnomalyDetector:
+
+    METHODS = ('rolling_mad', 'ewma')
+
+    def __init__(self, columns, method='rolling_mad', window=30, threshold=None, min_periods=None):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown method '{method}', expected one of {self.METHODS}")
+        self.columns = list(columns)
+        self.method = method
+        self.window = window
+        self.threshold = threshold if threshold is not None else (3.5 if method == 'rolling_mad' else 3.0)
+        self.min_periods = min_periods if min_periods is not None else max(window // 2, 3)
+        self.alpha = 2.0 / (window + 1)
+        self.reset()
+
+    def reset(self):
+        k = len(self.columns)
+        self.count = np.zeros(k)
+        # Rolling MAD keeps the last window - 1 values and deviations; EWMA
+        # keeps one mean and one mean of squares per column.
+        self._tail_values = np.empty((0, k))
+        self._tail_deviations = np.empty((0, k))
+        self._ewm_mean = np.full(k, np.nan)
+        self._ewm_square = np.full(k, np.nan)
+
+    def _values(self, chunk):
+        if isinstance(chunk, pd.DataFrame):
+            return chunk[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        values = np.asarray(chunk, dtype=np.float64)
+        return values.reshape(-1, 1) if values.ndim == 1 else values
+
+    def _rolling_mad(self, values):
+        n_tail = len(self._tail_values)
+        window_values = pd.DataFrame(np.vstack([self._tail_values, values]))
+        median = window_values.rolling(self.window, min_periods=1).median().to_numpy()
+
+        deviations = np.abs(window_values.to_numpy() - median)
+        deviations[:n_tail] = self._tail_deviations
+        mad = pd.DataFrame(deviations).rolling(self.window, min_periods=1).median().to_numpy()
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            score = 0.6745 * deviations / mad
+            mask = (score > self.threshold) & (mad > 0)
+
+        keep = self.window - 1
+        self._tail_values = window_values.to_numpy()[-keep:] if keep else self._tail_values[:0]
+        self._tail_deviations = deviations[-keep:] if keep else self._tail_deviations[:0]
+        return mask[n_tail:]
+
+    def _ewma(self, values):
+        # The stored state is prepended as a pseudo-observation so pandas'
+        # recursive ewm continues exactly where the previous chunk stopped.
+        has_state = ~np.isnan(self._ewm_mean)
+        prefix = np.where(has_state, self._ewm_mean, np.nan)[None, :]
+        prefix_square = np.where(has_state, self._ewm_square, np.nan)[None, :]
+
+        frame = pd.DataFrame(np.vstack([prefix, values]))
+        square_frame = pd.DataFrame(np.vstack([prefix_square, values * values]))
+        mean = frame.ewm(alpha=self.alpha, adjust=False, ignore_na=True).mean().to_numpy()
+        square = square_frame.ewm(alpha=self.alpha, adjust=False, ignore_na=True).mean().to_numpy()
+
+        # Each row is scored against the state before it was folded in.
+        prev_mean = mean[:-1]
+        prev_std = np.sqrt(np.maximum(square[:-1] - mean[:-1] ** 2, 0.0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mask = (np.abs(values - prev_mean) / prev_std > self.threshold) & (prev_std > 0)
+
+        self._ewm_mean = mean[-1]
+        self._ewm_square = square[-1]
+        return mask
+
+    def update(self, chunk):
+        values = self._values(chunk)
+        if len(values) == 0:
+            return np.zeros((0, len(self.columns)), dtype=bool)
+
+        if self.method == 'rolling_mad':
+            mask = self._rolling_mad(values)
+        else:
+            mask = self._ewma(values)
+
+        # Rows are only flagged once enough observations precede them.
+        seen = self.count + np.cumsum(~np.isnan(values), axis=0)
+        mask &= seen > self.min_periods
+        mask &= ~np.isnan(values)
+        self.count = seen[-1]
+        return mask
+
+    def detect(self, chunks):
+        for chunk in chunks:
+            yield self.update(chunk)
+
+    def run(self, chunks):
+        masks = list(self.detect(chunks))
+        if not masks:
+            return np.zeros((0, len(self.columns)), dtype=bool)
+        return np.vstack(masks)
@@ -1,69 +1,332 @@
+import warnings
+
 import pandas as pd
 import numpy as np
 from scipy import stats
 
+from modules.column_stats import RegressionAccumulator
+from modules.lazy_frame import column_sample
+
 
 class TrendAnalyzer:
     
-    def __init__(self, df):
+    DATE_FORMATS = [
+        '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y/%m/%d',
+        '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%m-%d-%Y', '%d.%m.%Y',
+        '%d/%m/%Y %H:%M', '%m/%d/%Y %H:%M', '%Y%m%d', '%b %d, %Y', '%d %b %Y'
+    ]
+    
+    RESAMPLE_FREQUENCIES = {'daily': 'D', 'weekly': 'W', 'monthly': 'M', 'quarterly': 'Q', 'yearly': 'Y'}
+    
+    def __init__(self, df, sample_size=200):
         self.df = df
         self.numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
         self.time_column = None
+        self.sample_size = sample_size
+        self.time_formats = {}
+        self._time_values = {}
+        self._time_orders = {}
+        self._time_buckets = {}
+        self._regressions = {}
+    
+    def _candidate_formats(self, sample):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            guessed = pd.tseries.api.guess_datetime_format(sample.iloc[0])
+        formats = [guessed] if guessed else []
+        return formats + [fmt for fmt in self.DATE_FORMATS if fmt != guessed]
+    
+    def infer_datetime_format(self, column):
+        values = column_sample(self.df, column, self.sample_size)
+        if values.empty:
+            return None
+        
+        sample = values.astype(str)
+        if not sample.str.contains(r'\d', regex=True).all():
+            return None
+        
+        for fmt in self._candidate_formats(sample):
+            parsed = pd.to_datetime(sample, format=fmt, errors='coerce')
+            if parsed.notna().all():
+                return fmt
+        return None
+    
+    def _convert_time(self, values, time_column):
+        if pd.api.types.is_datetime64_any_dtype(values) or pd.api.types.is_numeric_dtype(values):
+            return values
+        fmt = self.time_formats.get(time_column)
+        if fmt is None:
+            fmt = self.infer_datetime_format(time_column)
+            self.time_formats[time_column] = fmt
+        return pd.to_datetime(values, format=fmt, errors='coerce')
+    
+    def get_time_values(self, time_column):
+        if time_column not in self._time_values:
+            self._time_values[time_column] = self._convert_time(self.df[time_column], time_column)
+        return self._time_values[time_column]
     
     def detect_time_column(self):
-        for col in self.df.columns:
-            if pd.api.types.is_datetime64_any_dtype(self.df[col]):
+        # Columns are screened on a small sample against candidate formats;
+        # only the winning column is converted in full, once, and cached.
+        for col, dtype in self.df.dtypes.items():
+            if pd.api.types.is_datetime64_any_dtype(dtype):
                 self.time_column = col
                 return col
             
-            if self.df[col].dtype == 'object':
-                try:
-                    pd.to_datetime(self.df[col])
+            is_text = pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+            if is_text or isinstance(dtype, pd.CategoricalDtype):
+                fmt = self.infer_datetime_format(col)
+                if fmt is not None:
+                    self.time_formats[col] = fmt
                     self.time_column = col
+                    self.get_time_values(col)
                     return col
-                except:
-                    pass
         
         return None
     
-    def identify_trend(self, column, time_column=None):
-        if column not in self.numeric_columns:
-            return None
+    def get_time_order(self, time_column):
+        if time_column not in self._time_orders:
+            time_values = np.asarray(self.get_time_values(time_column))
+            self._time_orders[time_column] = np.argsort(time_values, kind='stable')
+        return self._time_orders[time_column]
+    
+    def _time_axis(self, time_column, order, x_axis):
+        if x_axis == 'position':
+            return np.arange(len(order), dtype=np.float64)
+        
+        elapsed = self._raw_axis(np.asarray(self.get_time_values(time_column))[order])
+        return elapsed - np.nanmin(elapsed)
+    
+    def _raw_axis(self, time_values):
+        # Datetimes become fractional days since the epoch, so slopes are per day.
+        time_values = np.asarray(time_values)
+        if np.issubdtype(time_values.dtype, np.datetime64):
+            elapsed = time_values.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+            elapsed[np.isnat(time_values)] = np.nan
+            return elapsed / (86400 * 1e9)
+        return time_values.astype(np.float64)
+    
+    def _p_values(self, r, n):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dof = n - 2
+            t_stat = r * np.sqrt(dof / ((1.0 - r) * (1.0 + r)))
+            return np.where(np.abs(r) == 1.0, 0.0, 2 * stats.t.sf(np.abs(t_stat), dof))
+    
+    def _endpoints(self, x, y):
+        # First and last present value of every column in time order.
+        valid = ~np.isnan(y) & ~np.isnan(x)[:, None]
+        first = np.argmax(valid, axis=0)
+        last = len(y) - 1 - np.argmax(valid[::-1], axis=0)
+        columns = np.arange(y.shape[1])
+        has_values = valid.any(axis=0)
+        return (
+            np.where(has_values, x[first], np.nan), np.where(has_values, y[first, columns], np.nan),
+            np.where(has_values, x[last], np.nan), np.where(has_values, y[last, columns], np.nan)
+        )
+    
+    def _fit_block(self, x, y):
+        # Ordinary least squares for every column at once; each column only
+        # uses the rows where both x and its own value are present.
+        valid = ~np.isnan(y) & ~np.isnan(x)[:, None]
+        n = valid.sum(axis=0).astype(np.float64)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_mean = np.where(valid, x[:, None], 0.0).sum(axis=0) / n
+            y_mean = np.where(valid, y, 0.0).sum(axis=0) / n
+            dx = np.where(valid, x[:, None] - x_mean, 0.0)
+            dy = np.where(valid, y - y_mean, 0.0)
+            sxx = (dx * dx).sum(axis=0)
+            syy = (dy * dy).sum(axis=0)
+            sxy = (dx * dy).sum(axis=0)
+            
+            slope = sxy / sxx
+            intercept = y_mean - slope * x_mean
+            r = np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0)
+            r = np.where(syy > 0, r, 0.0)
+        
+        _, first, _, last = self._endpoints(x, y)
+        return n, slope, intercept, r, self._p_values(r, n), first, last
+    
+    def _slope_unit(self, time_column, x_axis):
+        if x_axis == 'position':
+            return 'per row'
+        if pd.api.types.is_datetime64_any_dtype(self.get_time_values(time_column)):
+            return 'per day'
+        return f'per unit of {time_column}'
+    
+    def _trend_results(self, columns, n, slope, intercept, r, p_value, first, last, x_axis, slope_unit):
+        trends = {}
+        for i, col in enumerate(columns):
+            if n[i] < 2 or np.isnan(slope[i]):
+                trends[col] = None
+                continue
+            
+            trend_direction = 'increasing' if slope[i] > 0 else 'decreasing' if slope[i] < 0 else 'stable'
+            total_change = ((last[i] - first[i]) / first[i]) * 100 if first[i] != 0 else 0
+            
+            trends[col] = {
+                'slope': slope[i],
+                'intercept': intercept[i],
+                'r_squared': r[i] ** 2,
+                'p_value': p_value[i],
+                'trend_direction': trend_direction,
+                'total_change_percent': total_change,
+                'x_axis': x_axis,
+                'slope_unit': slope_unit
+            }
+        return trends
+    
+    def _incremental_trends(self, columns, time_column):
+        state = self._regressions[time_column]
+        idx = [state['columns'].index(col) for col in columns]
+        n, slope, intercept, r = (values[idx] for values in state['acc'].fit())
+        # Report the intercept at the earliest time seen, like a full fit would.
+        intercept = intercept + slope * state['min_x']
+        return self._trend_results(
+            columns, n, slope, intercept, r, self._p_values(r, n),
+            state['first_y'][idx], state['last_y'][idx], 'elapsed', self._slope_unit(time_column, 'elapsed')
+        )
+    
+    def identify_trends(self, columns=None, time_column=None, x_axis='elapsed', block_size=256):
+        if columns is None:
+            columns = self.numeric_columns
+        columns = [col for col in columns if col in self.numeric_columns]
         
         if time_column is None:
             time_column = self.time_column or self.detect_time_column()
         
-        if time_column is None:
-            return None
+        if time_column is None or not columns:
+            return {}
+        
+        state = self._regressions.get(time_column)
+        if x_axis == 'elapsed' and state is not None and set(columns) <= set(state['columns']):
+            return self._incremental_trends(columns, time_column)
+        
+        order = self.get_time_order(time_column)
+        x = self._time_axis(time_column, order, x_axis)
+        slope_unit = self._slope_unit(time_column, x_axis)
+        
+        trends = {}
+        for start in range(0, len(columns), block_size):
+            block = columns[start:start + block_size]
+            y = self.df[block].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+            trends.update(self._trend_results(block, *self._fit_block(x, y), x_axis, slope_unit))
+        
+        return trends
+    
+    def _start_regression(self, time_column):
+        order = self.get_time_order(time_column)
+        x = self._raw_axis(np.asarray(self.get_time_values(time_column))[order])
+        origin = np.nanmin(x) if np.isfinite(x).any() else 0.0
+        x = x - origin
+        y = self.df[self.numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+        
+        first_x, first_y, last_x, last_y = self._endpoints(x, y)
+        self._regressions[time_column] = {
+            'columns': list(self.numeric_columns),
+            'origin': origin,
+            'min_x': 0.0,
+            'acc': RegressionAccumulator(len(self.numeric_columns)).update(x, y),
+            'first_x': first_x, 'first_y': first_y,
+            'last_x': last_x, 'last_y': last_y
+        }
+    
+    def _update_regression(self, time_column, delta, delta_times):
+        state = self._regressions[time_column]
+        x = self._raw_axis(delta_times) - state['origin']
+        order = np.argsort(x, kind='stable')
+        x = x[order]
+        y = delta[state['columns']].to_numpy(dtype=np.float64, na_value=np.nan)[order]
         
-        df_sorted = self.df.sort_values(time_column)
-        x = np.arange(len(df_sorted))
-        y = df_sorted[column].values
+        state['acc'].update(x, y)
+        if np.isfinite(x).any():
+            state['min_x'] = min(state['min_x'], np.nanmin(x))
         
-        mask = ~np.isnan(y)
-        x_clean = x[mask]
-        y_clean = y[mask]
+        first_x, first_y, last_x, last_y = self._endpoints(x, y)
+        # Ties keep the existing first value and hand "last" to the newer rows,
+        # matching a stable sort of the combined frame.
+        earlier = (first_x < state['first_x']) | np.isnan(state['first_x'])
+        later = (last_x >= state['last_x']) | (np.isnan(state['last_x']) & ~np.isnan(last_x))
+        state['first_x'] = np.where(earlier, first_x, state['first_x'])
+        state['first_y'] = np.where(earlier, first_y, state['first_y'])
+        state['last_x'] = np.where(later, last_x, state['last_x'])
+        state['last_y'] = np.where(later, last_y, state['last_y'])
+    
+    def append(self, delta, df=None):
+        # Regression sums for the detected time column are seeded from the
+        # current rows once; after that each append only touches the delta.
+        delta = delta.reset_index(drop=True)
+        combined = df if df is not None else pd.concat([self.df, delta], ignore_index=True)
+        
+        time_column = self.time_column
+        if time_column is not None and time_column not in self._regressions and self.numeric_columns:
+            self._start_regression(time_column)
         
-        if len(x_clean) < 2:
+        for col in list(self._time_values):
+            delta_times = self._convert_time(delta[col], col)
+            if col in self._regressions:
+                self._update_regression(col, delta, delta_times)
+            self._time_values[col] = pd.concat([self._time_values[col], delta_times], ignore_index=True)
+        
+        self._time_orders.clear()
+        self._time_buckets.clear()
+        self.df = combined
+        return self.df
+    
+    def identify_trend(self, column, time_column=None, x_axis='elapsed'):
+        if column not in self.numeric_columns:
             return None
+        return self.identify_trends([column], time_column, x_axis=x_axis).get(column)
+    
+    def get_time_buckets(self, time_column, freq):
+        period = self.RESAMPLE_FREQUENCIES.get(freq, freq)
+        key = (time_column, period)
+        if key not in self._time_buckets:
+            time_values = self.get_time_values(time_column)
+            self._time_buckets[key] = time_values.dt.to_period(period).dt.start_time.rename(time_column)
+        return self._time_buckets[key]
+    
+    def resample(self, freq='daily', agg='sum', columns=None, group_by=None, time_column=None):
+        if time_column is None:
+            time_column = self.time_column or self.detect_time_column()
+        if columns is None:
+            columns = self.numeric_columns
+        columns = [col for col in columns if col in self.numeric_columns and col not in (time_column, group_by)]
+        
+        if time_column is None or not pd.api.types.is_datetime64_any_dtype(self.get_time_values(time_column)):
+            return pd.DataFrame()
         
-        slope, intercept, r_value, p_value, std_err = stats.linregress(x_clean, y_clean)
+        keys = [self.get_time_buckets(time_column, freq)]
+        if group_by is not None:
+            keys.append(self.df[group_by])
         
-        trend_direction = 'increasing' if slope > 0 else 'decreasing' if slope < 0 else 'stable'
+        resampled = self.df[columns].groupby(keys, observed=True, sort=True).agg(agg)
+        return resampled.reset_index()
+    
+    def identify_resampled_trends(self, freq='daily', agg='sum', columns=None, group_by=None,
+                                  time_column=None, x_axis='elapsed'):
+        # Trends are fitted on one point per bucket (per group), so their cost
+        # follows the number of buckets rather than the number of rows.
+        if time_column is None:
+            time_column = self.time_column or self.detect_time_column()
+        resampled = self.resample(freq, agg, columns, group_by, time_column)
+        if resampled.empty:
+            return {}
         
-        total_change = ((y_clean[-1] - y_clean[0]) / y_clean[0]) * 100 if y_clean[0] != 0 else 0
+        if group_by is None:
+            return TrendAnalyzer(resampled).identify_trends(time_column=time_column, x_axis=x_axis)
         
         return {
-            'slope': slope,
-            'intercept': intercept,
-            'r_squared': r_value ** 2,
-            'p_value': p_value,
-            'trend_direction': trend_direction,
-            'total_change_percent': total_change
+            group: TrendAnalyzer(group_df.drop(columns=group_by)).identify_trends(
+                time_column=time_column, x_axis=x_axis
+            )
+            for group, group_df in resampled.groupby(group_by, observed=True, sort=True)
         }
     
-    def calculate_moving_average(self, column, window=7):
+    def calculate_moving_average(self, column, window=7, method='simple'):
         if column not in self.numeric_columns:
             return pd.Series()
         
+        if method == 'ewma':
+            return self.df[column].ewm(span=window, adjust=False, ignore_na=True).mean()
         return self.df[column].rolling(window=window, min_periods=1).mean()
@@ -2,92 +2,302 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+from scipy import stats
+
+from modules.correlation_engine import CorrelationEngine, cluster_order
+from modules.downsampling import downsample_indices
+from modules.lazy_frame import is_lazy
 
 
 class DataVisualizer:
     
-    def __init__(self, df):
+    def __init__(self, df, render_budget=5000, webgl_threshold=2000, downsample_method='lttb',
+                 heatmap_max_cells=60, heatmap_text_limit=20):
         self.df = df
         self.numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
         self.categorical_columns = df.select_dtypes(include=['object', 'category']).columns.tolist()
+        self.render_budget = render_budget
+        self.webgl_threshold = webgl_threshold
+        self.downsample_method = downsample_method
+        self.heatmap_max_cells = heatmap_max_cells
+        self.heatmap_text_limit = heatmap_text_limit
+    
+    def _reduce(self, x, y):
+        if not self.render_budget or len(y) <= self.render_budget:
+            return np.arange(len(y))
+        if x.dtype.kind not in 'iufmM':
+            # Labels that are not numbers or dates are reduced by position.
+            x = np.arange(len(y))
+        return downsample_indices(x, y, self.render_budget, method=self.downsample_method)
+    
+    def _scatter_trace(self, n_points, **kwargs):
+        if n_points > self.webgl_threshold:
+            return go.Scattergl(**kwargs)
+        return go.Scatter(**kwargs)
+    
+    def _numeric_values(self, column):
+        values = self.df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        return values[~np.isnan(values)]
+    
+    def _box_summary(self, values):
+        q1, median, q3 = np.percentile(values, [25, 50, 75])
+        iqr = q3 - q1
+        inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+        outside = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+        if self.render_budget and len(outside) > self.render_budget:
+            outside = np.random.default_rng(42).choice(outside, self.render_budget, replace=False)
+        return {
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'lowerfence': inside.min() if len(inside) else q1,
+            'upperfence': inside.max() if len(inside) else q3,
+            'mean': values.mean(),
+            'outliers': outside
+        }
+    
+    def _box_trace(self, column, summary, **kwargs):
+        return go.Box(
+            x=[column],
+            q1=[summary['q1']],
+            median=[summary['median']],
+            q3=[summary['q3']],
+            lowerfence=[summary['lowerfence']],
+            upperfence=[summary['upperfence']],
+            mean=[summary['mean']],
+            name=column,
+            boxpoints=False,
+            **kwargs
+        )
     
-    def plot_distribution(self, column, plot_type='histogram'):
+    def _kde_curve(self, values, grid_points=200, max_samples=10000):
+        if len(values) < 2 or np.ptp(values) == 0:
+            return None, None
+        sample = values
+        if len(values) > max_samples:
+            sample = np.random.default_rng(42).choice(values, max_samples, replace=False)
+        kde = stats.gaussian_kde(sample)
+        grid = np.linspace(values.min(), values.max(), grid_points)
+        return grid, kde(grid)
+    
+    def plot_distribution(self, column, plot_type='histogram', bins='auto'):
         if column not in self.df.columns:
             return go.Figure()
         
-        if plot_type == 'histogram':
-            fig = px.histogram(self.df, x=column, title=f'Distribution of {column}')
-        elif plot_type == 'box':
-            fig = px.box(self.df, y=column, title=f'Box Plot of {column}')
+        if column not in self.numeric_columns:
+            return self.plot_categorical(column)
+        
+        values = self._numeric_values(column)
+        if len(values) == 0:
+            return go.Figure()
+        
+        if plot_type == 'box':
+            summary = self._box_summary(values)
+            fig = go.Figure(data=[self._box_trace(column, summary)])
+            if len(summary['outliers']):
+                fig.add_trace(go.Scatter(
+                    x=[column] * len(summary['outliers']),
+                    y=summary['outliers'],
+                    mode='markers',
+                    name='Outliers',
+                    showlegend=False
+                ))
+            fig.update_layout(title=f'Box Plot of {column}', yaxis_title=column)
         elif plot_type == 'violin':
-            fig = px.violin(self.df, y=column, title=f'Violin Plot of {column}', box=True)
+            grid, density = self._kde_curve(values)
+            summary = self._box_summary(values)
+            fig = go.Figure()
+            if grid is not None:
+                half_width = 0.4 / density.max()
+                fig.add_trace(go.Scatter(
+                    x=np.concatenate([density, -density[::-1]]) * half_width,
+                    y=np.concatenate([grid, grid[::-1]]),
+                    fill='toself',
+                    mode='lines',
+                    name=column
+                ))
+            box = self._box_trace(column, summary, width=0.1)
+            box.x = [0]
+            fig.add_trace(box)
+            fig.update_layout(title=f'Violin Plot of {column}', yaxis_title=column,
+                              xaxis=dict(showticklabels=False), showlegend=False)
         else:
-            fig = px.histogram(self.df, x=column, title=f'Distribution of {column}')
+            counts, edges = np.histogram(values, bins=bins)
+            fig = go.Figure(data=[go.Bar(
+                x=(edges[:-1] + edges[1:]) / 2,
+                y=counts,
+                width=np.diff(edges),
+                name=column
+            )])
+            fig.update_layout(title=f'Distribution of {column}', xaxis_title=column,
+                              yaxis_title='count', bargap=0)
         
         return fig
     
-    def plot_correlation_heatmap(self, method='pearson'):
-        columns = self.numeric_columns
+    def heatmap_blocks(self, columns):
+        # Contiguous groups of (clustered) columns, at most heatmap_max_cells
+        # of them, that the overview aggregates and the drill-down expands.
+        size = int(np.ceil(len(columns) / self.heatmap_max_cells))
+        return [columns[start:start + size] for start in range(0, len(columns), size)]
+    
+    def block_label(self, block):
+        return str(block[0]) if len(block) == 1 else f'{block[0]} … {block[-1]} ({len(block)})'
+    
+    def plot_correlation_heatmap(self, method='pearson', corr_matrix=None, cluster=True, block=None):
+        if corr_matrix is None:
+            columns = self.numeric_columns
+            if len(columns) < 2:
+                return go.Figure()
+            if method in CorrelationEngine.METHODS:
+                corr_matrix = CorrelationEngine(self.df, columns, method=method).matrix()
+            else:
+                corr_matrix = self.df[columns].corr(method=method)
         
-        if len(columns) < 2:
+        if len(corr_matrix.columns) < 2:
             return go.Figure()
         
-        corr_matrix = self.df[columns].corr(method=method)
+        if cluster:
+            order = cluster_order(corr_matrix)
+            corr_matrix = corr_matrix.iloc[order, order]
         
+        title = 'Correlation Heatmap'
+        magnitude = False
+        columns = corr_matrix.columns.tolist()
+        if len(columns) > self.heatmap_max_cells:
+            blocks = self.heatmap_blocks(columns)
+            if block is not None:
+                # Drill-down: one block of rows against one block of columns
+                # at full resolution.
+                row_block, col_block = blocks[block[0]], blocks[block[1]]
+                z = corr_matrix.loc[row_block, col_block]
+                x, y = col_block, row_block
+                title = f'Correlation Heatmap: {self.block_label(row_block)} vs {self.block_label(col_block)}'
+            else:
+                # Blocks are averaged over |r|: clustering groups columns by
+                # |r|, so signed values of one block would cancel out.
+                values = np.abs(corr_matrix.to_numpy())
+                magnitude = True
+                bounds = np.cumsum([0] + [len(b) for b in blocks])
+                with np.errstate(invalid='ignore'):
+                    sums = np.add.reduceat(np.add.reduceat(np.nan_to_num(values), bounds[:-1], axis=0),
+                                           bounds[:-1], axis=1)
+                    counts = np.add.reduceat(np.add.reduceat((~np.isnan(values)).astype(float), bounds[:-1],
+                                                             axis=0), bounds[:-1], axis=1)
+                    z = pd.DataFrame(sums / counts)
+                x = y = [self.block_label(b) for b in blocks]
+                title = f'Correlation Heatmap (block mean |r|, {len(columns)} columns)'
+        else:
+            z, x, y = corr_matrix, columns, columns
+        
+        z_values = np.asarray(z, dtype=np.float64)
+        show_text = max(z_values.shape) <= self.heatmap_text_limit
         fig = go.Figure(data=go.Heatmap(
-            z=corr_matrix.values,
-            x=corr_matrix.columns,
-            y=corr_matrix.columns,
-            colorscale='RdBu',
-            zmid=0,
-            text=corr_matrix.values.round(2),
-            texttemplate='%{text}'
+            z=z_values,
+            x=x,
+            y=y,
+            colorscale='Blues' if magnitude else 'RdBu',
+            zmid=None if magnitude else 0,
+            zmin=0 if magnitude else -1,
+            zmax=1,
+            text=z_values.round(2) if show_text else None,
+            texttemplate='%{text}' if show_text else None
         ))
         
-        fig.update_layout(title=f'Correlation Heatmap', width=700, height=700)
+        size = int(np.clip(25 * max(z_values.shape) + 200, 500, 1000))
+        fig.update_layout(title=title, width=size, height=size)
         return fig
     
-    def plot_time_series(self, time_column, value_column, moving_average=None):
-        df_sorted = self.df.sort_values(time_column)
-        
-        fig = go.Figure()
+    def _add_time_series(self, fig, x, y, name, moving_average=None, ma_name=None):
+        order = np.argsort(x, kind='stable')
+        x = x[order]
+        y = y[order]
+        keep = self._reduce(x, y)
         
-        fig.add_trace(go.Scatter(
-            x=df_sorted[time_column],
-            y=df_sorted[value_column],
+        fig.add_trace(self._scatter_trace(
+            len(keep),
+            x=x[keep],
+            y=y[keep],
             mode='lines+markers',
-            name=value_column
+            name=name
         ))
         
         if moving_average:
-            ma = df_sorted[value_column].rolling(window=moving_average).mean()
-            fig.add_trace(go.Scatter(
-                x=df_sorted[time_column],
-                y=ma,
+            ma = pd.Series(y).rolling(window=moving_average).mean().to_numpy()
+            fig.add_trace(self._scatter_trace(
+                len(keep),
+                x=x[keep],
+                y=ma[keep],
                 mode='lines',
-                name=f'{moving_average}-period MA',
+                name=ma_name or f'{moving_average}-period MA',
                 line=dict(dash='dash')
             ))
+    
+    def plot_time_series(self, time_column, value_column, moving_average=None, time_values=None,
+                         group_column=None):
+        if time_values is None:
+            time_values = self.df[time_column]
+            if not (pd.api.types.is_numeric_dtype(time_values) or pd.api.types.is_datetime64_any_dtype(time_values)):
+                # Text timestamps are parsed so they sort and reduce by time;
+                # if some do not parse they are kept as labels.
+                parsed = pd.to_datetime(time_values, errors='coerce', format='mixed')
+                if parsed.notna().sum() == time_values.notna().sum():
+                    time_values = parsed
+        x = np.asarray(time_values)
+        y = self.df[value_column].to_numpy()
+        
+        fig = go.Figure()
+        
+        if group_column is None:
+            self._add_time_series(fig, x, y, value_column, moving_average)
+        else:
+            codes, groups = pd.factorize(self.df[group_column], sort=True)
+            for code, group in enumerate(groups):
+                positions = np.flatnonzero(codes == code)
+                self._add_time_series(fig, x[positions], y[positions], str(group), moving_average,
+                                      ma_name=f'{group} {moving_average}-period MA')
         
         fig.update_layout(title=f'{value_column} over Time', xaxis_title=time_column, yaxis_title=value_column)
         return fig
     
     def plot_scatter(self, x_column, y_column, color_column=None, trendline=True):
+        # Only the plotted columns are read (or sampled) from the frame.
+        columns = list(dict.fromkeys(col for col in (x_column, y_column, color_column) if col is not None))
+        if self.render_budget and len(self.df) > self.render_budget:
+            if is_lazy(self.df):
+                data = self.df.sample(self.render_budget, random_state=42, columns=columns)
+            else:
+                data = self.df[columns].sample(n=self.render_budget, random_state=42)
+        elif is_lazy(self.df):
+            data = self.df.to_pandas(columns)
+        else:
+            data = self.df[columns]
+        
         fig = px.scatter(
-            self.df,
+            data,
             x=x_column,
             y=y_column,
             color=color_column,
             title=f'{y_column} vs {x_column}',
-            trendline='ols' if trendline else None
+            trendline='ols' if trendline else None,
+            render_mode='webgl' if len(self.df) > self.webgl_threshold else 'auto'
         )
         return fig
     
-    def plot_categorical(self, column, plot_type='bar', top_n=None):
+    def plot_categorical(self, column, plot_type='bar', top_n=None, other_label='Other'):
         value_counts = self.df[column].value_counts()
         
-        if top_n:
+        if top_n and len(value_counts) > top_n:
+            other_count = value_counts.iloc[top_n:].sum()
+            n_other = len(value_counts) - top_n
             value_counts = value_counts.head(top_n)
+            value_counts.index = value_counts.index.astype(str)
+            # The overflow bar must not replace a real category of that name.
+            label = other_label
+            if label in value_counts.index:
+                label = f'{other_label} ({n_other} more)'
+            while label in value_counts.index:
+                label += '*'
+            value_counts[label] = other_count
         
         if plot_type == 'bar':
             fig = go.Figure(data=[go.Bar(x=value_counts.index, y=value_counts.values)])
@@ -99,19 +309,29 @@ class DataVisualizer:
         return fig
     
     def plot_outliers(self, column, outlier_mask):
+        outlier_mask = np.asarray(outlier_mask, dtype=bool)
+        values = self.df[column].to_numpy()
+        
+        # Only the normal points are reduced; every outlier is always drawn.
+        normal_positions = np.flatnonzero(~outlier_mask)
+        keep = normal_positions[self._reduce(normal_positions, values[normal_positions])]
+        outlier_positions = np.flatnonzero(outlier_mask)
+        
         fig = go.Figure()
         
-        fig.add_trace(go.Scatter(
-            x=self.df.index[~outlier_mask],
-            y=self.df.loc[~outlier_mask, column],
+        fig.add_trace(self._scatter_trace(
+            len(keep),
+            x=self.df.index[keep],
+            y=values[keep],
             mode='markers',
             name='Normal',
             marker=dict(color='blue', size=6)
         ))
         
-        fig.add_trace(go.Scatter(
-            x=self.df.index[outlier_mask],
-            y=self.df.loc[outlier_mask, column],
+        fig.add_trace(self._scatter_trace(
+            len(outlier_positions),
+            x=self.df.index[outlier_positions],
+            y=values[outlier_positions],
             mode='markers',
             name='Outliers',
             marker=dict(color='red', size=10, symbol='x')
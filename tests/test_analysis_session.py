@@ -0,0 +1,126 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.analysis_session import AnalysisSession
+
+
+def _frame(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'a': rng.normal(size=n),
+        'b': rng.standard_t(2, size=n),
+        'c': rng.exponential(size=n),
+    })
+
+
+def test_outlier_summary_follows_its_own_run():
+    session = AnalysisSession(_frame())
+    exact = session.outlier_summary('iqr', approximate=False)
+    masks = session.outlier_masks('iqr', approximate=False)
+    session.outlier_masks('iqr', multiplier=0.5)
+    assert exact == session.outlier_summary('iqr', approximate=False)
+    assert exact['columns']['b']['outlier_count'] == int(masks['b'].sum())
+
+
+def test_default_outlier_params_share_one_result():
+    session = AnalysisSession(_frame())
+    masks = session.outlier_masks('iqr')
+    assert session.outlier_masks('iqr', approximate=False) is masks
+    assert session.outlier_masks('iqr', multiplier=1.5, approximate=False) is masks
+    session.outlier_summary('zscore')
+    assert session.outlier_masks('iqr') is masks
+    with pytest.raises(ValueError):
+        session.outlier_masks('median')
+
+
+def _slow(session, name='slow'):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return session.statistical_analyzer.descriptive_statistics()
+
+    results = []
+    worker = threading.Thread(target=lambda: results.append(session._memo(name, {}, compute)))
+    worker.start()
+    assert started.wait(5)
+    return worker, release, calls, results
+
+
+def test_running_computation_does_not_block_the_session():
+    session = AnalysisSession(_frame())
+    worker, release, _, _ = _slow(session)
+
+    # Neither the built analysers nor a data change wait for the running
+    # computation, whose result is then not stored for the new data.
+    waited = time.perf_counter()
+    assert session.visualizer is session.visualizer
+    session.descriptive_statistics()
+    assert session.update_data(_frame(seed=1))
+    assert time.perf_counter() - waited < 1
+    release.set()
+    worker.join(5)
+    assert 'slow' not in session._results
+    assert session.descriptive_statistics().loc['mean', 'a'] == session.df['a'].mean()
+
+
+def test_identical_computations_run_once():
+    session = AnalysisSession(_frame())
+    worker, release, calls, results = _slow(session)
+    waiter = threading.Thread(target=lambda: results.append(session._memo('slow', {}, lambda: None)))
+    waiter.start()
+    release.set()
+    worker.join(5)
+    waiter.join(5)
+    assert len(calls) == 1
+    assert results[0] is results[1] is session._results['slow'][1]
+
+
+def test_append_waits_for_running_computations():
+    frame = _frame()
+    session = AnalysisSession(frame.iloc[:1500].reset_index(drop=True))
+    session.time_column()
+    worker, release, _, results = _slow(session)
+    appended = threading.Thread(target=session.append, args=(frame.iloc[1500:],))
+    appended.start()
+    time.sleep(0.2)
+    assert appended.is_alive() and len(session.df) == 1500
+    release.set()
+    worker.join(5)
+    appended.join(5)
+    assert results[0].loc['count', 'a'] == 1500
+    assert len(session.df) == len(frame)
+
+
+def test_append_matches_a_fresh_session():
+    frame = _frame(3000)
+    frame['date'] = pd.date_range('2022-01-01', periods=len(frame), freq='h')
+    frame.loc[::9, 'b'] = np.nan
+    frame = pd.concat([frame, frame.iloc[:50]], ignore_index=True)
+    head, delta = frame.iloc[:2400], frame.iloc[2400:]
+
+    session = AnalysisSession(head.reset_index(drop=True))
+    session.descriptive_statistics()
+    session.correlation_matrix()
+    session.trends()
+    session.duplicate_rows()
+    session.append(delta)
+    fresh = AnalysisSession(frame)
+
+    pd.testing.assert_frame_equal(session.descriptive_statistics(), fresh.descriptive_statistics())
+    pd.testing.assert_frame_equal(session.correlation_matrix(), fresh.correlation_matrix())
+    assert session.duplicate_rows() == fresh.duplicate_rows() == frame.duplicated().sum()
+    for col, trend in fresh.trends().items():
+        appended = session.trends()[col]
+        for key, value in trend.items():
+            if isinstance(value, float):
+                assert appended[key] == pytest.approx(value, rel=1e-9, abs=1e-12), (col, key)
+            else:
+                assert appended[key] == value, (col, key)
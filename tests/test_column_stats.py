@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.column_stats import ColumnStatistics, KLLSketch, MomentAccumulator
+from modules.statistical_analyzer import StatisticalAnalyzer
+
+
+def _frame(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'a': rng.normal(size=n),
+        'b': rng.exponential(size=n),
+        'c': rng.integers(0, 50, size=n).astype(float),
+    })
+    df.loc[::7, 'b'] = np.nan
+    return df
+
+
+def test_exact_statistics_keep_no_values():
+    df = _frame()
+    col_stats = ColumnStatistics.from_frame(df)
+    assert col_stats.sketch is None
+    with pytest.raises(ValueError):
+        col_stats.to_frame()
+
+    stats = col_stats.to_frame(df)
+    expected = df.describe()
+    for row in ('25%', '50%', '75%'):
+        np.testing.assert_allclose(stats.loc[row], expected.loc[row])
+
+
+def test_exact_quantiles_follow_appended_rows():
+    df = _frame()
+    analyzer = StatisticalAnalyzer(df.iloc[:2000].reset_index(drop=True))
+    analyzer.descriptive_statistics()
+    analyzer.append(df.iloc[2000:].reset_index(drop=True))
+    stats = analyzer.descriptive_statistics()
+    np.testing.assert_allclose(stats.loc['50%'], df.median())
+    np.testing.assert_allclose(stats.loc['iqr'], df.quantile(0.75) - df.quantile(0.25))
+
+
+def test_merged_moments_match_pandas():
+    df = _frame()
+    df.loc[:999, 'c'] = np.nan
+    bounds = [0, 1, 500, 500, 1700, len(df)]
+    parts = [MomentAccumulator.from_values(df.iloc[start:stop]) for start, stop in zip(bounds, bounds[1:])]
+    merged = MomentAccumulator(3)
+    for part in reversed(parts):
+        merged.merge(part)
+
+    np.testing.assert_allclose(merged.count, df.count())
+    np.testing.assert_allclose(merged.mean, df.mean())
+    np.testing.assert_allclose(merged.variance(), df.var())
+    np.testing.assert_allclose(merged.skewness(), df.skew())
+    np.testing.assert_allclose(merged.kurtosis(), df.kurtosis())
+    np.testing.assert_allclose(merged.min, df.min())
+    np.testing.assert_allclose(merged.max, df.max())
+
+
+def test_merged_kll_sketches_stay_within_rank_error():
+    rng = np.random.default_rng(1)
+    values = np.column_stack([rng.normal(size=200000), rng.lognormal(size=200000)])
+    sketches = [KLLSketch(2, seed=seed).update(chunk) for seed, chunk in enumerate(np.array_split(values, 7))]
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+
+    assert merged.count.tolist() == [len(values)] * 2
+    assert sum(len(items) for items in merged._levels[0]) < 2000
+
+    probabilities = np.linspace(0.01, 0.99, 25)
+    estimates = merged.quantiles(probabilities)
+    ordered = np.sort(values, axis=0)
+    for j in range(2):
+        ranks = np.searchsorted(ordered[:, j], estimates[:, j], side='right') / len(values)
+        assert np.abs(ranks - probabilities).max() <= merged.rank_error
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.correlation_engine import CorrelationEngine, strong_pairs
+
+
+def _frame(missing, n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=n)
+    df = pd.DataFrame({f'c{i}': base * (i % 3) + rng.normal(size=n) for i in range(10)})
+    df['constant'] = 1.0
+    df['ties'] = rng.integers(0, 5, size=n).astype(float)
+    if missing:
+        # Some blocks have no missing values, so both code paths meet.
+        df.loc[rng.random(n) < 0.2, 'c1'] = np.nan
+        df.loc[rng.random(n) < 0.5, 'c8'] = np.nan
+        df.loc[:n - 2, 'constant'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('method', CorrelationEngine.METHODS)
+@pytest.mark.parametrize('missing', [False, True])
+def test_engine_matches_dataframe_corr(method, missing):
+    df = _frame(missing)
+    expected = df.corr(method=method)
+
+    engine = CorrelationEngine(df, method=method, block_size=4)
+    pd.testing.assert_frame_equal(engine.matrix(), expected, atol=1e-10)
+
+    pairs = CorrelationEngine(df, method=method, block_size=4).strong_pairs(0.5)
+    assert [pair[:2] for pair in pairs] == [pair[:2] for pair in strong_pairs(expected, 0.5)]
+    np.testing.assert_allclose([pair[2] for pair in pairs], [pair[2] for pair in strong_pairs(expected, 0.5)])
+
+    # Only the frame is referenced; no prepared copy of it is kept.
+    assert not any(isinstance(value, np.ndarray) for value in vars(engine).values())
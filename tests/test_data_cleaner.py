@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.data_cleaner import DataCleaner
+
+
+def _frame(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'x': rng.normal(size=n).round(1),
+        'y': rng.integers(0, 5, size=n).astype(float),
+        'label': rng.choice(['a', 'b', 'c'], size=n),
+    })
+    df.loc[rng.random(n) < 0.1, 'x'] = np.nan
+    df.loc[rng.random(n) < 0.1, 'y'] = np.nan
+    return pd.concat([df, df.iloc[:40]], ignore_index=True)
+
+
+def test_chained_steps_match_pandas_and_leave_the_original_alone():
+    df = _frame()
+    before = df.copy(deep=True)
+
+    cleaner = DataCleaner(df).remove_duplicates().handle_missing_values('mean', columns=['x', 'y'])
+    # Nothing runs until the frame is asked for.
+    assert len(cleaner._pending) == 2 and not cleaner.steps
+
+    deduplicated = df.drop_duplicates()
+    expected = deduplicated.fillna(deduplicated[['x', 'y']].mean())
+    pd.testing.assert_frame_equal(cleaner.df, expected)
+    pd.testing.assert_frame_equal(df, before)
+
+    # The same steps given to run() produce the same frame.
+    steps = [('remove_duplicates', {}), ('handle_missing_values', {'strategy': 'mean', 'columns': ['x', 'y']})]
+    pd.testing.assert_frame_equal(DataCleaner(df).run(steps), expected)
+
+
+def test_frame_is_assembled_once_for_chained_steps(monkeypatch):
+    cleaner = DataCleaner(_frame())
+    calls = []
+    materialize = cleaner._materialize
+    monkeypatch.setattr(cleaner, '_materialize', lambda: calls.append(1) or materialize())
+
+    cleaner.handle_missing_values('median').remove_duplicates().convert_data_types()
+    cleaned = cleaner.get_cleaned_data()
+    assert cleaner.get_cleaning_report()['final_shape'] == cleaned.shape
+    assert calls == [1]
+
+
+def test_counters_come_from_the_masks():
+    df = _frame()
+    cleaner = DataCleaner(df).handle_missing_values('drop', columns=['x']).remove_duplicates()
+    report = cleaner.get_cleaning_report()
+
+    dropped = df[df['x'].isna()]
+    kept = df.dropna(subset=['x'])
+    drop, duplicates = report['operations']
+    assert drop['nulls_removed'] == int(dropped.isna().sum().sum())
+    assert duplicates['duplicates_removed'] == int(kept.duplicated().sum())
+    assert report['rows_removed'] == len(df) - len(kept.drop_duplicates())
+    pd.testing.assert_frame_equal(cleaner.df, kept.drop_duplicates())
+
+    cleaner = DataCleaner(df).handle_missing_values('forward_fill', columns=['y'])
+    assert cleaner.get_cleaning_report()['operations'][0]['nulls_removed'] == int(df['y'].isna().sum())
+
+
+def test_lineage_records_the_steps_that_changed_each_column():
+    df = _frame()
+    df['count'] = df['y'].fillna(0).astype(str)
+    cleaner = (DataCleaner(df)
+               .handle_missing_values('mean', columns=['x'])
+               .remove_duplicates()
+               .handle_missing_values('median', columns=['x', 'y'])
+               .convert_data_types())
+    cleaner.df
+
+    assert [operation for operation, _ in cleaner.steps] == [
+        'handle_missing_values', 'remove_duplicates', 'handle_missing_values', 'convert_data_types'
+    ]
+    # x has no missing values left for the second fill; label and count are
+    # only touched by the type conversion.
+    assert cleaner.lineage['x'] == [0]
+    assert cleaner.lineage['y'] == [2]
+    assert cleaner.lineage['label'] == [3]
+    assert cleaner.lineage['count'] == [3]
+
+
+def test_unknown_steps_are_rejected():
+    with pytest.raises(ValueError):
+        DataCleaner(_frame()).add_step('normalise')
+
+
+def test_values_the_sample_missed_keep_the_column():
+    n = 2000
+    df = pd.DataFrame({
+        'amount': [str(i) for i in range(n)],
+        'day': pd.date_range('2024-01-01', periods=n).strftime('%Y-%m-%d'),
+        'code': [str(i) for i in range(n)],
+    })
+    # Both values sit outside the sampled rows.
+    df.loc[n - 1, 'amount'] = 'n/a'
+    df.loc[n - 1, 'day'] = 'unknown'
+    cleaner = DataCleaner(df)
+    sampled = set(df['amount'].sample(n=10, random_state=0).index)
+    assert n - 1 not in sampled
+
+    cleaned = cleaner.convert_data_types(sample_size=10).df
+    assert cleaner._infer_column('amount', 10, 0.05)[0] == 'integer'
+    pd.testing.assert_series_equal(cleaned['amount'], df['amount'])
+    pd.testing.assert_series_equal(cleaned['day'], df['day'])
+    assert pd.api.types.is_integer_dtype(cleaned['code'])
+    assert cleaner.get_cleaning_report()['operations'][0]['conversions'] == {'code': 'integer'}
+
+
+def test_parallel_conversion_matches_serial():
+    rng = np.random.default_rng(0)
+    n = 3000
+    df = pd.DataFrame({
+        'count': rng.integers(0, 100, size=n).astype(str),
+        'price': rng.normal(size=n).round(2).astype(str),
+        'date': pd.date_range('2020-01-01', periods=n, freq='h').strftime('%d/%m/%Y %H:%M'),
+        'region': rng.choice(['north', 'south', 'east'], size=n),
+        'note': [f'note {i}' for i in range(n)],
+    })
+    serial = DataCleaner(df).convert_data_types(downcast_floats=True)
+    parallel = DataCleaner(df).convert_data_types(downcast_floats=True, n_jobs=4)
+    pd.testing.assert_frame_equal(parallel.df, serial.df)
+    assert parallel.get_cleaning_report() == serial.get_cleaning_report()
+
+    cleaned = serial.df
+    assert cleaned['count'].dtype == np.int8
+    assert cleaned['price'].dtype == np.float32
+    assert pd.api.types.is_datetime64_any_dtype(cleaned['date'])
+    assert cleaned['date'].iloc[25] == pd.Timestamp('2020-01-02 01:00')
+    assert isinstance(cleaned['region'].dtype, pd.CategoricalDtype)
+    assert cleaned['note'].dtype == df['note'].dtype
@@ -0,0 +1,48 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.data_ingestion import CSVIngestor
+
+
+def _csv(df):
+    return io.StringIO(df.to_csv(index=False))
+
+
+def test_dates_outside_the_sampled_format_are_kept():
+    dates = pd.date_range('2020-01-01', periods=12000, freq='h').strftime('%Y-%m-%d %H:%M').tolist()
+    dates[11000:] = ['03/15/2021'] * 1000
+    frame = pd.DataFrame({'d': dates, 'v': np.arange(12000)})
+
+    with pytest.warns(UserWarning, match="column 'd'"):
+        df = CSVIngestor(sample_rows=10000).read(_csv(frame))
+    assert df['d'].notna().all()
+    assert df['d'].tolist() == dates
+
+
+def test_chunked_read_matches_read_csv():
+    rng = np.random.default_rng(0)
+    n = 5000
+    frame = pd.DataFrame({
+        'id': np.arange(n),
+        'amount': rng.normal(100, 20, n).round(2),
+        'region': rng.choice(['north', 'south', 'east', 'west'], n),
+        'when': pd.date_range('2021-01-01', periods=n, freq='h').strftime('%Y-%m-%d %H:%M:%S'),
+        'note': [f'order {i}' for i in range(n)],
+    })
+    frame.loc[::13, 'amount'] = np.nan
+    # A category that only appears in the last chunk.
+    frame.loc[4500:, 'region'] = 'central'
+
+    progress = []
+    ingestor = CSVIngestor(sample_rows=500, memory_budget_mb=1, chunk_budget_fraction=0.001, downcast_floats=False)
+    df = ingestor.read(_csv(frame), progress=progress.append)
+    expected = pd.read_csv(_csv(frame), parse_dates=['when'])
+
+    assert len(progress) > 3
+    assert ingestor.column_kinds['region'] == 'category'
+    assert ingestor.column_kinds['when'] == 'datetime'
+    assert df['region'].astype(str).tolist() == expected['region'].tolist()
+    pd.testing.assert_frame_equal(df.drop(columns='region'), expected.drop(columns='region'), check_dtype=False)
@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from modules.data_ingestion import memory_footprint
+from modules.data_loader import DataLoader
+
+
+def _csv(tmp_path, name, seed, n=2000):
+    rng = np.random.default_rng(seed)
+    path = str(tmp_path / name)
+    pd.DataFrame({
+        'value': rng.normal(size=n),
+        'count': rng.integers(0, 100, size=n),
+        'region': rng.choice(['north', 'south'], size=n),
+    }).to_csv(path, index=False)
+    return path
+
+
+def _loader(tmp_path, **options):
+    loader = DataLoader(cache_dir=str(tmp_path / 'cache'), **options)
+    loader.parsed = []
+    parse = loader._parse
+
+    def counting_parse(source, *args):
+        loader.parsed.append(source)
+        return parse(source, *args)
+
+    loader._parse = counting_parse
+    return loader
+
+
+def _spill_files(loader):
+    return sorted(name for name in os.listdir(loader.cache_dir) if name.endswith('.parquet'))
+
+
+def test_hits_and_misses(tmp_path):
+    first, second = _csv(tmp_path, 'first.csv', 0), _csv(tmp_path, 'second.csv', 1)
+    loader = _loader(tmp_path)
+
+    df = loader.load(first)
+    assert loader.load(first) is df
+    loader.load(second)
+    assert loader.parsed == [first, second]
+    pd.testing.assert_series_equal(df['value'].astype(float), pd.read_csv(first)['value'], rtol=1e-6)
+
+    # Different ingestor settings parse the file again.
+    loader.ingestor.downcast_floats = False
+    assert loader.load(first)['value'].dtype == np.float64
+    assert loader.parsed == [first, second, first]
+
+
+def test_memory_cache_is_bounded_by_size(tmp_path):
+    paths = [_csv(tmp_path, f'{i}.csv', i) for i in range(3)]
+    size = memory_footprint(_loader(tmp_path / 'probe').load(paths[0]))
+    loader = _loader(tmp_path, memory_budget_mb=2.5 * size / 1024 ** 2)
+
+    frames = [loader.load(path) for path in paths]
+    assert len(loader._memory) == 2
+    assert loader._cached_bytes <= loader.memory_budget
+    assert loader.load(paths[2]) is frames[2]
+
+    # The evicted frame comes back from its spill file, not a new parse.
+    reloaded = loader.load(paths[0])
+    assert reloaded is not frames[0]
+    pd.testing.assert_frame_equal(reloaded, frames[0])
+    assert loader.parsed == paths
+
+
+def test_reload_from_spill_in_a_new_loader(tmp_path):
+    path = _csv(tmp_path, 'data.csv', 0)
+    df = _loader(tmp_path).load(path)
+
+    loader = _loader(tmp_path)
+    pd.testing.assert_frame_equal(loader.load(path), df)
+    assert loader.parsed == []
+
+
+def test_spill_files_are_evicted_by_size_and_age(tmp_path):
+    paths = [_csv(tmp_path, f'{i}.csv', i) for i in range(3)]
+    loader = _loader(tmp_path)
+    for path in paths[:2]:
+        loader.load(path)
+    old = os.path.join(loader.cache_dir, _spill_files(loader)[0])
+    os.utime(old, (0, 0))
+    loader.load(paths[2])
+    assert len(_spill_files(loader)) == 2
+    assert not os.path.exists(old)
+
+    loader.spill_budget = 1
+    loader.load(_csv(tmp_path, 'last.csv', 3))
+    assert len(_spill_files(loader)) == 1
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.data_cleaner import DataCleaner
+from modules.duplicate_index import DuplicateIndex
+
+
+def test_large_int64_keys_stay_distinct():
+    df = pd.DataFrame({'id': np.array([2**53, 2**53 + 1, 2**60, 2**60 + 3], dtype='int64')})
+    assert DuplicateIndex.from_frame(df).duplicate_count() == df.duplicated().sum() == 0
+    assert len(DataCleaner(df).remove_duplicates().df) == 4
+
+
+@pytest.mark.parametrize('keep', ['first', 'last', False])
+def test_matches_pandas_duplicated(keep):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'a': rng.integers(0, 5, 2000),
+        'b': rng.choice(['x', 'y', None], 2000),
+        'c': np.where(rng.random(2000) < 0.1, np.nan, rng.integers(0, 3, 2000)),
+    })
+    index = DuplicateIndex.from_frame(df, chunk_size=300)
+    expected = df.duplicated(keep=keep).to_numpy()
+    assert (index.duplicated(keep=keep) == expected).all()
+    assert (index.duplicated(keep=keep, frame=df) == expected).all()
+
+
+def test_values_hash_the_same_across_chunk_dtypes():
+    ints = pd.DataFrame({'x': [1, 2, 3]})
+    floats = pd.DataFrame({'x': [1.0, np.nan, 2.5]})
+    nullable = pd.DataFrame({'x': pd.array([3, None], dtype='Int64')})
+    index = DuplicateIndex.from_chunks([ints, floats, nullable])
+    assert index.duplicated().tolist() == [False, False, False, True, False, False, True, True]
+
+
+def test_hash_collisions_are_checked_against_values():
+    df = pd.DataFrame({'a': [1, 2, 1, 3]})
+    index = DuplicateIndex.from_frame(df)
+    index.hashes[:] = 0
+    assert index.duplicated(frame=df).tolist() == [False, False, True, False]
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.imputation import Imputer
+
+
+def _frame(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'group': rng.choice(['a', 'b', 'c'], size=n),
+        'x': rng.normal(size=n),
+        'y': rng.integers(0, 4, size=n).astype(float),
+    })
+    df['x'] += df['group'].map({'a': 0.0, 'b': 5.0, 'c': -5.0})
+    df.loc[rng.random(n) < 0.2, 'x'] = np.nan
+    df.loc[rng.random(n) < 0.2, 'y'] = np.nan
+    return df
+
+
+def _mode(values):
+    return values.mode().iloc[0]
+
+
+@pytest.mark.parametrize('strategy', ['mean', 'median', 'mode'])
+def test_group_fills_match_groupby(strategy):
+    df = _frame()
+    filled = Imputer(strategy, group_by='group').fit_transform(df)
+    aggregate = _mode if strategy == 'mode' else strategy
+    for col in ('x', 'y'):
+        expected = df[col].fillna(df.groupby('group')[col].transform(aggregate))
+        pd.testing.assert_series_equal(filled[col], expected)
+
+
+def test_groups_without_values_fall_back_to_the_column():
+    df = _frame()
+    df.loc[df['group'] == 'c', 'x'] = np.nan
+    imputer = Imputer('mean', group_by='group').fit(df)
+
+    filled = imputer.transform(df)
+    c_rows = df['group'] == 'c'
+    assert (filled.loc[c_rows, 'x'] == df['x'].mean()).all()
+
+    # A group first seen after fitting also gets the column's value.
+    later = pd.DataFrame({'group': ['d', 'a'], 'x': [np.nan, np.nan], 'y': [1.0, 2.0]})
+    filled = imputer.transform(later)
+    np.testing.assert_allclose(filled['x'], [df['x'].mean(), df.loc[df['group'] == 'a', 'x'].mean()])
+
+
+def test_integer_columns_take_fractional_fills_as_float():
+    df = pd.DataFrame({
+        'group': ['a', 'a', 'b', 'b', 'c', 'c'],
+        'count': pd.array([1, 2, None, 4, None, 6], dtype='Int64'),
+    })
+    filled = Imputer('mean').fit_transform(df)['count']
+    assert filled.dtype == 'Float64'
+    assert filled.tolist() == [1.0, 2.0, 3.25, 4.0, 3.25, 6.0]
+
+    # Whole group values keep the integer dtype.
+    filled = Imputer('mean', group_by='group').fit_transform(df)['count']
+    assert filled.dtype == 'Int64'
+    assert filled.tolist() == [1, 2, 4, 4, 6, 6]
+
+
+def test_time_interpolation_matches_pandas():
+    rng = np.random.default_rng(1)
+    times = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.sort(rng.uniform(0, 1000, 300)), unit='h')
+    df = pd.DataFrame({'time': times, 'x': rng.normal(size=300).cumsum()})
+    df.loc[rng.random(300) < 0.3, 'x'] = np.nan
+    df.loc[[0, 299], 'x'] = np.nan
+
+    expected = df.set_index('time')['x'].interpolate(method='time').ffill().bfill().to_numpy()
+
+    shuffled = df.sample(frac=1, random_state=0)
+    filled = Imputer('interpolate', time_column='time').fit_transform(shuffled)
+    np.testing.assert_allclose(filled['x'].loc[df.index].to_numpy(), expected)
+
+    # Chunks in time order give the same values as one pass, as long as no
+    # gap runs past the end of a chunk (later rows are not seen yet).
+    ends = [df['x'].iloc[:stop].last_valid_index() + 1 for stop in (70, 140, 210)] + [len(df)]
+    imputer = Imputer('interpolate', time_column='time').fit(df)
+    chunks = [imputer.transform(df.iloc[start:stop]) for start, stop in zip([0] + ends, ends)]
+    np.testing.assert_allclose(pd.concat(chunks)['x'].to_numpy(), expected)
+
+
+def test_knn_matches_brute_force():
+    df = _frame().drop(columns='group')
+    df['z'] = np.random.default_rng(2).normal(size=len(df))
+    imputer = Imputer('knn', n_neighbors=3, block_size=16).fit(df)
+    filled = imputer.transform(df)
+
+    values = df.to_numpy()
+    center, scale = np.nanmean(values, axis=0), np.nanstd(values, axis=0)
+    reference = values[~np.isnan(values).any(axis=1)]
+    scaled = (reference - center) / scale
+    for i in np.flatnonzero(np.isnan(values).any(axis=1)):
+        observed = ~np.isnan(values[i])
+        query = (values[i, observed] - center[observed]) / scale[observed]
+        distances = ((scaled[:, observed] - query) ** 2).sum(axis=1)
+        nearest = np.argsort(distances)[:3]
+        expected = np.where(observed, values[i], reference[nearest].mean(axis=0))
+        np.testing.assert_allclose(filled.iloc[i].to_numpy(), expected)
@@ -0,0 +1,118 @@
+import threading
+
+from modules.job_runner import JobRunner
+
+
+def _blocking(started, release, steps=1):
+    def run(job):
+        started.set()
+        for step in range(steps):
+            release.wait(5)
+            job.update(step / steps)
+        return 'finished'
+    return run
+
+
+def test_identical_in_flight_jobs_are_shared():
+    runner = JobRunner(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    first = runner.submit('job', _blocking(started, release), {'p': 1})
+    assert runner.submit('job', _blocking(started, release), {'p': 1}) is first
+    other = runner.submit('job', _blocking(started, release), {'p': 2})
+    assert other is not first
+
+    release.set()
+    first.future.result(5)
+    other.future.result(5)
+    assert (first.status, first.result) == ('done', 'finished')
+    # Once finished, the same parameters start a new job.
+    again = runner.submit('job', lambda job: 'again', {'p': 1})
+    assert again is not first
+    again.future.result(5)
+    assert again.result == 'again'
+
+
+def test_cancel_queued_and_running_jobs():
+    runner = JobRunner(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    running = runner.submit('running', _blocking(started, release, steps=3))
+    queued = runner.submit('queued', lambda job: 'never')
+    started.wait(5)
+
+    assert runner.cancel(queued.id)
+    assert queued.status == 'cancelled'
+    assert runner.cancel(running.id)
+    release.set()
+    running.future.result(5)
+    assert running.status == 'cancelled'
+    assert running.result is None
+
+
+def test_cancel_after_last_update_is_not_reported_done():
+    runner = JobRunner(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def run(job):
+        started.set()
+        release.wait(5)
+        return 'late'
+
+    job = runner.submit('job', run)
+    started.wait(5)
+    runner.cancel(job.id)
+    release.set()
+    job.future.result(5)
+    assert job.status == 'cancelled'
+
+
+def test_running_job_without_updates_cannot_be_cancelled():
+    runner = JobRunner(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    def run(job):
+        started.set()
+        release.wait(5)
+        return 'finished'
+
+    job = runner.submit('job', run, cancellable=False)
+    started.wait(5)
+    assert job.status == 'running'
+    assert not job.can_cancel
+    assert not runner.cancel(job.id)
+    release.set()
+    job.future.result(5)
+    assert job.status == 'done'
+
+
+def test_failures_are_recorded():
+    runner = JobRunner(max_workers=1)
+    job = runner.submit('job', lambda job: 1 / 0)
+    job.future.result(5)
+    assert job.status == 'failed'
+    assert isinstance(job.error, ZeroDivisionError)
+
+
+def test_jobs_are_not_shared_between_owners():
+    runner = JobRunner(max_workers=2)
+    started, release = threading.Event(), threading.Event()
+    mine = runner.submit('report', _blocking(started, release, steps=3), {'p': 1}, owner='a')
+    theirs = runner.submit('report', _blocking(started, release, steps=3), {'p': 1}, owner='b')
+    assert mine is not theirs
+
+    assert runner.cancel(mine.id)
+    release.set()
+    mine.future.result(5)
+    theirs.future.result(5)
+    assert (mine.status, theirs.status) == ('cancelled', 'done')
+
+
+def test_released_and_old_jobs_drop_their_results():
+    runner = JobRunner(max_workers=1, keep_finished=2)
+    jobs = [runner.submit('job', lambda job, i=i: [i] * 1000, {'i': i}) for i in range(4)]
+    for job in jobs:
+        job.future.result(5)
+
+    runner.release(jobs[3].id)
+    assert runner.get(jobs[3].id) is None and jobs[3].result is None
+    runner.submit('job', lambda job: None, {'i': 4}).future.result(5)
+    assert len(runner.jobs) <= 3
+    assert runner.get(jobs[0].id) is None
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.analysis_session import AnalysisSession
+from modules.lazy_frame import LazyFrame
+
+
+@pytest.fixture
+def frames(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 5000
+    df = pd.DataFrame({
+        'a': rng.normal(size=n),
+        'b': rng.standard_t(2, size=n),
+        'c': rng.exponential(size=n),
+        'region': rng.choice(['north', 'south'], size=n),
+    })
+    df.loc[::9, 'b'] = np.nan
+    path = str(tmp_path / 'data.parquet')
+    df.to_parquet(path, index=False)
+    return df, path
+
+
+def _ranks(values, estimates):
+    ordered = np.sort(values[~np.isnan(values)])
+    return np.searchsorted(ordered, estimates, side='right') / len(ordered)
+
+
+def test_fingerprint_follows_the_files(frames):
+    df, path = frames
+    session = AnalysisSession(LazyFrame(path))
+    assert not session.update_data(LazyFrame(path))
+
+    df.iloc[:10].to_parquet(path, index=False)
+    assert session.update_data(LazyFrame(path))
+
+
+def test_statistics_and_correlation_match_pandas(frames):
+    df, path = frames
+    lazy, session = AnalysisSession(LazyFrame(path)), AnalysisSession(df)
+
+    stats, expected = lazy.descriptive_statistics(), session.descriptive_statistics()
+    exact_rows = ['count', 'mean', 'std', 'min', 'max', 'variance', 'skewness', 'kurtosis']
+    pd.testing.assert_frame_equal(stats.loc[exact_rows], expected.loc[exact_rows])
+    # Lazy quartiles come from a sketch, so they are checked by rank.
+    rank_error = lazy.statistical_analyzer._column_stats.sketch.rank_error
+    for row, probability in (('25%', 0.25), ('50%', 0.5), ('75%', 0.75)):
+        for col in stats.columns:
+            assert abs(_ranks(df[col].to_numpy(), stats.loc[row, col]) - probability) <= rank_error
+
+    pd.testing.assert_frame_equal(lazy.correlation_matrix(), session.correlation_matrix(), atol=1e-12)
+
+
+def test_outliers_match_pandas(frames):
+    df, path = frames
+    lazy, session = AnalysisSession(LazyFrame(path)), AnalysisSession(df)
+
+    zscore, expected = lazy.outlier_masks('zscore'), session.outlier_masks('zscore')
+    for col in expected:
+        assert zscore[col].tolist() == expected[col].tolist()
+
+    iqr = lazy.outlier_masks('iqr')
+    sketch = lazy.outlier_detector._sketch
+    Q1, Q3 = sketch.quantiles([0.25, 0.75])
+    for j, col in enumerate(['a', 'b', 'c']):
+        values = df[col].to_numpy()
+        assert abs(_ranks(values, Q1[j]) - 0.25) <= sketch.rank_error
+        assert abs(_ranks(values, Q3[j]) - 0.75) <= sketch.rank_error
+        width = Q3[j] - Q1[j]
+        with np.errstate(invalid='ignore'):
+            expected = (values < Q1[j] - 1.5 * width) | (values > Q3[j] + 1.5 * width)
+        assert iqr[col].tolist() == expected.tolist()
+
+
+def test_scatter_reads_only_its_columns(frames):
+    df, path = frames
+    visualizer = AnalysisSession(LazyFrame(path)).visualizer
+
+    fig = visualizer.plot_scatter('a', 'c', color_column='region', trendline=False)
+    assert sum(len(trace.x) for trace in fig.data) == len(df)
+
+    visualizer.render_budget = 100
+    fig = visualizer.plot_scatter('a', 'a', trendline=False)
+    assert len(fig.data[0].x) == 100
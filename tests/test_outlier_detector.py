@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from modules.analysis_session import AnalysisSession
+from modules.outlier_detector import OutlierDetector
+
+
+def _frame(n, seed, shift=0.0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'a': rng.normal(shift, 1, size=n),
+        'b': rng.exponential(size=n),
+        'c': rng.standard_t(3, size=n),
+    })
+    df.loc[::11, 'c'] = np.nan
+    return df
+
+
+def test_append_matches_full_recompute():
+    detector = OutlierDetector(_frame(5000, 0))
+    detector.detect_iqr()
+    detector.detect_zscore()
+
+    # The last delta moves the bounds far enough to force a rescan.
+    for seed, n, shift in ((1, 500, 0.0), (2, 300, 0.0), (3, 2000, 3.0)):
+        delta = _frame(n, seed, shift)
+        n_old = len(detector.df)
+        delta_masks = detector.append(delta)
+        combined = detector.df
+
+        expected = OutlierDetector(combined).detect_zscore()
+        for col, mask in detector.outliers['zscore'].items():
+            assert mask.equals(expected[col])
+
+        Q1, Q3 = detector._sketch.quantiles([0.25, 0.75])
+        values = combined[['a', 'b', 'c']].to_numpy()
+        expected = detector._iqr_mask(values, Q1, Q3, 1.5)
+        np.testing.assert_array_equal(detector.masks['iqr'][1], expected)
+        np.testing.assert_array_equal(delta_masks['iqr'], expected[n_old:])
+
+
+def test_cached_forest_masks_are_not_shared():
+    df = _frame(2000, 0)
+    first = OutlierDetector(df).detect_isolation_forest(n_jobs=1)
+    expected = first.copy()
+    first[:] = True
+
+    second = OutlierDetector(df).detect_isolation_forest(n_jobs=1)
+    assert second.equals(expected)
+    second[:] = False
+    assert OutlierDetector(df).detect_isolation_forest(n_jobs=1).equals(expected)
+
+
+def test_stratified_sample_keeps_each_share():
+    df = _frame(20000, 0).dropna()
+    df['segment'] = np.where(np.arange(len(df)) % 10 == 0, 'rare', 'common')
+    detector = OutlierDetector(df)
+
+    sample = detector._fit_sample(df[detector.numeric_columns], 2000, 'segment', 42)
+    shares = df.loc[sample.index, 'segment'].value_counts(normalize=True)
+    expected = df['segment'].value_counts(normalize=True)
+    np.testing.assert_allclose(shares[expected.index], expected, atol=1e-3)
+
+    session = AnalysisSession(df)
+    masks = session.outlier_masks('isolation_forest', max_samples=2000, stratify_by='segment', n_jobs=1)
+    expected = OutlierDetector(df).detect_isolation_forest(max_samples=2000, stratify_by='segment', n_jobs=1)
+    assert masks.equals(expected)
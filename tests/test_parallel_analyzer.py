@@ -0,0 +1,30 @@
+import os
+import signal
+
+import numpy as np
+import pandas as pd
+
+from modules import parallel_analyzer
+from modules.parallel_analyzer import ParallelColumnAnalyzer
+from modules.statistical_analyzer import StatisticalAnalyzer
+
+
+def _frame(n=2000, n_columns=12, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.normal(size=(n, n_columns)), columns=[f'c{i}' for i in range(n_columns)])
+
+
+def test_pool_is_rebuilt_after_a_worker_dies():
+    df = _frame()
+    analyzer = ParallelColumnAnalyzer(df, n_workers=2)
+    expected = StatisticalAnalyzer(df).distribution_profile()['median']
+    first = analyzer.analyze_all_columns(analyses=('distribution',))
+
+    executor = parallel_analyzer._get_executor(2)
+    for pid in list(executor._processes):
+        os.kill(pid, signal.SIGKILL)
+
+    second = analyzer.analyze_all_columns(analyses=('distribution',))
+    assert parallel_analyzer._get_executor(2) is not executor
+    for results in (first, second):
+        np.testing.assert_allclose([results['distribution'][col]['median'] for col in df.columns], expected)
@@ -0,0 +1,89 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules import report_renderers
+from modules.analysis_session import AnalysisSession
+from modules.report_generator import ReportGenerator
+from modules.report_renderers import available_formats, fpdf_error
+
+
+def _session():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'date': pd.date_range('2023-01-01', periods=500, freq='D'),
+        'sales': np.arange(500) * 2.0 + rng.normal(size=500),
+        'cost': rng.normal(50, 5, size=500),
+        'region': rng.choice(['north', 'south'], size=500),
+    })
+    df = pd.concat([df, df.iloc[:5]], ignore_index=True)
+    return AnalysisSession(df)
+
+
+def _report(charts=False):
+    session = _session()
+    return ReportGenerator(session.df, session.analysis_results(), charts=charts)
+
+
+def test_html_report():
+    progress = []
+    html = _report().generate_report(format='html', progress=lambda fraction, message: progress.append(fraction))
+    document = html.getvalue().decode('utf-8')
+
+    assert document.startswith('<!DOCTYPE html>')
+    for heading in ('1. Dataset Overview', '2. Statistical Analysis', '3. Outlier Detection',
+                    '4. Trend Analysis', '5. Recommendations'):
+        assert heading in document
+    assert 'Duplicate Rows: 5' in document
+    assert 'Column: sales' in document
+    assert progress == sorted(progress) and progress[-1] == 0.9
+
+
+@pytest.mark.skipif(fpdf_error() is not None, reason="fpdf2 is not installed")
+def test_pdf_report(tmp_path):
+    path = str(tmp_path / 'report.pdf')
+    assert _report().generate_report(path, format='pdf') == path
+    with open(path, 'rb') as f:
+        assert f.read(5) == b'%PDF-'
+
+    stream = _report().generate_report(io.BytesIO(), format='pdf')
+    assert stream.getvalue().startswith(b'%PDF-')
+
+
+def test_chart_export_failures_are_reported_once():
+    blocks = _report(charts=True).build_blocks()
+    assert ('section', '6. Charts') in blocks
+    notes = [block for block in blocks[blocks.index(('section', '6. Charts')):] if block[0] == 'text']
+    assert len(notes) <= 1
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        _report().generate_report(format='docx')
+
+
+def test_old_fpdf_only_disables_pdf(monkeypatch):
+    class OldFpdf:
+        FPDF_VERSION = '1.7.2'
+
+    monkeypatch.setattr(report_renderers, 'fpdf', OldFpdf)
+    assert available_formats() == ['html']
+    with pytest.raises(ImportError, match='pip uninstall fpdf'):
+        _report().generate_report(format='pdf')
+    assert _report().generate_report(format='html').getvalue().startswith(b'<!DOCTYPE html>')
+
+
+def test_heatmap_draws_the_session_matrix(monkeypatch):
+    session = _session()
+    corr_matrix = session.correlation_matrix()
+    generator = ReportGenerator(session.df, session.analysis_results(), visualizer=session.visualizer,
+                                corr_matrix=corr_matrix)
+    drawn = []
+    monkeypatch.setattr(session.visualizer, 'plot_correlation_heatmap',
+                        lambda corr_matrix=None, **kwargs: drawn.append(corr_matrix))
+    monkeypatch.setattr(generator, '_chart', lambda fig, title: ('error', title))
+    for task in generator._chart_tasks()[:1]:
+        task()
+    assert len(drawn) == 1 and drawn[0] is corr_matrix
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from modules.statistical_analyzer import StatisticalAnalyzer
+
+
+def _frame(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'a': rng.normal(size=n),
+        'b': rng.exponential(size=n),
+        'c': rng.integers(0, 50, size=n).astype(float),
+    })
+    df.loc[::7, 'b'] = np.nan
+    return df
+
+
+def _check_profile(profile, df):
+    for col in df.columns:
+        values = df[col].dropna()
+        row = profile.loc[col]
+        assert row['count'] == len(values)
+        np.testing.assert_allclose(row['mean'], values.mean())
+        np.testing.assert_allclose(row['median'], values.median())
+        np.testing.assert_allclose(row['std'], values.std())
+        np.testing.assert_allclose(row['skewness'], stats.skew(values))
+        np.testing.assert_allclose(row['kurtosis'], stats.kurtosis(values))
+        assert row['mode'] == values.mode()[0]
+
+
+def test_distribution_profile_reuses_descriptive_statistics():
+    df = _frame()
+    analyzer = StatisticalAnalyzer(df)
+    _check_profile(analyzer.distribution_profile(), df)
+    assert not hasattr(analyzer._profilers[0], 'column_stats')
+
+
+def test_distribution_profile_follows_appended_rows():
+    df = _frame()
+    analyzer = StatisticalAnalyzer(df.iloc[:2000].reset_index(drop=True))
+    analyzer.distribution_profile()
+    analyzer.append(df.iloc[2000:].reset_index(drop=True))
+    _check_profile(analyzer.distribution_profile(), df)
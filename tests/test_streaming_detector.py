@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.streaming_detector import StreamingAnomalyDetector
+
+
+def _values(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    season = 10 * np.sin(np.arange(n) / 40)
+    values = np.column_stack([season + rng.normal(size=n), rng.standard_t(2, size=n)])
+    values[rng.choice(n, 15, replace=False), 0] += 25
+    values[rng.random(n) < 0.05, 1] = np.nan
+    values[:3, 0] = np.nan
+    return values
+
+
+def _chunks(values, sizes):
+    bounds = np.cumsum([0] + list(sizes))
+    return [values[start:stop] for start, stop in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize('method', StreamingAnomalyDetector.METHODS)
+@pytest.mark.parametrize('sizes', [[1] * 40 + [560], [7, 13, 250, 330], [599, 1]])
+def test_masks_do_not_depend_on_chunking(method, sizes):
+    values = _values()
+    whole = StreamingAnomalyDetector(['a', 'b'], method=method, window=30).run([values])
+    assert whole[:, 0].sum() > 0
+
+    chunked = StreamingAnomalyDetector(['a', 'b'], method=method, window=30).run(_chunks(values, sizes))
+    np.testing.assert_array_equal(chunked, whole)
+
+
+def test_frames_and_arrays_give_the_same_masks():
+    values = _values()
+    frame = pd.DataFrame(values, columns=['a', 'b']).assign(other='x')
+    detector = StreamingAnomalyDetector(['a', 'b'], window=30)
+    from_frames = detector.run(frame.iloc[start:start + 100] for start in range(0, len(frame), 100))
+    np.testing.assert_array_equal(from_frames, StreamingAnomalyDetector(['a', 'b'], window=30).run([values]))
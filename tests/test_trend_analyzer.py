@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from modules.trend_analyzer import TrendAnalyzer
+
+
+def _frame(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    # Irregular timestamps in no particular row order.
+    times = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.uniform(0, 730, n), unit='D')
+    df = pd.DataFrame({
+        'date': times.strftime('%d/%m/%Y %H:%M'),
+        'region': rng.choice(['north', 'south'], size=n),
+        'sales': np.linspace(0, 50, n) + rng.normal(size=n),
+        'cost': rng.normal(20, 3, size=n),
+    })
+    df['sales'] += (times - times.min()).days * 0.1
+    df.loc[rng.random(n) < 0.15, 'sales'] = np.nan
+    df.loc[rng.random(n) < 0.3, 'cost'] = np.nan
+    return df
+
+
+def test_text_columns_that_are_not_dates_are_skipped():
+    df = _frame()
+    n = len(df)
+    df.insert(0, 'notes', np.where(np.arange(n) % 2, 'late delivery', 'on time'))
+    # Every value has digits, but no single format parses them all.
+    df.insert(1, 'reference', np.where(np.arange(n) % 2, '2024-01-05', '05/01/2024'))
+
+    analyzer = TrendAnalyzer(df)
+    assert analyzer.detect_time_column() == 'date'
+    assert analyzer.time_formats == {'date': '%d/%m/%Y %H:%M'}
+    assert analyzer.infer_datetime_format('notes') is None
+    assert analyzer.infer_datetime_format('reference') is None
+
+    expected = pd.to_datetime(df['date'], format='%d/%m/%Y %H:%M')
+    pd.testing.assert_series_equal(analyzer.get_time_values('date'), expected)
+
+    assert TrendAnalyzer(df[['notes', 'reference', 'sales']]).detect_time_column() is None
+
+
+@pytest.mark.parametrize('x_axis', ['elapsed', 'position'])
+def test_trends_match_linregress(x_axis):
+    df = _frame()
+    trends = TrendAnalyzer(df).identify_trends(x_axis=x_axis)
+
+    times = pd.to_datetime(df['date'], format='%d/%m/%Y %H:%M')
+    order = np.argsort(times.to_numpy(), kind='stable')
+    if x_axis == 'elapsed':
+        x = ((times - times.min()).dt.total_seconds() / 86400).to_numpy()[order]
+    else:
+        x = np.arange(len(df), dtype=float)
+    for col in ('sales', 'cost'):
+        y = df[col].to_numpy()[order]
+        valid = ~np.isnan(y)
+        expected = stats.linregress(x[valid], y[valid])
+        trend = trends[col]
+        assert trend['x_axis'] == x_axis
+        np.testing.assert_allclose(trend['slope'], expected.slope, rtol=1e-9)
+        np.testing.assert_allclose(trend['intercept'], expected.intercept, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(trend['r_squared'], expected.rvalue ** 2, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(trend['p_value'], expected.pvalue, rtol=1e-6, atol=1e-300)
+
+
+@pytest.mark.parametrize('agg', ['sum', 'mean', 'count'])
+def test_monthly_resample_matches_grouper(agg):
+    df = _frame()
+    analyzer = TrendAnalyzer(df)
+    dated = df.assign(date=pd.to_datetime(df['date'], format='%d/%m/%Y %H:%M'))
+
+    resampled = analyzer.resample('monthly', agg)
+    expected = dated.groupby(pd.Grouper(key='date', freq='MS'))[['sales', 'cost']].agg(agg).reset_index()
+    pd.testing.assert_frame_equal(resampled, expected, check_dtype=False, check_freq=False)
+
+    grouped = analyzer.resample('monthly', agg, group_by='region')
+    expected = dated.groupby([pd.Grouper(key='date', freq='MS'), 'region'])[['sales', 'cost']].agg(agg)
+    pd.testing.assert_frame_equal(grouped, expected.reset_index(), check_dtype=False, check_freq=False)
+
+
+def test_single_and_batched_trends_share_an_axis():
+    df = _frame()
+    analyzer = TrendAnalyzer(df)
+    trends = analyzer.identify_trends()
+    single = analyzer.identify_trend('sales')
+    assert single['x_axis'] == trends['sales']['x_axis'] == 'elapsed'
+    np.testing.assert_allclose(single['slope'], trends['sales']['slope'], rtol=1e-12)
+    assert trends['sales']['slope_unit'] == 'per day'
+    assert analyzer.identify_trend('sales', x_axis='position')['slope_unit'] == 'per row'
+
+    numeric = df.assign(step=np.arange(len(df)) * 2.0).drop(columns='date')
+    assert TrendAnalyzer(numeric).identify_trend('sales', time_column='step')['slope_unit'] == 'per unit of step'
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from modules.visualizer import DataVisualizer
+
+
+def test_block_overview_does_not_cancel_opposite_signs():
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=500)
+    df = pd.DataFrame({f'c{i}': (1 if i % 2 else -1) * base + 0.4 * rng.normal(size=500) for i in range(120)})
+
+    fig = DataVisualizer(df, heatmap_max_cells=60).plot_correlation_heatmap()
+    z = np.asarray(fig.data[0].z)
+    assert z.shape == (60, 60)
+    assert (z > 0.8).all()
+    assert '|r|' in fig.layout.title.text
+
+
+def test_overflow_bar_keeps_a_real_other_category():
+    values = ['A'] * 50 + ['Other'] * 40 + ['B'] * 30 + ['C'] * 10 + ['D'] * 5
+    fig = DataVisualizer(pd.DataFrame({'cat': values})).plot_categorical('cat', top_n=2)
+    bars = dict(zip(fig.data[0].x, fig.data[0].y))
+    assert bars['Other'] == 40
+    assert sum(bars.values()) == len(values)
+
+
+def test_time_series_with_text_timestamps_is_reduced():
+    times = pd.date_range('2020-01-01', periods=6000, freq='h')
+    df = pd.DataFrame({'t': times.strftime('%Y-%m-%d %H:%M'), 'v': np.sin(np.arange(6000) / 50)})
+    fig = DataVisualizer(df, render_budget=1000).plot_time_series('t', 'v')
+    assert len(fig.data[0].x) == 1000
+    assert pd.Timestamp(fig.data[0].x[0]) == times[0]
+
+
+def test_time_series_with_unparseable_labels_is_reduced():
+    df = pd.DataFrame({'t': [f'step {i:05d}' for i in range(6000)], 'v': np.arange(6000.0)})
+    fig = DataVisualizer(df, render_budget=1000).plot_time_series('t', 'v')
+    assert len(fig.data[0].x) == 1000